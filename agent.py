@@ -16,10 +16,14 @@ from tools import (
     get_weather,
     search_web,
     qa_find_answer,
+    qa_find_candidates,
+    qa_hybrid_search,
     qa_search_by_tag,
     qa_search_questions,
     qa_list_tags,
 )
+from services import get_qa_service
+from utils.async_http_client import close_async_http_client
 from log_config import setup_logging
 
 load_dotenv()
@@ -52,6 +56,8 @@ class Assistant(Agent):
                 get_weather,
                 # search_web,
                 qa_find_answer,
+                qa_find_candidates,
+                qa_hybrid_search,
                 qa_search_by_tag,
                 qa_search_questions,
                 qa_list_tags,
@@ -87,10 +93,19 @@ class Assistant(Agent):
     #     )
 
 
+def prewarm(proc: agents.JobProcess):
+    """Worker 行程啟動時預先建立 QA 服務與記憶體索引，避免第一次查詢時才載入"""
+    get_qa_service()
+    agent_logger.info("✅ QA index prewarmed")
+
+
 async def entrypoint(ctx: agents.JobContext):
     agent_logger.info(f"Entrypoint called with room: {ctx.room}")
     agent_logger.info(f"Room name: {getattr(ctx.room, 'name', 'Not connected yet')}")
 
+    # job 結束時關閉此事件迴圈的 HTTP 連線池
+    ctx.add_shutdown_callback(close_async_http_client)
+
     # 先連接到房間
     await ctx.connect()
     agent_logger.info("✅ Connected to room")
@@ -332,4 +347,4 @@ if __name__ == "__main__":
     import logging
     logging.basicConfig(level=logging.INFO)
     logging.info("Starting LiveKit agent...")
-    agents.cli.run_app(agents.WorkerOptions(entrypoint_fnc=entrypoint))
+    agents.cli.run_app(agents.WorkerOptions(entrypoint_fnc=entrypoint, prewarm_fnc=prewarm))
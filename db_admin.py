@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+"""資料庫管理工具 - QA 資料庫的維運指令
+
+用法：
+    python db_admin.py import data.jsonl [--db chiayi_qa.db] [--batch-size 5000] [--priority 100]
+    python db_admin.py rebuild-tag-stats [--db chiayi_qa.db]
+    python db_admin.py snapshot backups/chiayi_qa.db [--gzip] [--pages 256] [--sleep 0.005]
+    python db_admin.py audit-queries [--sample 20] [--slow-ms 50] [--fail-on-scan]
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+
+from log_config import setup_logging
+from services.database import Database
+
+
+def cmd_import(db: Database, args: argparse.Namespace) -> int:
+    """大量匯入 JSON 陣列或 JSONL 問答資料"""
+    from services.bulk_import import BulkImporter
+
+    def progress(stats):
+        print(f"  已處理 {stats.records} 筆（新增 {stats.inserted}，更新 {stats.updated}，略過 {stats.skipped}）")
+
+    importer = BulkImporter(db, batch_size=args.batch_size, default_priority=args.priority,
+                            progress=progress if args.progress else None)
+    try:
+        stats = importer.import_file(args.path)
+    except FileNotFoundError:
+        print(f"❌ 錯誤：檔案不存在 {args.path}")
+        return 1
+    except ValueError as e:
+        print(f"❌ 資料格式錯誤：{e}")
+        return 1
+
+    rate = stats.records / stats.seconds if stats.seconds else 0.0
+    print(f"✅ 匯入完成：讀取 {stats.records} 筆，新增 {stats.inserted}，更新 {stats.updated}，"
+          f"略過 {stats.skipped}（{stats.seconds:.2f} 秒，{rate:,.0f} 筆/秒）")
+    return 0
+
+
+def cmd_rebuild_tag_stats(db: Database, args: argparse.Namespace) -> int:
+    """從關聯表重新計算標籤使用次數（修正統計偏差）"""
+    drifted = db.rebuild_tag_stats()
+    if drifted:
+        print(f"✅ 標籤統計已重建，修正 {drifted} 個標籤")
+    else:
+        print("✅ 標籤統計已重建，與關聯表一致")
+    return 0
+
+
+def cmd_snapshot(db: Database, args: argparse.Namespace) -> int:
+    """線上備份資料庫（不阻擋查詢）"""
+    def progress(remaining, total):
+        print(f"  已複製 {total - remaining}/{total} 頁")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.dest)), exist_ok=True)
+    try:
+        path = db.snapshot(args.dest, compress=args.gzip, pages=args.pages, step_sleep=args.sleep,
+                           progress=progress if args.progress else None)
+    except (OSError, sqlite3.Error) as e:
+        print(f"❌ 備份失敗：{e}")
+        return 1
+    print(f"✅ 備份完成：{path}（{os.path.getsize(path):,} bytes）")
+    return 0
+
+
+def _run_sample_workload(db: Database, sample: int):
+    """以資料庫中的問題與標籤執行 QAService 的各種查詢，讓查詢登錄表涵蓋所有語句"""
+    from services.qa import QAService
+
+    with db.read_connection() as conn:
+        questions = [row[0] for row in conn.execute('SELECT content FROM questions ORDER BY id LIMIT ?', (sample,))]
+        tags = [row[0] for row in conn.execute('SELECT name FROM tags ORDER BY id LIMIT 3')]
+    # 只稽核 QAService 的語句，不含上面取樣用的查詢
+    db.query_recorder.reset()
+
+    # 不使用記憶體索引與快取，每個查詢都實際存取資料庫
+    service = QAService(use_index=False, cache_size=0, db=db)
+    for question in questions:
+        service.find_answer(question)
+        service.find_answer(question[:2])  # 少於三個字時走 bigram 子字串分支
+    service.find_answers_batch(questions)
+    for tag in tags:
+        service.get_questions_by_tag(tag)
+        service.search_questions(tag)
+    service.get_all_tags()
+    if questions:
+        service.hybrid_search(questions[0])
+
+
+def cmd_audit_queries(db: Database, args: argparse.Namespace) -> int:
+    """執行範例查詢並以 EXPLAIN QUERY PLAN 檢查每個語句是否使用索引"""
+    from services.query_log import ALLOWED_FULL_SCANS, audit_queries
+
+    _run_sample_workload(db, args.sample)
+
+    with db.read_connection() as conn:
+        audits = audit_queries(conn, db.query_recorder.records(), ALLOWED_FULL_SCANS + tuple(args.allow_scan))
+
+    flagged = 0
+    for audit in audits:
+        record = audit.record
+        mark = '⚠️ ' if audit.full_scans or audit.error else '✅'
+        print(f"{mark} 執行 {record.count} 次，平均 {record.avg_ms:.2f} ms，最長 {record.max_ms:.2f} ms")
+        print(f"   {record.key[:200]}{'...' if len(record.key) > 200 else ''}")
+        if args.verbose or audit.full_scans:
+            for line in audit.plan:
+                print(f"     {line}")
+        for scan in audit.full_scans:
+            print(f"   全表掃描: {scan}")
+        for hint in audit.hints:
+            print(f"   提示: {hint}")
+        if audit.error:
+            print(f"   無法產生查詢計畫: {audit.error}")
+        if audit.full_scans:
+            flagged += 1
+        print()
+
+    print(f"共 {len(audits)} 個語句，{flagged} 個含全表掃描")
+    return 1 if flagged and args.fail_on_scan else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="QA 資料庫管理工具")
+    parser.add_argument('--db', default='chiayi_qa.db', help="SQLite 資料庫檔案路徑")
+    parser.add_argument('-v', '--verbose', action='store_true', help="顯示詳細日誌")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    p_import = subparsers.add_parser('import', help="大量匯入問答資料（JSON 陣列或 JSONL）")
+    p_import.add_argument('path', help="資料檔路徑")
+    p_import.add_argument('--batch-size', type=int, default=5000, help="批次寫入大小")
+    p_import.add_argument('--priority', type=int, default=100, help="未指定 priority 時的問答關聯優先級")
+    p_import.add_argument('--progress', action='store_true', help="每批顯示進度")
+    p_import.set_defaults(func=cmd_import)
+
+    p_tag_stats = subparsers.add_parser('rebuild-tag-stats', help="重新計算標籤使用次數統計")
+    p_tag_stats.set_defaults(func=cmd_rebuild_tag_stats)
+
+    p_snapshot = subparsers.add_parser('snapshot', help="線上備份資料庫（可選 gzip 壓縮）")
+    p_snapshot.add_argument('dest', help="備份檔路徑")
+    p_snapshot.add_argument('--gzip', action='store_true', help="以 gzip 壓縮備份檔")
+    p_snapshot.add_argument('--pages', type=int, default=256, help="每一步複製的頁數")
+    p_snapshot.add_argument('--sleep', type=float, default=0.005, help="每一步之間暫停的秒數")
+    p_snapshot.add_argument('--progress', action='store_true', help="顯示複製進度")
+    p_snapshot.set_defaults(func=cmd_snapshot)
+
+    p_audit = subparsers.add_parser('audit-queries', help="記錄 QAService 的查詢並檢查查詢計畫")
+    p_audit.add_argument('--sample', type=int, default=20, help="用於範例查詢的問題數")
+    p_audit.add_argument('--slow-ms', type=float, default=50.0, help="慢查詢門檻（毫秒）")
+    p_audit.add_argument('--allow-scan', action='append', default=[], metavar='TABLE',
+                         help="允許全表掃描的資料表（可重複指定）")
+    p_audit.add_argument('--fail-on-scan', action='store_true', help="有全表掃描時以非零狀態結束（用於 CI）")
+    p_audit.set_defaults(func=cmd_audit_queries)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    setup_logging(level=logging.DEBUG if args.verbose else logging.WARNING)
+    # audit-queries 需要在建立連線前啟用查詢記錄
+    db = Database(args.db, slow_query_ms=getattr(args, 'slow_ms', None))
+    try:
+        return args.func(db, args)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -23,6 +23,7 @@ from services import (
     # local_food,
     # thank_you
 )
+from services.qa import STAGE_LABELS
 
 logging.getLogger("ddgs.ddgs").setLevel(logging.ERROR)  # 降噪 DuckDuckGoSearch 的子引擎錯誤
 
@@ -57,6 +58,40 @@ def qa_find_answer(question: str) -> str:
     """
     return find_answer(question)
 
+@mcp.tool
+def qa_find_candidates(question: str, k: int = 3) -> str:
+    """
+    智慧問答系統 - 一次返回多個候選答案及其匹配方式、分數與標籤
+    適合問題含糊、需要在幾個相近答案之間挑選時使用
+    """
+    service = get_qa_service()
+    candidates = service.find_answers(question, k=k)
+    if not candidates:
+        return f"沒有找到與 '{question}' 相關的答案"
+
+    result = f"'{question}' 的候選答案：\n"
+    for rank, c in enumerate(candidates, 1):
+        tags = ', '.join(c.tags) if c.tags else '無標籤'
+        result += f"{rank}. [{STAGE_LABELS[c.stage]}, 分數 {c.score:.2f}, 優先級 {c.priority}, 標籤: {tags}] {c.answer}\n"
+    return result
+
+@mcp.tool
+def qa_hybrid_search(question: str, k: int = 3) -> str:
+    """
+    智慧問答系統 - 混合檢索（BM25 全文檢索 + 向量語意檢索，含同義詞擴充）
+    適合口語、英文或別名說法的問題，例如 "Alishan train"、"文化夜市"
+    """
+    service = get_qa_service()
+    results = service.hybrid_search(question, k=k)
+    if not results:
+        return f"沒有找到與 '{question}' 相關的答案"
+
+    result = f"'{question}' 的混合檢索結果：\n"
+    for rank, r in enumerate(results, 1):
+        tags = ', '.join(r.tags) if r.tags else '無標籤'
+        result += f"{rank}. [RRF {r.score:.4f}, 標籤: {tags}] {r.answer}\n"
+    return result
+
 @mcp.tool
 def qa_search_by_tag(tag: str) -> str:
     """
@@ -148,6 +183,9 @@ if __name__ == "__main__":
     # 預設以 stdio 執行；若要走 HTTP/SSE，請見 FastMCP 與 MCP SDK 文件
     # 開發期間可直接： python mcp_server.py
 
+    # 啟動時先建立 QA 記憶體索引，避免第一次查詢才載入
+    get_qa_service()
+
     # 選項 1: 使用 stdio 傳輸（本地進程）
     # mcp.run(transport="stdio")
 
@@ -2,8 +2,8 @@
 Services 模組 - 提供業務邏輯服務
 """
 
-from .weather import fetch_weather
-from .web_search import search_web_ddg
+from .weather import fetch_weather, fetch_weather_async
+from .web_search import search_web_ddg, search_web_ddg_async
 from .qa import (
     # 新的資料庫驅動介面
     get_qa_service,
@@ -20,7 +20,9 @@ from .database import get_database
 
 __all__ = [
     'fetch_weather',
+    'fetch_weather_async',
     'search_web_ddg',
+    'search_web_ddg_async',
     # Database
     'get_database',
     # QA service
@@ -0,0 +1,109 @@
+"""答案快取 - 具容量上限（LRU）與存活時間（TTL）的查詢結果快取"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# 設定日誌
+cache_logger = logging.getLogger("core.answer_cache")
+
+
+class AnswerCache:
+    """執行緒安全的 LRU + TTL 快取，並統計命中與未命中次數"""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300.0):
+        """初始化快取
+
+        Args:
+            max_size: 最多保存的項目數，超過時淘汰最久未使用的項目
+            ttl: 項目存活時間（秒）
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        # 每次 clear() 遞增；寫入時比對，避免清除前算出的舊結果在清除後寫回
+        self.generation = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """取得快取值
+
+        Args:
+            key: 快取鍵
+
+        Returns:
+            快取值；未命中或已過期時返回 None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: Any, generation: Optional[int] = None):
+        """寫入快取值
+
+        Args:
+            key: 快取鍵
+            value: 快取值（不可為 None）
+            generation: 開始計算 value 時的 generation；若期間快取已被清除則捨棄
+        """
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """清空快取（資料異動時呼叫）"""
+        with self._lock:
+            if self._entries:
+                cache_logger.debug(f"清除答案快取 ({len(self._entries)} 筆)")
+            self._entries.clear()
+            self.generation += 1
+            self.invalidations += 1
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] > time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """取得快取統計
+
+        Returns:
+            包含 size、hits、misses、hit_rate 等欄位的字典
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
@@ -0,0 +1,363 @@
+"""大量匯入 - 以串流解析與批次寫入匯入大型問答資料
+
+適用於觀光局資料等數萬到數十萬筆的問答匯入：
+1. 串流解析 JSON 陣列或 JSONL，不需把整個檔案載入記憶體
+2. UPSERT ... RETURNING id 取得問題與答案 id，不需再 SELECT
+3. 標籤與答案 id 快取在記憶體，關聯表以 executemany 批次寫入
+4. 使用 bulk_load 效能設定檔的專用連線，整批匯入在單一交易中完成；
+   匯入以 run_exclusive() 在資料庫的寫入執行緒上執行，期間其他寫入在佇列中等待
+5. 匯入期間暫停 FTS 同步觸發器，結束後只為受影響的問題重建 FTS
+"""
+
+import json
+import logging
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .database import FALLBACK_TAG, Database
+from .db_profile import PROFILES, apply_profile
+from .ngram_index import char_ngrams
+from .text_normalize import normalize_text
+
+# 設定日誌
+import_logger = logging.getLogger("core.bulk_import")
+
+# 串流解析每次讀取的字元數
+READ_CHUNK = 1 << 16
+# JSON 陣列格式錯誤（含檔案被截斷）時的錯誤訊息
+_MALFORMED_ARRAY = "JSON 陣列格式錯誤或檔案不完整"
+
+
+def iter_qa_records(path: str) -> Iterator[Dict[str, Any]]:
+    """串流讀取問答資料檔
+
+    依第一個非空白字元判斷格式：'[' 為 JSON 陣列，否則視為 JSONL（每行一筆）。
+
+    Args:
+        path: 資料檔路徑
+
+    Yields:
+        每一筆問答資料（dict）
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        head = ''
+        while True:
+            chunk = f.read(READ_CHUNK)
+            if not chunk:
+                return
+            head = chunk.lstrip()
+            if head:
+                break
+        if head[0] == '[':
+            yield from _iter_json_array(f, head[1:])
+        else:
+            for line_no, line in enumerate(_iter_lines(f, head), 1):
+                line = line.strip()
+                if line:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError as e:
+                        raise ValueError(f"{path} 第 {line_no} 行不是有效的 JSON: {e}") from e
+
+
+def _iter_lines(f, head: str) -> Iterator[str]:
+    """先輸出已讀取的開頭，再逐行讀取檔案其餘部分"""
+    buffer = head
+    for line in f:
+        buffer += line
+        if buffer.endswith('\n'):
+            yield from buffer.splitlines()
+            buffer = ''
+    if buffer:
+        yield from buffer.splitlines()
+
+
+def _iter_json_array(f, buffer: str) -> Iterator[Any]:
+    """逐一解析 JSON 陣列中的元素（buffer 為 '[' 之後已讀取的內容）
+
+    元素之間必須恰好有一個逗號，']' 之後只允許空白；
+    格式錯誤與檔案不完整一樣拋出 ValueError。
+    """
+    decoder = json.JSONDecoder()
+    eof = False
+    expect_item = True  # '[' 或 ',' 之後需要一個元素
+    first = True
+    while True:
+        buffer = buffer.lstrip()
+        if not buffer:
+            if eof:
+                raise ValueError(_MALFORMED_ARRAY)
+            buffer = f.read(READ_CHUNK)
+            eof = not buffer
+            continue
+        if buffer[0] == ']':
+            if expect_item and not first:
+                raise ValueError(_MALFORMED_ARRAY)  # 結尾多了一個逗號
+            _check_trailing(f, buffer[1:])
+            return
+        if not expect_item:
+            if buffer[0] != ',':
+                raise ValueError(_MALFORMED_ARRAY)
+            buffer = buffer[1:]
+            expect_item = True
+            continue
+        if buffer[0] == ',':
+            raise ValueError(_MALFORMED_ARRAY)  # 連續的逗號或 '[' 後直接接逗號
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise ValueError(_MALFORMED_ARRAY)
+            chunk = f.read(READ_CHUNK)
+            eof = not chunk
+            buffer += chunk
+            continue
+        # 元素剛好在緩衝區結尾時，數字等值可能被截斷，先多讀一段再確認
+        if end == len(buffer) and not eof:
+            chunk = f.read(READ_CHUNK)
+            eof = not chunk
+            if chunk:
+                buffer += chunk
+                continue
+        yield item
+        buffer = buffer[end:]
+        expect_item = first = False
+
+
+def _check_trailing(f, rest: str):
+    """確認陣列結尾的 ']' 之後只剩空白"""
+    while True:
+        if rest.strip():
+            raise ValueError(_MALFORMED_ARRAY)
+        rest = f.read(READ_CHUNK)
+        if not rest:
+            return
+
+
+def _record_tags(item: Dict[str, Any]) -> Optional[List[str]]:
+    """取出資料項的標籤：字串視為單一標籤，列表中只能有字串
+
+    Returns:
+        標籤列表（未指定時為空列表，之後依關鍵字自動產生）；格式錯誤時返回 None
+    """
+    tags = item.get('tags')
+    if tags is None:
+        return []
+    if isinstance(tags, str):
+        tags = [tags]
+    if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        return None
+    return [tag for tag in tags if tag.strip()]
+
+
+@dataclass
+class ImportStats:
+    """匯入結果統計"""
+    records: int = 0            # 讀取的資料筆數
+    inserted: int = 0           # 新增的問題數
+    updated: int = 0            # 已存在的問題數（更新關聯與標籤）
+    skipped: int = 0            # 缺少問題或答案、標籤格式錯誤（或不是物件）而略過的筆數
+    failed: int = 0             # 寫入失敗而回滾的筆數
+    seconds: float = 0.0        # 耗時
+    errors: List[Tuple[int, str]] = field(default_factory=list)  # (資料序號, 錯誤訊息)
+
+
+class BulkImporter:
+    """問答資料的大量匯入器"""
+
+    def __init__(self, db: Database, batch_size: int = 5000, default_priority: int = 100,
+                 progress: Optional[Callable[[ImportStats], None]] = None):
+        """初始化匯入器
+
+        Args:
+            db: 資料庫實例（用於資料庫路徑、關鍵字自動機與 FTS 觸發器定義）
+            batch_size: 關聯表與 n-gram 以 executemany 寫入的批次大小
+            default_priority: 資料未指定 priority 時的問答關聯優先級
+            progress: 每處理完一批時呼叫的回呼，參數為目前的統計
+        """
+        self.db = db
+        self.batch_size = batch_size
+        self.default_priority = default_priority
+        self.progress = progress
+
+    def import_file(self, path: str) -> ImportStats:
+        """匯入 JSON 陣列或 JSONL 檔案
+
+        Args:
+            path: 資料檔路徑
+
+        Returns:
+            匯入統計
+        """
+        import_logger.info(f"開始大量匯入: {path}")
+        return self.import_records(iter_qa_records(path))
+
+    def import_records(self, records: Iterable[Dict[str, Any]]) -> ImportStats:
+        """匯入問答資料
+
+        每筆資料需有 question 與 answer，可選 tags（標籤列表，未提供時依關鍵字自動產生）
+        與 priority。已存在的問題與答案會沿用原本的 id。
+
+        Args:
+            records: 問答資料（可為產生器）
+
+        Returns:
+            匯入統計
+        """
+        # 匯入需要自己的連線（bulk_load 設定檔、暫停觸發器、單一大交易），無法拆成佇列中的小寫入；
+        # 改為在寫入執行緒上獨佔執行，不與佇列中的寫入爭奪寫入鎖
+        return self.db.write_queue.run_exclusive(lambda: self._import(records)).result()
+
+    def _import(self, records: Iterable[Dict[str, Any]]) -> ImportStats:
+        """在寫入執行緒上執行匯入"""
+        started = time.perf_counter()
+        stats = ImportStats()
+        # 先在一般連線上編譯關鍵字自動機，匯入交易中不再另開連線
+        matcher = self.db.get_keyword_matcher()
+
+        conn = sqlite3.connect(self.db.db_path)
+        apply_profile(conn, PROFILES['bulk_load'])
+        try:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            max_question_id = cursor.execute('SELECT IFNULL(MAX(id), 0) FROM questions').fetchone()[0]
+            self._drop_deferred(cursor)
+
+            new_question_ids = set()
+            answer_ids: Dict[str, int] = {}
+            tag_ids: Dict[str, int] = dict(cursor.execute('SELECT name, id FROM tags'))
+            touched: List[Tuple[int]] = []
+            touched_answers: List[Tuple[int]] = []
+            question_answers: List[Tuple[int, int, int]] = []
+            question_tags: List[Tuple[int, int]] = []
+            answer_tags: List[Tuple[int, int]] = []
+            ngrams: List[Tuple[str, int, int]] = []
+            ngram_docs: List[Tuple[int, int]] = []
+
+            def flush():
+                cursor.executemany('INSERT OR IGNORE INTO question_answers (question_id, answer_id, priority) '
+                                   'VALUES (?, ?, ?)', question_answers)
+                cursor.executemany('INSERT OR IGNORE INTO question_tags (question_id, tag_id) VALUES (?, ?)',
+                                   question_tags)
+                cursor.executemany('INSERT OR IGNORE INTO answer_tags (answer_id, tag_id) VALUES (?, ?)',
+                                   answer_tags)
+                cursor.executemany('INSERT OR REPLACE INTO qa_ngrams (gram, question_id, tf) VALUES (?, ?, ?)',
+                                   ngrams)
+                cursor.executemany('INSERT INTO qa_ngram_docs (question_id, length) VALUES (?, ?) '
+                                   'ON CONFLICT(question_id) DO UPDATE SET length = excluded.length',
+                                   ngram_docs)
+                cursor.executemany('INSERT OR IGNORE INTO temp.bulk_touched (question_id) VALUES (?)', touched)
+                cursor.executemany('INSERT OR IGNORE INTO temp.bulk_touched_answers (answer_id) VALUES (?)',
+                                   touched_answers)
+                for rows in (question_answers, question_tags, answer_tags, ngrams, ngram_docs, touched,
+                             touched_answers):
+                    rows.clear()
+                if self.progress is not None:
+                    self.progress(stats)
+
+            cursor.execute('CREATE TEMP TABLE IF NOT EXISTS bulk_touched (question_id INTEGER PRIMARY KEY)')
+            cursor.execute('CREATE TEMP TABLE IF NOT EXISTS bulk_touched_answers (answer_id INTEGER PRIMARY KEY)')
+            cursor.execute('DELETE FROM temp.bulk_touched')
+            cursor.execute('DELETE FROM temp.bulk_touched_answers')
+
+            pending = 0
+            for item in records:
+                stats.records += 1
+                question_text = item.get('question', '') if isinstance(item, dict) else ''
+                answer_text = item.get('answer', '') if isinstance(item, dict) else ''
+                tags = _record_tags(item) if isinstance(item, dict) else None
+                if not question_text or not answer_text or tags is None:
+                    stats.skipped += 1
+                    import_logger.debug(f"跳過無效資料項: {item}")
+                    continue
+
+                question_norm = normalize_text(question_text)
+                question_id = cursor.execute('''
+                    INSERT INTO questions (content, content_norm) VALUES (?, ?)
+                    ON CONFLICT(content) DO UPDATE SET content_norm = excluded.content_norm
+                    RETURNING id
+                ''', (question_text, question_norm)).fetchone()[0]
+                if question_id > max_question_id and question_id not in new_question_ids:
+                    new_question_ids.add(question_id)
+                    stats.inserted += 1
+                    grams = char_ngrams(question_norm)
+                    ngrams.extend((gram, question_id, tf) for gram, tf in grams.items())
+                    ngram_docs.append((question_id, sum(grams.values())))
+                else:
+                    stats.updated += 1
+                touched.append((question_id,))
+
+                answer_id = answer_ids.get(answer_text)
+                if answer_id is None:
+                    answer_id = cursor.execute('''
+                        INSERT INTO answers (content) VALUES (?)
+                        ON CONFLICT(content) DO UPDATE SET content = excluded.content
+                        RETURNING id
+                    ''', (answer_text,)).fetchone()[0]
+                    answer_ids[answer_text] = answer_id
+                    touched_answers.append((answer_id,))
+                question_answers.append((question_id, answer_id, item.get('priority', self.default_priority)))
+
+                tags = tags or matcher.find_tags(question_text + " " + answer_text) or [FALLBACK_TAG]
+                for tag_name in tags:
+                    tag_id = tag_ids.get(tag_name)
+                    if tag_id is None:
+                        tag_id = cursor.execute('''
+                            INSERT INTO tags (name, name_norm) VALUES (?, ?)
+                            ON CONFLICT(name) DO UPDATE SET name_norm = excluded.name_norm
+                            RETURNING id
+                        ''', (tag_name, normalize_text(tag_name))).fetchone()[0]
+                        tag_ids[tag_name] = tag_id
+                    question_tags.append((question_id, tag_id))
+                    answer_tags.append((answer_id, tag_id))
+
+                pending += 1
+                if pending >= self.batch_size:
+                    flush()
+                    pending = 0
+            flush()
+
+            self._restore_deferred(cursor)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        stats.seconds = time.perf_counter() - started
+        import_logger.info(
+            f"大量匯入完成: 讀取 {stats.records} 筆, 新增 {stats.inserted}, 更新 {stats.updated}, "
+            f"略過 {stats.skipped} ({stats.seconds:.2f} 秒)"
+        )
+        self.db.notify_change()
+        return stats
+
+    def _drop_deferred(self, cursor: sqlite3.Cursor):
+        """移除 FTS 同步觸發器，匯入期間不逐筆重建 FTS"""
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_qa_fts_%'")
+        for (name,) in cursor.fetchall():
+            cursor.execute(f'DROP TRIGGER {name}')
+
+    def _restore_deferred(self, cursor: sqlite3.Cursor):
+        """重建 FTS 觸發器，並只為受影響的問題更新 FTS
+
+        答案新增的標籤會出現在所有連到該答案的問題（含不在這次匯入中的問題），
+        這些問題也一併重新索引，與 trg_qa_fts_atag_insert 的效果相同。
+        """
+        cursor.execute('''
+            INSERT OR IGNORE INTO temp.bulk_touched (question_id)
+            SELECT question_id FROM question_answers
+            WHERE answer_id IN (SELECT answer_id FROM temp.bulk_touched_answers)
+        ''')
+        cursor.execute('DELETE FROM qa_fts WHERE rowid IN (SELECT question_id FROM temp.bulk_touched)')
+        cursor.execute('''
+            INSERT INTO qa_fts (rowid, question, answer, tags)
+            SELECT rowid, question, answer, tags FROM qa_index_view
+            WHERE rowid IN (SELECT question_id FROM temp.bulk_touched)
+        ''')
+        cursor.execute('DROP TABLE temp.bulk_touched')
+        cursor.execute('DROP TABLE temp.bulk_touched_answers')
+        self.db._init_fts(cursor)
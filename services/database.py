@@ -1,181 +1,920 @@
 """SQLite 資料庫連線管理與初始化"""
+import gzip
+import os
+import shutil
 import sqlite3
-import json
 import logging
+import threading
+import time
+import weakref
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable, Union
 from contextlib import contextmanager
 
+from .text_normalize import normalize_text
+from .keyword_matcher import KeywordMatcher
+from .ngram_index import index_question_ngrams
+from .db_profile import PerformanceProfile, apply_profile, resolve_profile
+from .query_log import SLOW_QUERY_ENV, InstrumentedConnection, QueryRecorder
+
 # 設定日誌
 db_logger = logging.getLogger("core.database")
 
+# 預設的「標籤 → 關鍵字」對照，只在 tag_keywords 表第一次建立時寫入；
+# 之後以資料表為準，可透過 Database.add_tag_keywords 擴充
+DEFAULT_TAG_KEYWORDS = {
+    '阿里山': ['阿里山', '森林鐵路', '小火車'],
+    '日出': ['日出', '日落'],
+    '美食': ['美食', '火雞肉飯', '砂鍋魚頭', '餐廳'],
+    '購票': ['票', '買票', '訂票', '購票'],
+    '交通': ['車站', '火車站', '火車', '交通'],
+    '新手指南': ['第一次', '新手'],
+    '景點推薦': ['景點', '值得看', '觀光', '旅遊'],
+    '在地美食': ['餐廳', '在地'],
+}
+
+# 沒有命中任何關鍵字時使用的標籤
+FALLBACK_TAG = '一般'
+
+# 結構遷移步驟：(版本, 說明, Database 方法名稱)，依版本遞增執行。
+# 每個步驟都可在既有資料庫上重複執行（IF NOT EXISTS / 欄位檢查），
+# 因此尚未記錄版本的舊資料庫也能從 v0 開始補齊。
+SCHEMA_MIGRATIONS = [
+    (1, '基本資料表與索引', '_init_base_tables'),
+    (2, '正規化欄位與索引', '_init_normalized_columns'),
+    (3, '標籤關鍵字表', '_init_tag_keywords'),
+    (4, 'n-gram 倒排表', '_init_ngram_index'),
+    (5, 'FTS5 全文索引', '_init_fts'),
+    (6, '標籤使用次數統計表', '_init_tag_stats'),
+    (7, '關聯表的標籤索引', '_init_tag_link_indexes'),
+    (8, 'n-gram 文件統計', '_init_ngram_stats'),
+    (9, '問答關聯的答案索引', '_init_qa_answer_index'),
+    (10, 'n-gram 末字索引', '_init_ngram_suffix_index'),
+]
+SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
+
+# 啟用記憶體副本的環境變數（設為 1 時由副本提供唯讀查詢）
+REPLICA_ENV = 'QA_DB_REPLICA'
+
 class Database:
     """資料庫管理類別"""
 
-    def __init__(self, db_path: str = "chiayi_qa.db"):
+    def __init__(self, db_path: str = "chiayi_qa.db",
+                 profile: Union[str, PerformanceProfile, None] = None,
+                 replica: Optional[bool] = None, replica_check_interval: float = 1.0,
+                 slow_query_ms: Optional[float] = None):
         """初始化資料庫連線
 
         Args:
             db_path: SQLite 資料庫檔案路徑
+            profile: 效能設定檔名稱（default / read_heavy / bulk_load）或實例，
+                     None 時依環境變數 QA_DB_PROFILE 決定
+            replica: 是否將資料庫載入記憶體副本，由副本提供 read_connection 的查詢；
+                     None 時依環境變數 QA_DB_REPLICA 決定
+            replica_check_interval: 檢查其他連線是否修改主資料庫的最短間隔（秒）
+            slow_query_ms: 啟用查詢記錄並設定慢查詢門檻（毫秒）；None 時依環境變數
+                           QA_SLOW_QUERY_MS 決定，未設定則不記錄
         """
         self.db_path = db_path
-        db_logger.info(f"初始化資料庫: {db_path}")
+        self.profile = resolve_profile(profile)
+        self._change_listeners: List[Callable[[], None]] = []
+        self._keyword_matcher: Optional[KeywordMatcher] = None
+        # 連線池：每個執行緒保留一條長期連線，重複使用以省去開檔與頁面快取暖機
+        self._local = threading.local()
+        self._pool_lock = threading.Lock()
+        self._pool: List[tuple] = []  # (執行緒 weakref, 連線)
+        # 查詢記錄：啟用時所有連線都會計時每個語句
+        if slow_query_ms is None and os.getenv(SLOW_QUERY_ENV):
+            slow_query_ms = float(os.getenv(SLOW_QUERY_ENV))
+        self.query_recorder: Optional[QueryRecorder] = None
+        if slow_query_ms is not None:
+            self.query_recorder = QueryRecorder(slow_query_ms)
+        self._pool_stats = {'created': 0, 'closed': 0, 'acquired': 0, 'read_acquired': 0,
+                            'commits': 0, 'rollbacks': 0, 'replica_refreshes': 0}
+        # 記憶體副本：結構初始化完成後才啟用，第一次唯讀查詢時載入
+        if replica is None:
+            replica = os.getenv(REPLICA_ENV) == '1'
+        self.replica = False
+        self.replica_check_interval = replica_check_interval
+        self._replica_lock = threading.Lock()
+        self._replica_source: Optional[sqlite3.Connection] = None  # 讀取 data_version 與備份來源
+        self._replica_anchor: Optional[sqlite3.Connection] = None  # 讓目前的記憶體資料庫保持存在
+        self._replica_generation = 0
+        self._replica_version: Optional[tuple] = None
+        self._replica_stale = True
+        self._replica_checked = 0.0
+        # 寫入佇列：同一個資料庫的寫入都由單一執行緒執行，第一次使用時建立
+        self._write_queue = None
+        self._write_queue_lock = threading.Lock()
+        db_logger.info(f"初始化資料庫: {db_path} (效能設定檔: {self.profile.name})")
         self._init_database()
+        self.replica = replica
+        if replica:
+            db_logger.info("啟用記憶體副本，唯讀查詢不存取磁碟")
+
+    def add_change_listener(self, listener: Callable[[], None]):
+        """註冊資料異動通知（寫入提交後呼叫）
+
+        Args:
+            listener: 無參數的回呼函數
+        """
+        self._change_listeners.append(listener)
+
+    def remove_change_listener(self, listener: Callable[[], None]):
+        """取消資料異動通知"""
+        if listener in self._change_listeners:
+            self._change_listeners.remove(listener)
+
+    def notify_change(self):
+        """通知所有監聽者資料已異動（例如重建記憶體索引）"""
+        self._keyword_matcher = None
+        self._replica_stale = True
+        for listener in list(self._change_listeners):
+            try:
+                listener()
+            except Exception as e:
+                db_logger.error(f"資料異動通知失敗: {e}")
+
+    @property
+    def write_queue(self):
+        """此資料庫的寫入佇列（WriteQueue），所有服務共用同一個寫入執行緒"""
+        with self._write_queue_lock:
+            if self._write_queue is None:
+                from .writer import WriteQueue
+                self._write_queue = WriteQueue(self)
+            return self._write_queue
+
+    def _open(self, database: str, **kwargs) -> sqlite3.Connection:
+        """開啟連線；啟用查詢記錄時使用會計時每個語句的連線類別"""
+        if self.query_recorder is None:
+            return sqlite3.connect(database, check_same_thread=False, **kwargs)
+        conn = sqlite3.connect(database, check_same_thread=False, factory=InstrumentedConnection, **kwargs)
+        conn.recorder = self.query_recorder
+        return conn
+
+    def _connect(self) -> sqlite3.Connection:
+        """建立新連線（每個連線只設定一次）"""
+        # 連線只在建立它的執行緒使用；關閉已結束執行緒的連線時才會跨執行緒
+        conn = self._open(self.db_path)
+        conn.row_factory = sqlite3.Row  # 讓結果可以用欄位名稱存取
+        apply_profile(conn, self.profile)
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        """取得目前執行緒的連線，沒有則建立並加入連線池"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.depth = 0        # 巢狀使用的層數（含唯讀）
+            self._local.write_depth = 0  # 其中讀寫 context 的層數
+            with self._pool_lock:
+                self._prune_pool()
+                self._pool.append((weakref.ref(threading.current_thread()), conn))
+                self._pool_stats['created'] += 1
+            db_logger.debug(f"建立資料庫連線 ({threading.current_thread().name})")
+        return conn
+
+    def _prune_pool(self):
+        """關閉已結束執行緒留下的連線（呼叫端需持有 _pool_lock）"""
+        alive = []
+        for thread_ref, conn in self._pool:
+            thread = thread_ref()
+            if thread is not None and thread.is_alive():
+                alive.append((thread_ref, conn))
+            else:
+                conn.close()
+                self._pool_stats['closed'] += 1
+        self._pool = alive
 
     @contextmanager
     def get_connection(self):
-        """取得資料庫連線的 context manager"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # 讓結果可以用欄位名稱存取
+        """取得資料庫連線的 context manager（讀寫）
+
+        連線由目前執行緒重複使用；巢狀使用時由最外層的讀寫 context 負責提交或回滾。
+        """
+        conn = self._acquire()
+        self._local.depth += 1
+        self._local.write_depth += 1
+        self._pool_stats['acquired'] += 1
         try:
             yield conn
-            conn.commit()
-            db_logger.debug("資料庫交易提交成功")
+            if self._local.write_depth == 1:
+                conn.commit()
+                self._pool_stats['commits'] += 1
+                self._replica_stale = True
+                db_logger.debug("資料庫交易提交成功")
         except Exception as e:
-            conn.rollback()
-            db_logger.error(f"資料庫交易失敗，執行回滾: {e}")
+            if self._local.write_depth == 1:
+                conn.rollback()
+                self._pool_stats['rollbacks'] += 1
+                db_logger.error(f"資料庫交易失敗，執行回滾: {e}")
             raise e
         finally:
-            conn.close()
+            self._local.depth -= 1
+            self._local.write_depth -= 1
+
+    @contextmanager
+    def read_connection(self):
+        """取得唯讀用途的連線 context manager（不提交）
+
+        與 get_connection 共用同一條執行緒連線；只執行查詢時不需要提交交易。
+        啟用記憶體副本時改用副本連線（在讀寫 context 內仍使用主資料庫，才讀得到未提交的寫入）。
+        """
+        if self.replica and getattr(self._local, 'write_depth', 0) == 0:
+            self._pool_stats['read_acquired'] += 1
+            yield self._replica_connection()
+            return
+
+        conn = self._acquire()
+        self._local.depth += 1
+        self._pool_stats['read_acquired'] += 1
+        try:
+            yield conn
+        finally:
+            self._local.depth -= 1
+            # 不在外層寫入交易中時，確保沒有殘留的交易持有讀取鎖
+            if self._local.depth == 0 and conn.in_transaction:
+                conn.rollback()
+
+    def _replica_uri(self, generation: int) -> str:
+        """記憶體副本的共享快取 URI（每次重新載入使用新的名稱）"""
+        return f"file:qa_replica_{id(self)}_{generation}?mode=memory&cache=shared"
+
+    def _primary_version(self) -> tuple:
+        """主資料庫的異動標記：PRAGMA data_version 與資料庫、WAL 檔的修改時間"""
+        data_version = self._replica_source.execute('PRAGMA data_version').fetchone()[0]
+        mtimes = []
+        for path in (self.db_path, self.db_path + '-wal'):
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                mtimes.append(0)
+        return (data_version, *mtimes)
+
+    def _refresh_replica_if_changed(self):
+        """主資料庫有異動時重新載入記憶體副本
+
+        同行程的提交會立即標記副本過期；其他行程的寫入以 data_version 與檔案修改時間偵測，
+        最多每 replica_check_interval 秒檢查一次。
+        """
+        now = time.monotonic()
+        if not self._replica_stale and now - self._replica_checked < self.replica_check_interval:
+            return
+        with self._replica_lock:
+            if self._replica_source is None:
+                self._replica_source = sqlite3.connect(self.db_path, check_same_thread=False)
+            elif not self._replica_stale:
+                self._replica_checked = now
+                if self._primary_version() == self._replica_version:
+                    return
+            self._load_replica()
+
+    def _load_replica(self):
+        """以 backup API 將主資料庫複製到新的記憶體資料庫並切換（呼叫端需持有 _replica_lock）"""
+        started = time.perf_counter()
+        # 先清除過期標記並記錄版本，複製期間若有提交，下次查詢會再重新載入
+        self._replica_stale = False
+        self._replica_checked = time.monotonic()
+        version = self._primary_version()
+
+        generation = self._replica_generation + 1
+        anchor = sqlite3.connect(self._replica_uri(generation), uri=True, check_same_thread=False)
+        self._replica_source.backup(anchor)
+
+        # 舊副本仍被其他執行緒的連線使用時會保留到那些連線關閉
+        previous = self._replica_anchor
+        self._replica_anchor = anchor
+        self._replica_generation = generation
+        self._replica_version = version
+        if previous is not None:
+            previous.close()
+        self._pool_stats['replica_refreshes'] += 1
+        db_logger.info(f"記憶體副本已載入 (第 {generation} 版, {(time.perf_counter() - started) * 1000:.1f} ms)")
+
+    def _replica_connection(self) -> sqlite3.Connection:
+        """取得目前執行緒連到最新記憶體副本的連線（必要時先重新載入副本）"""
+        self._refresh_replica_if_changed()
+        conn = getattr(self._local, 'replica_conn', None)
+        if conn is not None and self._local.replica_generation == self._replica_generation:
+            return conn
+
+        with self._replica_lock:
+            # 持有鎖時連線，確保副本不會在連上前被替換而釋放
+            generation = self._replica_generation
+            new_conn = self._open(self._replica_uri(generation), uri=True)
+        new_conn.row_factory = sqlite3.Row
+        new_conn.execute('PRAGMA query_only = ON')
+        with self._pool_lock:
+            if conn is not None:
+                self._pool = [(ref, c) for ref, c in self._pool if c is not conn]
+                conn.close()
+                self._pool_stats['closed'] += 1
+            self._prune_pool()
+            self._pool.append((weakref.ref(threading.current_thread()), new_conn))
+            self._pool_stats['created'] += 1
+        self._local.replica_conn = new_conn
+        self._local.replica_generation = generation
+        return new_conn
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """取得連線池統計
+
+        Returns:
+            包含 open（目前連線數）、created、acquired、read_acquired 等欄位的字典
+        """
+        with self._pool_lock:
+            stats = dict(self._pool_stats)
+            stats['open'] = len(self._pool)
+        stats['replica_generation'] = self._replica_generation
+        acquisitions = stats['acquired'] + stats['read_acquired']
+        stats['reuse_rate'] = 1 - stats['created'] / acquisitions if acquisitions else 0.0
+        return stats
+
+    def snapshot(self, dest: str, compress: bool = False, pages: int = 256, step_sleep: float = 0.005,
+                 progress: Optional[Callable[[int, int], None]] = None) -> str:
+        """線上備份資料庫到單一檔案
+
+        使用 SQLite 的增量備份 API，每次複製 pages 頁後暫停 step_sleep 秒。
+        WAL 模式下備份只需讀取交易，不會阻擋查詢或寫入；已提交但尚未 checkpoint 的 WAL 內容
+        也會一併寫入，產生的檔案不需要 -wal / -shm 即可使用。
+        備份期間若有其他連線寫入，SQLite 會從頭重新複製，確保結果一致。
+
+        Args:
+            dest: 備份檔路徑（compress 時自動補上 .gz）
+            compress: 是否以 gzip 壓縮
+            pages: 每一步複製的頁數
+            step_sleep: 每一步之間暫停的秒數，讓出 I/O 給線上查詢
+            progress: 每一步後呼叫的回呼，參數為（剩餘頁數, 總頁數）
+
+        Returns:
+            備份檔路徑
+        """
+        if compress and not dest.endswith('.gz'):
+            dest += '.gz'
+        plain_path = dest[:-3] + '.tmp' if compress else dest + '.tmp'
+        started = time.perf_counter()
+
+        def on_step(status, remaining, total):
+            if progress is not None:
+                progress(remaining, total)
+            if remaining and step_sleep > 0:
+                time.sleep(step_sleep)
+
+        try:
+            source = sqlite3.connect(self.db_path)
+            target = sqlite3.connect(plain_path)
+            try:
+                source.backup(target, pages=pages, progress=on_step)
+                # 備份檔改為 rollback 日誌模式，成為不依賴 -wal 檔的單一檔案
+                target.execute('PRAGMA journal_mode = DELETE')
+                result = target.execute('PRAGMA quick_check').fetchone()[0]
+                if result != 'ok':
+                    raise sqlite3.DatabaseError(f"備份檔檢查失敗: {result}")
+            finally:
+                target.close()
+                source.close()
+
+            if compress:
+                with open(plain_path, 'rb') as src, gzip.open(dest + '.tmp', 'wb') as dst:
+                    shutil.copyfileobj(src, dst, 1 << 20)
+                os.remove(plain_path)
+            os.replace(dest + '.tmp', dest)
+        except Exception:
+            for path in {plain_path, dest + '.tmp'}:
+                if os.path.exists(path):
+                    os.remove(path)
+            raise
+
+        db_logger.info(f"資料庫備份完成: {dest} ({os.path.getsize(dest)} bytes, "
+                       f"{time.perf_counter() - started:.2f} 秒)")
+        return dest
+
+    def close(self):
+        """等待寫入佇列寫完並停止寫入執行緒，再關閉連線池中的所有連線（含記憶體副本）"""
+        with self._write_queue_lock:
+            write_queue, self._write_queue = self._write_queue, None
+        if write_queue is not None:
+            write_queue.close()
+        with self._pool_lock:
+            for _, conn in self._pool:
+                conn.close()
+                self._pool_stats['closed'] += 1
+            self._pool = []
+        with self._replica_lock:
+            for conn in (self._replica_anchor, self._replica_source):
+                if conn is not None:
+                    conn.close()
+            self._replica_anchor = self._replica_source = None
+            self._replica_stale = True
+        self._local = threading.local()
+        db_logger.info("資料庫連線池已關閉")
 
     def _init_database(self):
-        """初始化資料庫結構"""
+        """初始化資料庫結構：依 PRAGMA user_version 只套用尚未執行的遷移步驟
+
+        結構已是最新版本時只需讀取一次 user_version，不會取得寫入鎖。
+        """
+        with self.read_connection() as conn:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            db_logger.debug(f"資料庫結構已是最新版本 (v{version})")
+            return
+
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            for step_version, description, method in SCHEMA_MIGRATIONS:
+                # 每個步驟一個交易；取得寫入鎖後重新讀取版本，避免多個行程重複執行
+                cursor.execute('BEGIN IMMEDIATE')
+                current = cursor.execute('PRAGMA user_version').fetchone()[0]
+                if current >= step_version:
+                    conn.commit()
+                    continue
+                db_logger.info(f"套用資料庫遷移 v{step_version}: {description}")
+                getattr(self, method)(cursor)
+                cursor.execute(f'PRAGMA user_version = {step_version}')
+                conn.commit()
 
-            # 建立問題表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS questions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    content TEXT NOT NULL UNIQUE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-
-            # 建立答案表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS answers (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    content TEXT NOT NULL UNIQUE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-
-            # 建立標籤表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS tags (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL UNIQUE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-
-            # 建立問題-答案關聯表（多對多）
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS question_answers (
-                    question_id INTEGER,
-                    answer_id INTEGER,
-                    priority INTEGER DEFAULT 0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    PRIMARY KEY (question_id, answer_id),
-                    FOREIGN KEY (question_id) REFERENCES questions (id) ON DELETE CASCADE,
-                    FOREIGN KEY (answer_id) REFERENCES answers (id) ON DELETE CASCADE
-                )
-            ''')
-
-            # 建立問題-標籤關聯表（多對多）
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS question_tags (
-                    question_id INTEGER,
-                    tag_id INTEGER,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    PRIMARY KEY (question_id, tag_id),
-                    FOREIGN KEY (question_id) REFERENCES questions (id) ON DELETE CASCADE,
-                    FOREIGN KEY (tag_id) REFERENCES tags (id) ON DELETE CASCADE
-                )
-            ''')
-
-            # 建立答案-標籤關聯表（多對多）
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS answer_tags (
-                    answer_id INTEGER,
-                    tag_id INTEGER,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    PRIMARY KEY (answer_id, tag_id),
-                    FOREIGN KEY (answer_id) REFERENCES answers (id) ON DELETE CASCADE,
-                    FOREIGN KEY (tag_id) REFERENCES tags (id) ON DELETE CASCADE
-                )
-            ''')
-
-            # 建立索引以提升查詢效能
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_questions_content ON questions(content)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_tags_name ON tags(name)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_qa_priority ON question_answers(priority DESC)')
-
-            db_logger.info("資料庫結構初始化完成")
+            db_logger.info(f"資料庫結構初始化完成 (v{SCHEMA_VERSION})")
 
-    def migrate_from_json(self, json_path: str = "docs/qa.json"):
-        """從 JSON 檔案遷移資料到 SQLite
+    def schema_version(self) -> int:
+        """取得資料庫目前的結構版本（PRAGMA user_version）"""
+        with self.read_connection() as conn:
+            return conn.execute('PRAGMA user_version').fetchone()[0]
+
+    def _init_base_tables(self, cursor: sqlite3.Cursor):
+        """建立問題、答案、標籤與關聯表
 
         Args:
-            json_path: JSON 檔案路徑
+            cursor: 資料庫游標
         """
-        json_file = Path(json_path)
-        if not json_file.exists():
-            db_logger.error(f"JSON 檔案不存在: {json_path}")
-            raise FileNotFoundError(f"JSON 檔案不存在: {json_path}")
+        # 建立問題表
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS questions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                content TEXT NOT NULL UNIQUE,
+                content_norm TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # 建立答案表
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                content TEXT NOT NULL UNIQUE,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # 建立標籤表
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS tags (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL UNIQUE,
+                name_norm TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # 建立問題-答案關聯表（多對多）
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS question_answers (
+                question_id INTEGER,
+                answer_id INTEGER,
+                priority INTEGER DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (question_id, answer_id),
+                FOREIGN KEY (question_id) REFERENCES questions (id) ON DELETE CASCADE,
+                FOREIGN KEY (answer_id) REFERENCES answers (id) ON DELETE CASCADE
+            )
+        ''')
+
+        # 建立問題-標籤關聯表（多對多）
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS question_tags (
+                question_id INTEGER,
+                tag_id INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (question_id, tag_id),
+                FOREIGN KEY (question_id) REFERENCES questions (id) ON DELETE CASCADE,
+                FOREIGN KEY (tag_id) REFERENCES tags (id) ON DELETE CASCADE
+            )
+        ''')
+
+        # 建立答案-標籤關聯表（多對多）
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS answer_tags (
+                answer_id INTEGER,
+                tag_id INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (answer_id, tag_id),
+                FOREIGN KEY (answer_id) REFERENCES answers (id) ON DELETE CASCADE,
+                FOREIGN KEY (tag_id) REFERENCES tags (id) ON DELETE CASCADE
+            )
+        ''')
+
+        # 建立索引以提升查詢效能
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_questions_content ON questions(content)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_tags_name ON tags(name)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_qa_priority ON question_answers(priority DESC)')
+
+    def _init_normalized_columns(self, cursor: sqlite3.Cursor):
+        """建立正規化欄位（questions.content_norm、tags.name_norm）與索引
+
+        比對時以正規化欄位做等值查詢，才能使用索引而不必對每列呼叫 LOWER()。
+        舊資料庫會補上欄位，並回填尚未計算的列。
 
-        db_logger.info(f"開始從 {json_path} 遷移資料")
-        with open(json_file, 'r', encoding='utf-8') as f:
-            qa_data = json.load(f)
+        Args:
+            cursor: 資料庫游標
+        """
+        for table, column, source in (('questions', 'content_norm', 'content'), ('tags', 'name_norm', 'name')):
+            cursor.execute(f'PRAGMA table_info({table})')
+            if column not in {row[1] for row in cursor.fetchall()}:
+                cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} TEXT')
 
-        db_logger.info(f"讀取到 {len(qa_data)} 筆問答資料")
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table}({column})')
 
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            migrated_count = 0
+            cursor.execute(f'SELECT id, {source} FROM {table} WHERE {column} IS NULL')
+            rows = cursor.fetchall()
+            if rows:
+                cursor.executemany(f'UPDATE {table} SET {column} = ? WHERE id = ?',
+                                   [(normalize_text(text), row_id) for row_id, text in rows])
+                db_logger.info(f"回填 {table}.{column}: {len(rows)} 筆")
 
-            for item in qa_data:
-                question_text = item.get('question', '')
-                answer_text = item.get('answer', '')
+    def _init_ngram_index(self, cursor: sqlite3.Cursor):
+        """建立問題的字元 n-gram 倒排表，並為尚未索引的問題補建
 
-                if not question_text or not answer_text:
-                    db_logger.warning(f"跳過無效資料項: {item}")
-                    continue
+        Args:
+            cursor: 資料庫游標
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS qa_ngrams (
+                gram TEXT NOT NULL,
+                question_id INTEGER NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (gram, question_id),
+                FOREIGN KEY (question_id) REFERENCES questions (id) ON DELETE CASCADE
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS qa_ngram_docs (
+                question_id INTEGER PRIMARY KEY,
+                length INTEGER NOT NULL,
+                FOREIGN KEY (question_id) REFERENCES questions (id) ON DELETE CASCADE
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_qa_ngrams_question ON qa_ngrams(question_id)')
+        # 未啟用外鍵時 ON DELETE CASCADE 不會生效，以觸發器清除
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_qa_ngrams_question_delete
+            AFTER DELETE ON questions BEGIN
+                DELETE FROM qa_ngrams WHERE question_id = OLD.id;
+                DELETE FROM qa_ngram_docs WHERE question_id = OLD.id;
+            END
+        ''')
+
+        cursor.execute('''
+            SELECT id, content_norm FROM questions
+            WHERE id NOT IN (SELECT question_id FROM qa_ngram_docs)
+        ''')
+        rows = cursor.fetchall()
+        for question_id, content_norm in rows:
+            index_question_ngrams(cursor, question_id, content_norm or '')
+        if rows:
+            db_logger.info(f"補建 n-gram 索引: {len(rows)} 個問題")
+
+    def _init_ngram_suffix_index(self, cursor: sqlite3.Cursor):
+        """為 qa_ngrams 的 bigram 建立末字索引
+
+        單字查詢要找出「內容包含該字」的問題：以該字開頭的 gram 可用主鍵範圍查詢，
+        只出現在句尾的字則只存在於最後一個 bigram 的第二個字，需要這個部分索引。
+
+        Args:
+            cursor: 資料庫游標
+        """
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_qa_ngrams_suffix
+            ON qa_ngrams(substr(gram, 2), question_id) WHERE length(gram) = 2
+        ''')
 
-                # 插入或取得問題 ID
-                cursor.execute('INSERT OR IGNORE INTO questions (content) VALUES (?)', (question_text,))
-                cursor.execute('SELECT id FROM questions WHERE content = ?', (question_text,))
-                question_id = cursor.fetchone()[0]
+    def _init_ngram_stats(self, cursor: sqlite3.Cursor):
+        """建立 n-gram 文件數與總長度的單列統計表（qa_ngram_stats）與維護觸發器
 
-                # 插入或取得答案 ID
-                cursor.execute('INSERT OR IGNORE INTO answers (content) VALUES (?)', (answer_text,))
-                cursor.execute('SELECT id FROM answers WHERE content = ?', (answer_text,))
-                answer_id = cursor.fetchone()[0]
+        BM25 需要文件數與平均長度，直接讀取這一列，不必每次查詢都對 qa_ngram_docs 做 COUNT / AVG。
+        寫入 qa_ngram_docs 請使用 UPSERT（REPLACE 造成的隱含刪除不會觸發刪除觸發器）。
 
-                # 建立問題-答案關聯
+        Args:
+            cursor: 資料庫游標
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS qa_ngram_stats (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                doc_count INTEGER NOT NULL,
+                total_length INTEGER NOT NULL
+            )
+        ''')
+        triggers = {
+            'trg_qa_ngram_stats_insert': ('AFTER INSERT ON qa_ngram_docs',
+                                          'UPDATE qa_ngram_stats SET doc_count = doc_count + 1, '
+                                          'total_length = total_length + NEW.length WHERE id = 1;'),
+            'trg_qa_ngram_stats_delete': ('AFTER DELETE ON qa_ngram_docs',
+                                          'UPDATE qa_ngram_stats SET doc_count = doc_count - 1, '
+                                          'total_length = total_length - OLD.length WHERE id = 1;'),
+            'trg_qa_ngram_stats_update': ('AFTER UPDATE OF length ON qa_ngram_docs',
+                                          'UPDATE qa_ngram_stats SET '
+                                          'total_length = total_length + NEW.length - OLD.length WHERE id = 1;'),
+        }
+        for name, (event, body) in triggers.items():
+            cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body} END')
+
+        # 從既有資料計算初始值
+        cursor.execute('''
+            INSERT OR REPLACE INTO qa_ngram_stats (id, doc_count, total_length)
+            SELECT 1, COUNT(*), IFNULL(SUM(length), 0) FROM qa_ngram_docs
+        ''')
+
+    def _init_tag_keywords(self, cursor: sqlite3.Cursor):
+        """建立「關鍵字 → 標籤」對照表，第一次建立時寫入預設詞彙
+
+        Args:
+            cursor: 資料庫游標
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tag_keywords'")
+        exists = cursor.fetchone() is not None
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS tag_keywords (
+                keyword TEXT NOT NULL,
+                tag_id INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (keyword, tag_id),
+                FOREIGN KEY (tag_id) REFERENCES tags (id) ON DELETE CASCADE
+            )
+        ''')
+
+        if not exists:
+            for tag_name, keywords in DEFAULT_TAG_KEYWORDS.items():
+                self._insert_tag_keywords(cursor, tag_name, keywords)
+            db_logger.info(f"寫入預設標籤關鍵字: {len(DEFAULT_TAG_KEYWORDS)} 個標籤")
+
+    def _insert_tag_keywords(self, cursor: sqlite3.Cursor, tag_name: str, keywords: List[str]):
+        cursor.execute('INSERT OR IGNORE INTO tags (name, name_norm) VALUES (?, ?)',
+                       (tag_name, normalize_text(tag_name)))
+        cursor.execute('SELECT id FROM tags WHERE name = ?', (tag_name,))
+        tag_id = cursor.fetchone()[0]
+        cursor.executemany('INSERT OR IGNORE INTO tag_keywords (keyword, tag_id) VALUES (?, ?)',
+                           [(keyword, tag_id) for keyword in keywords])
+
+    def add_tag_keywords(self, tag_name: str, keywords: List[str]):
+        """為標籤新增關鍵字（標籤不存在時會建立），並重建關鍵字自動機
+
+        Args:
+            tag_name: 標籤名稱
+            keywords: 關鍵字列表
+        """
+        with self.get_connection() as conn:
+            self._insert_tag_keywords(conn.cursor(), tag_name, keywords)
+        db_logger.info(f"新增標籤關鍵字 {tag_name}: {keywords}")
+        self.notify_change()
+
+    def get_keyword_matcher(self) -> KeywordMatcher:
+        """取得由 tag_keywords 編譯的關鍵字自動機（資料異動後重新編譯）"""
+        matcher = self._keyword_matcher
+        if matcher is None:
+            with self.read_connection() as conn:
+                cursor = conn.cursor()
                 cursor.execute('''
-                    INSERT OR IGNORE INTO question_answers (question_id, answer_id, priority)
-                    VALUES (?, ?, ?)
-                ''', (question_id, answer_id, 100))
+                    SELECT k.keyword, t.name
+                    FROM tag_keywords k
+                    JOIN tags t ON t.id = k.tag_id
+                    ORDER BY t.id, k.keyword
+                ''')
+                matcher = KeywordMatcher(cursor.fetchall())
+            self._keyword_matcher = matcher
+            db_logger.debug(f"關鍵字自動機編譯完成: {len(matcher)} 個標籤")
+        return matcher
+
+    def _init_fts(self, cursor: sqlite3.Cursor):
+        """建立 FTS5 全文索引（qa_fts）、彙整視圖與同步觸發器
+
+        qa_fts 以問題 id 為 rowid，分別索引問題、答案與標籤文字，
+        使用 trigram 分詞器以支援沒有空白分隔的中文。
+        因為視圖內容會隨關聯表異動而改變，無法提供 external content 刪除時
+        所需的舊值，所以 qa_fts 自行保存內容，由觸發器整列重建。
+
+        Args:
+            cursor: 資料庫游標
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'qa_fts'")
+        fts_exists = cursor.fetchone() is not None
+
+        # 將「Q 內容、A 內容、Q 與 A 的標籤」彙整為每個問題一列
+        cursor.execute('''
+            CREATE VIEW IF NOT EXISTS qa_index_view AS
+            SELECT
+                q.id AS rowid,
+                q.content AS question,
+                IFNULL((
+                    SELECT GROUP_CONCAT(a.content, ' ')
+                    FROM question_answers qa
+                    JOIN answers a ON a.id = qa.answer_id
+                    WHERE qa.question_id = q.id
+                ), '') AS answer,
+                IFNULL((
+                    SELECT GROUP_CONCAT(t.name, ' ')
+                    FROM tags t
+                    WHERE t.id IN (
+                        SELECT qt.tag_id FROM question_tags qt WHERE qt.question_id = q.id
+                        UNION
+                        SELECT at.tag_id
+                        FROM question_answers qa
+                        JOIN answer_tags at ON at.answer_id = qa.answer_id
+                        WHERE qa.question_id = q.id
+                    )
+                ), '') AS tags
+            FROM questions q
+        ''')
+
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS qa_fts
+            USING fts5(question, answer, tags, tokenize='trigram')
+        ''')
+
+        # 依問題 id 重新索引的 SQL 片段，{ids} 為回傳問題 id 的子查詢
+        refresh = '''
+                DELETE FROM qa_fts WHERE rowid IN ({ids});
+                INSERT INTO qa_fts (rowid, question, answer, tags)
+                SELECT rowid, question, answer, tags FROM qa_index_view WHERE rowid IN ({ids});
+        '''
+        # 答案異動時依 answer_id 找出相關問題，需要 idx_qa_answer 才不必掃描整張關聯表
+        self._init_qa_answer_index(cursor)
+        by_answer = 'SELECT question_id FROM question_answers WHERE answer_id = {row}.answer_id'
+        triggers = {
+            'trg_qa_fts_question_insert': ('AFTER INSERT ON questions', refresh.format(ids='NEW.id')),
+            'trg_qa_fts_question_update': ('AFTER UPDATE OF content ON questions',
+                                           refresh.format(ids='NEW.id')),
+            'trg_qa_fts_question_delete': ('AFTER DELETE ON questions',
+                                           'DELETE FROM qa_fts WHERE rowid = OLD.id;'),
+            'trg_qa_fts_answer_update': ('AFTER UPDATE OF content ON answers',
+                                         refresh.format(ids='SELECT question_id FROM question_answers '
+                                                            'WHERE answer_id = NEW.id')),
+            'trg_qa_fts_qa_insert': ('AFTER INSERT ON question_answers',
+                                     refresh.format(ids='NEW.question_id')),
+            'trg_qa_fts_qa_delete': ('AFTER DELETE ON question_answers',
+                                     refresh.format(ids='OLD.question_id')),
+            'trg_qa_fts_qtag_insert': ('AFTER INSERT ON question_tags',
+                                       refresh.format(ids='NEW.question_id')),
+            'trg_qa_fts_qtag_delete': ('AFTER DELETE ON question_tags',
+                                       refresh.format(ids='OLD.question_id')),
+            'trg_qa_fts_atag_insert': ('AFTER INSERT ON answer_tags',
+                                       refresh.format(ids=by_answer.format(row='NEW'))),
+            'trg_qa_fts_atag_delete': ('AFTER DELETE ON answer_tags',
+                                       refresh.format(ids=by_answer.format(row='OLD'))),
+        }
+        for name, (event, body) in triggers.items():
+            cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body} END')
+
+        # 既有資料庫第一次建立 FTS 時，補建索引內容
+        if not fts_exists:
+            self._rebuild_fts(cursor)
+
+    def _init_tag_stats(self, cursor: sqlite3.Cursor):
+        """建立標籤使用次數統計表（tag_stats）與維護觸發器
+
+        列出標籤時直接讀取 tag_stats，不必每次對關聯表做 COUNT(DISTINCT)。
+        關聯表的主鍵保證同一組關聯只有一列，因此插入與刪除各加減 1 即可；
+        寫入關聯表請使用 INSERT OR IGNORE（REPLACE 造成的隱含刪除不會觸發刪除觸發器）。
+
+        Args:
+            cursor: 資料庫游標
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tag_stats'")
+        stats_exists = cursor.fetchone() is not None
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS tag_stats (
+                tag_id INTEGER PRIMARY KEY,
+                question_count INTEGER NOT NULL DEFAULT 0,
+                answer_count INTEGER NOT NULL DEFAULT 0,
+                FOREIGN KEY (tag_id) REFERENCES tags (id) ON DELETE CASCADE
+            )
+        ''')
+
+        # 關聯數加減的 SQL 片段
+        increment = '''
+                INSERT INTO tag_stats (tag_id, {column}) VALUES (NEW.tag_id, 1)
+                ON CONFLICT(tag_id) DO UPDATE SET {column} = {column} + 1;
+        '''
+        decrement = 'UPDATE tag_stats SET {column} = {column} - 1 WHERE tag_id = OLD.tag_id;'
+        triggers = {
+            'trg_tag_stats_tag_insert': ('AFTER INSERT ON tags',
+                                         'INSERT OR IGNORE INTO tag_stats (tag_id) VALUES (NEW.id);'),
+            'trg_tag_stats_tag_delete': ('AFTER DELETE ON tags',
+                                         'DELETE FROM tag_stats WHERE tag_id = OLD.id;'),
+            'trg_tag_stats_qtag_insert': ('AFTER INSERT ON question_tags',
+                                          increment.format(column='question_count')),
+            'trg_tag_stats_qtag_delete': ('AFTER DELETE ON question_tags',
+                                          decrement.format(column='question_count')),
+            'trg_tag_stats_atag_insert': ('AFTER INSERT ON answer_tags',
+                                          increment.format(column='answer_count')),
+            'trg_tag_stats_atag_delete': ('AFTER DELETE ON answer_tags',
+                                          decrement.format(column='answer_count')),
+        }
+        for name, (event, body) in triggers.items():
+            cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body} END')
+
+        # 既有資料庫第一次建立統計表時，從關聯表計算初始值
+        if not stats_exists:
+            self._rebuild_tag_stats(cursor)
+
+    def _init_tag_link_indexes(self, cursor: sqlite3.Cursor):
+        """為 question_tags、answer_tags 建立 tag_id 索引
+
+        兩表的主鍵以 question_id / answer_id 開頭，依標籤篩選
+        （標籤匹配、QAIndex 的標籤載入、get_questions_by_tag）原本只能掃描整張關聯表。
+
+        Args:
+            cursor: 資料庫游標
+        """
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_question_tags_tag ON question_tags(tag_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_answer_tags_tag ON answer_tags(tag_id)')
+
+    def _init_qa_answer_index(self, cursor: sqlite3.Cursor):
+        """為 question_answers 建立 (answer_id, priority) 索引
+
+        主鍵以 question_id 開頭，依答案查詢關聯（FTS 觸發器的 by_answer 子查詢、
+        標籤匹配取答案最高優先級）原本只能掃描整張關聯表。
+        新資料庫在建立 FTS 觸發器時一併建立；v9 為既有資料庫補建。
+
+        Args:
+            cursor: 資料庫游標
+        """
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_qa_answer ON question_answers(answer_id, priority)')
+
+    def _rebuild_tag_stats(self, cursor: sqlite3.Cursor):
+        """從關聯表重新計算整個 tag_stats"""
+        cursor.execute('DELETE FROM tag_stats')
+        cursor.execute('''
+            INSERT INTO tag_stats (tag_id, question_count, answer_count)
+            SELECT t.id, IFNULL(q.n, 0), IFNULL(a.n, 0)
+            FROM tags t
+            LEFT JOIN (SELECT tag_id, COUNT(*) AS n FROM question_tags GROUP BY tag_id) q ON q.tag_id = t.id
+            LEFT JOIN (SELECT tag_id, COUNT(*) AS n FROM answer_tags GROUP BY tag_id) a ON a.tag_id = t.id
+        ''')
+
+    def rebuild_tag_stats(self) -> int:
+        """重新計算標籤使用次數，修正與關聯表不一致的統計
+
+        Returns:
+            統計值有誤而被修正的標籤數
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            if not conn.in_transaction:
+                cursor.execute('BEGIN IMMEDIATE')
+            query = 'SELECT tag_id, question_count, answer_count FROM tag_stats'
+            before = {row[0]: tuple(row[1:]) for row in cursor.execute(query)}
+            self._rebuild_tag_stats(cursor)
+            after = {row[0]: tuple(row[1:]) for row in cursor.execute(query)}
+        drifted = sum(1 for tag_id in before.keys() | after.keys() if before.get(tag_id) != after.get(tag_id))
+        db_logger.info(f"標籤使用次數統計重建完成，修正 {drifted} 個標籤")
+        return drifted
+
+    def _rebuild_fts(self, cursor: sqlite3.Cursor):
+        """以 qa_index_view 重建整個 qa_fts 索引"""
+        cursor.execute('DELETE FROM qa_fts')
+        cursor.execute('''
+            INSERT INTO qa_fts (rowid, question, answer, tags)
+            SELECT rowid, question, answer, tags FROM qa_index_view
+        ''')
+        cursor.execute("INSERT INTO qa_fts (qa_fts) VALUES ('optimize')")
+        db_logger.info("FTS 全文索引重建完成")
+
+    def rebuild_fts(self):
+        """重建 FTS 全文索引（用於修復索引與資料不一致）"""
+        with self.get_connection() as conn:
+            self._rebuild_fts(conn.cursor())
 
-                # 自動產生標籤（基於內容關鍵字）
-                tags = self._extract_tags(question_text, answer_text)
-                for tag_name in tags:
-                    cursor.execute('INSERT OR IGNORE INTO tags (name) VALUES (?)', (tag_name,))
-                    cursor.execute('SELECT id FROM tags WHERE name = ?', (tag_name,))
-                    tag_id = cursor.fetchone()[0]
+    def migrate_from_json(self, json_path: str = "docs/qa.json"):
+        """從 JSON 檔案遷移資料到 SQLite
 
-                    # 關聯標籤到問題和答案
-                    cursor.execute('INSERT OR IGNORE INTO question_tags (question_id, tag_id) VALUES (?, ?)',
-                                 (question_id, tag_id))
-                    cursor.execute('INSERT OR IGNORE INTO answer_tags (answer_id, tag_id) VALUES (?, ?)',
-                                 (answer_id, tag_id))
+        以 BulkImporter 串流匯入（支援 JSON 陣列與 JSONL），問答關聯優先級為 100，
+        標籤依關鍵字自動產生。
 
-                migrated_count += 1
-                db_logger.debug(f"成功遷移問答對: {question_text[:30]}...")
+        Args:
+            json_path: JSON 檔案路徑
+        """
+        from .bulk_import import BulkImporter
 
-            db_logger.info(f"資料遷移完成，共遷移 {migrated_count} 筆問答對")
+        json_file = Path(json_path)
+        if not json_file.exists():
+            db_logger.error(f"JSON 檔案不存在: {json_path}")
+            raise FileNotFoundError(f"JSON 檔案不存在: {json_path}")
+
+        db_logger.info(f"開始從 {json_path} 遷移資料")
+        stats = BulkImporter(self, default_priority=100).import_file(str(json_file))
+        db_logger.info(f"資料遷移完成，共遷移 {stats.inserted + stats.updated} 筆問答對")
 
     def _extract_tags(self, question: str, answer: str) -> List[str]:
         """從問題和答案中提取標籤
@@ -187,28 +926,11 @@ class Database:
         Returns:
             標籤列表
         """
-        tags = []
-        content = question + " " + answer
-
-        # 關鍵字對應標籤
-        keyword_tags = {
-            ('阿里山', '森林鐵路', '小火車'): '阿里山',
-            ('日出',): '日出',
-            ('火雞肉飯', '砂鍋魚頭', '美食'): '美食',
-            ('票', '買票', '訂票', '購票'): '購票',
-            ('車站', '火車站'): '交通',
-            ('第一次', '新手'): '新手指南',
-            ('景點', '值得看'): '景點推薦',
-            ('餐廳', '在地'): '在地美食'
-        }
-
-        for keywords, tag in keyword_tags.items():
-            if any(keyword in content for keyword in keywords):
-                tags.append(tag)
+        tags = self.get_keyword_matcher().find_tags(question + " " + answer)
 
         # 如果沒有找到任何標籤，加入通用標籤
         if not tags:
-            tags.append('一般')
+            tags.append(FALLBACK_TAG)
 
         return tags
 
@@ -0,0 +1,99 @@
+"""SQLite 效能設定檔 - 每條連線建立時套用的 PRAGMA 組合
+
+依 spec/SQLite.md「效能與維運守則」：以 WAL 提升讀寫併發，搭配 synchronous=NORMAL、
+memory-map、較大的頁面快取與記憶體暫存表；busy_timeout 讓寫入鎖短暫佔用時讀寫端改為等待而非立即失敗。
+"""
+
+import logging
+import os
+import sqlite3
+from dataclasses import dataclass
+from typing import Dict, Union
+
+# 設定日誌
+profile_logger = logging.getLogger("core.db_profile")
+
+# 選擇設定檔的環境變數
+PROFILE_ENV = 'QA_DB_PROFILE'
+
+
+@dataclass(frozen=True)
+class PerformanceProfile:
+    """一組連線層級的 SQLite PRAGMA 設定"""
+    name: str
+    journal_mode: str = 'WAL'      # 日誌模式（資料庫層級，設定後持續生效）
+    synchronous: str = 'NORMAL'    # WAL 下 NORMAL 仍可保證一致性，只在斷電時可能遺失最後的交易
+    mmap_size: int = 64 * 1024 * 1024   # memory-map 大小（bytes），0 表示停用
+    cache_size: int = -16000       # 頁面快取；負值為 KiB
+    temp_store: str = 'MEMORY'     # 暫存表與排序使用記憶體
+    busy_timeout: int = 5000       # 遇到鎖時最多等待的毫秒數
+
+
+PROFILES: Dict[str, PerformanceProfile] = {
+    # 一般用途：WAL + 適中的快取
+    'default': PerformanceProfile(name='default'),
+    # 讀取為主（語音代理、MCP 伺服器）：較大的 memory-map 與頁面快取
+    'read_heavy': PerformanceProfile(
+        name='read_heavy',
+        mmap_size=256 * 1024 * 1024,
+        cache_size=-65536,
+    ),
+    # 大量匯入：不等待 fsync、放大快取，鎖等待時間拉長
+    'bulk_load': PerformanceProfile(
+        name='bulk_load',
+        synchronous='OFF',
+        mmap_size=0,
+        cache_size=-262144,
+        busy_timeout=30000,
+    ),
+}
+
+
+def resolve_profile(profile: Union[str, PerformanceProfile, None] = None) -> PerformanceProfile:
+    """取得效能設定檔
+
+    Args:
+        profile: 設定檔名稱或實例；None 時讀取環境變數 QA_DB_PROFILE，未設定則為 default
+
+    Returns:
+        PerformanceProfile 實例
+    """
+    if isinstance(profile, PerformanceProfile):
+        return profile
+    name = profile or os.getenv(PROFILE_ENV) or 'default'
+    if name not in PROFILES:
+        raise ValueError(f"未知的資料庫效能設定檔: {name}（可用: {', '.join(PROFILES)}）")
+    return PROFILES[name]
+
+
+def apply_profile(conn: sqlite3.Connection, profile: PerformanceProfile):
+    """將設定檔套用到連線
+
+    Args:
+        conn: 資料庫連線
+        profile: 效能設定檔
+    """
+    # 先設定 busy_timeout，切換日誌模式時若有其他連線持有鎖才會等待
+    conn.execute(f'PRAGMA busy_timeout = {int(profile.busy_timeout)}')
+    mode = conn.execute(f'PRAGMA journal_mode = {profile.journal_mode}').fetchone()[0]
+    if mode.upper() != profile.journal_mode.upper():
+        profile_logger.warning(f"無法切換日誌模式為 {profile.journal_mode}，目前為 {mode}")
+    conn.execute(f'PRAGMA synchronous = {profile.synchronous}')
+    conn.execute(f'PRAGMA mmap_size = {int(profile.mmap_size)}')
+    conn.execute(f'PRAGMA cache_size = {int(profile.cache_size)}')
+    conn.execute(f'PRAGMA temp_store = {profile.temp_store}')
+
+
+def describe_connection(conn: sqlite3.Connection) -> Dict[str, object]:
+    """讀取連線目前的 PRAGMA 值（除錯與確認設定用）
+
+    Args:
+        conn: 資料庫連線
+
+    Returns:
+        PRAGMA 名稱 → 目前值
+    """
+    return {
+        pragma: conn.execute(f'PRAGMA {pragma}').fetchone()[0]
+        for pragma in ('journal_mode', 'synchronous', 'mmap_size', 'cache_size', 'temp_store', 'busy_timeout')
+    }
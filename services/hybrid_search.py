@@ -0,0 +1,215 @@
+"""混合檢索 - 在行程內結合 BM25 全文檢索與向量檢索
+
+查詢時先以同義詞表擴充查詢，再同時執行 FTS5 bm25() 與向量索引搜尋，
+最後以 Reciprocal Rank Fusion（RRF）合併兩份排名，不需外部向量資料庫。
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .database import Database
+from .keyword_matcher import KeywordMatcher
+from .text_normalize import normalize_text
+from .vector_index import VectorIndex
+
+# 設定日誌
+hybrid_logger = logging.getLogger("core.hybrid_search")
+
+# RRF 常數：分數為 1 / (RRF_K + 名次)
+RRF_K = 60
+# 每一路檢索取回的候選數量
+HYBRID_CANDIDATES = 20
+# 向量檢索的最低餘弦相似度，低於此值的結果不參與排名
+HYBRID_MIN_SIMILARITY = 0.2
+
+# 同義詞表：標準名稱 → 其他說法（與 examples/livekit_agent 的 SYN_MAP 相同）
+DEFAULT_SYNONYMS: Dict[str, List[str]] = {
+    "阿里山森林鐵路": ["阿里山小火車", "森林小火車", "Alishan Forest Railway", "Alishan train"],
+    "阿里山": ["Alishan"],
+    "嘉義火車站": ["嘉義車站", "Chiayi Station", "Chiayi Railway Station"],
+    "文化路夜市": ["Wenhua Road Night Market", "文化夜市"],
+    "檜意森活村": ["Hinoki Village", "Hinoki Cultural Village"],
+    "北門驛": ["Beimen Station", "北門車站"],
+    "火雞肉飯": ["turkey rice"],
+    "砂鍋魚頭": ["fish head casserole"],
+    "日出": ["sunrise"],
+}
+
+
+@dataclass
+class HybridResult:
+    """混合檢索的結果（以答案為單位）"""
+    answer: str                          # 答案內容
+    answer_id: int                       # 答案 id
+    score: float                         # RRF 分數
+    question: str                        # 排名最好的相關問題
+    lexical_rank: Optional[int] = None   # 全文檢索名次（1 起算，未命中為 None）
+    vector_rank: Optional[int] = None    # 向量檢索名次（1 起算，未命中為 None）
+    priority: int = 0                    # 問答關聯的優先級
+    tags: List[str] = field(default_factory=list)  # 答案標籤
+
+
+class SynonymExpander:
+    """以同義詞表擴充查詢（比對方式與標籤關鍵字相同）"""
+
+    def __init__(self, synonyms: Dict[str, List[str]]):
+        """
+        Args:
+            synonyms: 標準名稱 → 其他說法
+        """
+        self.groups = {canonical: [canonical, *variants] for canonical, variants in synonyms.items()}
+        self._matcher = KeywordMatcher(
+            (term, canonical) for canonical, terms in self.groups.items() for term in terms
+        )
+
+    def expand(self, text: str) -> List[str]:
+        """找出查詢中出現的詞組，返回查詢裡還沒有的其他說法
+
+        Args:
+            text: 查詢文字
+
+        Returns:
+            擴充用的詞彙列表
+        """
+        text_norm = normalize_text(text)
+        expansions = []
+        for canonical in self._matcher.find_tags(text):
+            for term in self.groups[canonical]:
+                if normalize_text(term) not in text_norm:
+                    expansions.append(term)
+        return expansions
+
+
+def _fts_query(texts: Sequence[str]) -> str:
+    """將查詢與擴充詞彙轉成 trigram OR 查詢（英文依空白分詞，避免跨詞的 trigram）"""
+    grams = {}
+    for text in texts:
+        for token in text.split():
+            token = normalize_text(token, fold_variants=False)
+            for i in range(len(token) - 2):
+                grams.setdefault(token[i:i + 3])
+    return ' OR '.join('"' + gram.replace('"', '""') + '"' for gram in grams)
+
+
+class HybridRetriever:
+    """BM25 + 向量的混合檢索器"""
+
+    def __init__(self, db: Database, vectors: Optional[VectorIndex] = None,
+                 synonyms: Optional[Dict[str, List[str]]] = None,
+                 fts_weights: Tuple[float, float, float] = (5.0, 1.0, 2.0)):
+        """初始化檢索器
+
+        Args:
+            db: 資料庫實例
+            vectors: 向量索引，None 表示只使用全文檢索
+            synonyms: 同義詞表，預設為 DEFAULT_SYNONYMS
+            fts_weights: bm25() 的問題、答案、標籤欄位權重
+        """
+        self.db = db
+        self.vectors = vectors
+        self.expander = SynonymExpander(DEFAULT_SYNONYMS if synonyms is None else synonyms)
+        self.fts_weights = fts_weights
+        # 兩路檢索同時進行：SQLite 與 NumPy 在計算時都會釋放 GIL
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="hybrid-search")
+        if vectors is None:
+            hybrid_logger.info("未設定向量索引，混合檢索只使用全文檢索")
+
+    def _lexical(self, texts: List[str], limit: int) -> List[int]:
+        """FTS5 bm25() 排名，返回問題 id"""
+        query = _fts_query(texts)
+        if not query:
+            return []
+        weights = ', '.join(str(w) for w in self.fts_weights)
+        with self.db.read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT rowid FROM qa_fts
+                WHERE qa_fts MATCH ?
+                ORDER BY bm25(qa_fts, {weights})
+                LIMIT ?
+            ''', (query, limit))
+            return [row[0] for row in cursor.fetchall()]
+
+    def _semantic(self, texts: List[str], limit: int) -> List[int]:
+        """向量排名：查詢與每個擴充詞彙一起嵌入，取各問題的最高相似度"""
+        self.vectors.refresh_if_changed()
+        queries = self.vectors.embedder.embed(texts)
+        best: Dict[int, float] = {}
+        for hits in self.vectors.search_vectors(queries, limit, HYBRID_MIN_SIMILARITY):
+            for question_id, score in hits:
+                if score > best.get(question_id, -1.0):
+                    best[question_id] = score
+        return sorted(best, key=lambda question_id: (-best[question_id], question_id))[:limit]
+
+    def search(self, question: str, k: int = 5) -> List[HybridResult]:
+        """混合檢索
+
+        Args:
+            question: 查詢文字
+            k: 最多返回的答案數
+
+        Returns:
+            依 RRF 分數遞減的答案
+        """
+        texts = [question, *self.expander.expand(question)]
+        if len(texts) > 1:
+            hybrid_logger.debug(f"同義詞擴充: {texts[1:]}")
+        limit = max(k, HYBRID_CANDIDATES)
+
+        lexical_future = self._executor.submit(self._lexical, texts, limit)
+        semantic_ids = self._semantic(texts, limit) if self.vectors is not None else []
+        lexical_ids = lexical_future.result()
+
+        # question_id → (RRF 分數, 全文名次, 向量名次)
+        fused: Dict[int, List] = {}
+        for rank, question_id in enumerate(lexical_ids, 1):
+            fused.setdefault(question_id, [0.0, None, None])
+            fused[question_id][0] += 1.0 / (RRF_K + rank)
+            fused[question_id][1] = rank
+        for rank, question_id in enumerate(semantic_ids, 1):
+            fused.setdefault(question_id, [0.0, None, None])
+            fused[question_id][0] += 1.0 / (RRF_K + rank)
+            fused[question_id][2] = rank
+        if not fused:
+            return []
+
+        placeholders = ','.join('?' * len(fused))
+        with self.db.read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT qa.question_id, q.content, a.id, a.content, qa.priority, (
+                    SELECT GROUP_CONCAT(t.name, ',')
+                    FROM answer_tags at JOIN tags t ON t.id = at.tag_id
+                    WHERE at.answer_id = a.id
+                )
+                FROM question_answers qa
+                JOIN questions q ON q.id = qa.question_id
+                JOIN answers a ON a.id = qa.answer_id
+                WHERE qa.question_id IN ({placeholders})
+            ''', list(fused))
+            rows = cursor.fetchall()
+
+        # 每個答案保留分數最高的問題
+        best: Dict[int, HybridResult] = {}
+        for question_id, question_text, answer_id, answer, priority, tags in rows:
+            score, lexical_rank, vector_rank = fused[question_id]
+            current = best.get(answer_id)
+            if current is None or (score, priority or 0) > (current.score, current.priority):
+                best[answer_id] = HybridResult(
+                    answer=answer,
+                    answer_id=answer_id,
+                    score=score,
+                    question=question_text,
+                    lexical_rank=lexical_rank,
+                    vector_rank=vector_rank,
+                    priority=priority or 0,
+                    tags=tags.split(',') if tags else [],
+                )
+        results = sorted(best.values(), key=lambda r: (-r.score, -r.priority, r.answer_id))
+        return results[:k]
+
+    def close(self):
+        """關閉背景執行緒"""
+        self._executor.shutdown(wait=False)
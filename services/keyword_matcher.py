@@ -0,0 +1,83 @@
+"""關鍵字比對 - 以 Aho-Corasick 自動機將文字對應到標籤
+
+同一份「關鍵字 → 標籤」對照同時用於資料匯入時的自動標籤與查詢時的關鍵字擷取，
+比對時間只與文字長度（與命中數）成正比，不隨關鍵字數量增加。
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+from .text_normalize import normalize_text
+
+
+class KeywordMatcher:
+    """多關鍵字比對自動機（Aho-Corasick）"""
+
+    def __init__(self, keyword_tags: Iterable[Tuple[str, str]]):
+        """編譯自動機
+
+        Args:
+            keyword_tags: (關鍵字, 標籤名稱) 序列；關鍵字會先正規化，
+                          標籤依第一次出現的順序決定輸出順序
+        """
+        self.tags: List[str] = []
+        tag_order: Dict[str, int] = {}
+        # 狀態轉移、失敗連結與每個狀態命中的標籤
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        outputs: List[set] = [set()]
+        for keyword, tag in keyword_tags:
+            pattern = normalize_text(keyword)
+            if not pattern:
+                continue
+            if tag not in tag_order:
+                tag_order[tag] = len(self.tags)
+                self.tags.append(tag)
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    outputs.append(set())
+                state = nxt
+            outputs[state].add(tag_order[tag])
+
+        # 以 BFS 建立失敗連結，並把後綴狀態的輸出合併進來
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                outputs[nxt] |= outputs[self._fail[nxt]]
+        self._out = [tuple(sorted(tags)) for tags in outputs]
+
+    def find_tags(self, text: str) -> List[str]:
+        """找出文字中命中的所有標籤
+
+        Args:
+            text: 輸入文字（會先正規化）
+
+        Returns:
+            不重複的標籤名稱，依對照表中的標籤順序排列
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+        for ch in normalize_text(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return [self.tags[i] for i in sorted(found)]
+
+    def __len__(self) -> int:
+        return len(self.tags)
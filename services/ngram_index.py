@@ -0,0 +1,283 @@
+"""字元 n-gram 倒排索引 - 不需斷詞即可對中文問句做模糊比對
+
+問題的正規化內容切成 bigram 與 trigram，倒排列表存在 SQLite（qa_ngrams、qa_ngram_docs，
+文件數與總長度由觸發器維護在 qa_ngram_stats），
+載入後轉成緊湊的 numpy 陣列（CSR 格式）並以 BM25 計分，查詢時間只與命中的倒排列表長度成正比。
+"""
+
+import logging
+import math
+import sqlite3
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+# 設定日誌
+ngram_logger = logging.getLogger("core.ngram_index")
+
+# n-gram 長度
+NGRAM_SIZES = (2, 3)
+# BM25 參數
+BM25_K1 = 1.2
+BM25_B = 0.75
+# 作為匹配階段時的最低查詢涵蓋率與候選問題數
+NGRAM_MIN_COVERAGE = 0.3
+NGRAM_CANDIDATES = 10
+
+
+def char_ngrams(text: str) -> Counter:
+    """將（已正規化的）文字切成字元 n-gram 並計數
+
+    少於兩個字的文字以整段當作一個 gram，讓單字問題也能被索引。
+
+    Args:
+        text: 正規化後的文字
+
+    Returns:
+        gram → 出現次數
+    """
+    grams: Counter = Counter()
+    for n in NGRAM_SIZES:
+        for i in range(len(text) - n + 1):
+            grams[text[i:i + n]] += 1
+    if not grams and text:
+        grams[text] += 1
+    return grams
+
+
+def index_question_ngrams(cursor: sqlite3.Cursor, question_id: int, text_norm: str):
+    """寫入（或覆寫）單一問題的 n-gram 倒排資料
+
+    Args:
+        cursor: 資料庫游標
+        question_id: 問題 id
+        text_norm: 問題的正規化內容
+    """
+    grams = char_ngrams(text_norm)
+    cursor.execute('DELETE FROM qa_ngrams WHERE question_id = ?', (question_id,))
+    cursor.executemany('INSERT INTO qa_ngrams (gram, question_id, tf) VALUES (?, ?, ?)',
+                       [(gram, question_id, tf) for gram, tf in grams.items()])
+    cursor.execute('''
+        INSERT INTO qa_ngram_docs (question_id, length) VALUES (?, ?)
+        ON CONFLICT(question_id) DO UPDATE SET length = excluded.length
+    ''', (question_id, sum(grams.values())))
+
+
+def substring_subquery(text: str) -> Tuple[str, List[Any]]:
+    """產生「正規化內容包含 text」的問題 id 子查詢（text 為一到兩個字）
+
+    兩個字直接查詢該 bigram；單字則合併以該字開頭的 gram（主鍵範圍）
+    與以該字結尾的 bigram（idx_qa_ngrams_suffix）。少於兩個字的問題以整段為 gram，
+    也落在主鍵範圍內，因此結果與 content_norm LIKE '%text%' 相同，但不需掃描問題表。
+
+    Args:
+        text: 正規化後的查詢文字（一到兩個字）
+
+    Returns:
+        (子查詢 SQL, 參數)
+    """
+    if len(text) == 2:
+        return 'SELECT question_id FROM qa_ngrams WHERE gram = ?', [text]
+    if len(text) != 1:
+        raise ValueError(f"substring_subquery 只支援一到兩個字: {text!r}")
+    # UTF-8 的位元組順序與碼位一致，以該字開頭的字串都小於下一個碼位的字
+    return ('''
+        SELECT question_id FROM qa_ngrams WHERE gram >= ? AND gram < ?
+        UNION
+        SELECT question_id FROM qa_ngrams WHERE length(gram) = 2 AND substr(gram, 2) = ?
+    ''', [text, chr(ord(text) + 1), text])
+
+
+# qa_ngrams 資料列的結構化 dtype
+_POSTING_ROW = np.dtype([('gram', object), ('question_id', np.int64), ('tf', np.int64)])
+
+
+class NgramIndex:
+    """以 numpy 陣列保存的 n-gram 倒排索引，提供 BM25 排名"""
+
+    def __init__(self, doc_ids: np.ndarray, doc_lengths: np.ndarray, grams: Dict[str, int],
+                 offsets: np.ndarray, postings: np.ndarray, tfs: np.ndarray):
+        """請使用 NgramIndex.load() 建立"""
+        self.doc_ids = doc_ids          # 文件槽位 → 問題 id
+        self.doc_lengths = doc_lengths  # 文件槽位 → gram 總數
+        self.grams = grams              # gram → 詞彙槽位
+        self.offsets = offsets          # 詞彙槽位 → postings 起點（長度為詞彙數 + 1）
+        self.postings = postings        # 文件槽位（依 gram 分段）
+        self.tfs = tfs                  # 與 postings 對齊的詞頻
+        self.avg_length = float(doc_lengths.mean()) if len(doc_ids) else 0.0
+
+    @classmethod
+    def load(cls, cursor: sqlite3.Cursor) -> "NgramIndex":
+        """從 qa_ngrams / qa_ngram_docs 載入索引
+
+        倒排資料列以 np.fromiter 直接從游標讀成結構化陣列，槽位對應、gram 分段與 offsets
+        都以陣列運算完成，不在 Python 迴圈中逐列處理。
+
+        Args:
+            cursor: 資料庫游標
+
+        Returns:
+            NgramIndex 實例
+        """
+        cursor.execute('SELECT question_id, length FROM qa_ngram_docs ORDER BY question_id')
+        docs = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 2)
+        doc_ids = np.ascontiguousarray(docs[:, 0])
+        doc_lengths = docs[:, 1].astype(np.uint32)
+
+        # 主鍵 (gram, question_id) 讓這個查詢直接依 gram 順序讀出；
+        # np.fromiter 需要 tuple 資料列，暫時停用連線設定的 row_factory
+        row_factory, cursor.row_factory = cursor.row_factory, None
+        try:
+            cursor.execute('SELECT gram, question_id, tf FROM qa_ngrams ORDER BY gram, question_id')
+            rows = np.fromiter(cursor, dtype=_POSTING_ROW)
+        finally:
+            cursor.row_factory = row_factory
+        gram_column, question_ids, tfs = rows['gram'], rows['question_id'], rows['tf']
+
+        # 問題 id → 文件槽位；沒有文件資料的問題（寫入中途）略過
+        slots = np.searchsorted(doc_ids, question_ids)
+        known = slots < len(doc_ids)
+        known[known] = doc_ids[slots[known]] == question_ids[known]
+        if not known.all():
+            gram_column, slots, tfs = gram_column[known], slots[known], tfs[known]
+
+        # 依 gram 排序的資料中，gram 改變的位置即各倒排列表的起點
+        starts = np.flatnonzero(np.concatenate(([True], gram_column[1:] != gram_column[:-1])))
+        if not len(gram_column):
+            starts = starts[:0]
+        grams = dict(zip(gram_column[starts].tolist(), range(len(starts))))
+        offsets = np.append(starts, len(gram_column)).astype(np.uint32)
+
+        index = cls(doc_ids, doc_lengths, grams, offsets, slots.astype(np.uint32),
+                    np.minimum(tfs, 0xFFFF).astype(np.uint16))
+        ngram_logger.debug(f"n-gram 索引載入完成: {len(doc_ids)} 個問題, {len(grams)} 個 gram")
+        return index
+
+    def search(self, text_norm: str, k: int = 5, min_coverage: float = 0.0) -> List[Tuple[int, float]]:
+        """以 BM25 搜尋最相近的問題
+
+        涵蓋率為「文件命中的查詢 gram idf 總和 / 查詢所有 gram 的 idf 總和」，
+        用來排除只共用少數常見字的結果。
+
+        Args:
+            text_norm: 正規化後的查詢文字
+            k: 最多返回的問題數
+            min_coverage: 最低涵蓋率（0-1）
+
+        Returns:
+            [(問題 id, BM25 分數)]，依分數遞減
+        """
+        query = char_ngrams(text_norm)
+        if not len(self.doc_ids) or not query:
+            return []
+
+        # 依查詢 gram 的順序串接各倒排列表的貢獻，以 bincount 逐文件加總（加總順序與 _rank 相同）
+        n_docs = len(self.doc_ids)
+        k1, b, avg = BM25_K1, BM25_B, self.avg_length or 1.0
+        total_idf = 0.0
+        docs_parts, score_parts, idf_parts = [], [], []
+        for gram, qtf in query.items():
+            slot = self.grams.get(gram)
+            start, end = (int(self.offsets[slot]), int(self.offsets[slot + 1])) if slot is not None else (0, 0)
+            df = end - start
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            total_idf += idf * qtf
+            if not df:
+                continue
+            docs = self.postings[start:end]
+            tf = self.tfs[start:end].astype(np.float64)
+            norm = k1 * (1 - b + b * self.doc_lengths[docs] / avg)
+            docs_parts.append(docs)
+            score_parts.append(qtf * idf * tf * (k1 + 1) / (tf + norm))
+            idf_parts.append(np.full(df, idf * qtf))
+        if not docs_parts or not total_idf:
+            return []
+
+        slots, inverse = np.unique(np.concatenate(docs_parts), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+        matched = np.bincount(inverse, weights=np.concatenate(idf_parts))
+        keep = matched / total_idf >= min_coverage
+        slots, scores = slots[keep], scores[keep]
+        question_ids = self.doc_ids[slots]
+        order = np.lexsort((question_ids, -scores))[:k]
+        return list(zip(question_ids[order].tolist(), scores[order].tolist()))
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+
+def search_ngrams(cursor: sqlite3.Cursor, text_norm: str, k: int = 5,
+                  min_coverage: float = 0.0) -> List[Tuple[int, float]]:
+    """直接查詢資料表的 BM25 搜尋（不建立記憶體索引），計分與 NgramIndex.search 相同
+
+    Args:
+        cursor: 資料庫游標
+        text_norm: 正規化後的查詢文字
+        k: 最多返回的問題數
+        min_coverage: 最低涵蓋率（0-1）
+
+    Returns:
+        [(問題 id, BM25 分數)]，依分數遞減
+    """
+    query = char_ngrams(text_norm)
+    if not query:
+        return []
+    cursor.execute('SELECT doc_count, total_length FROM qa_ngram_stats WHERE id = 1')
+    row = cursor.fetchone()
+    if row is None or not row[0]:
+        return []
+    n_docs, avg_length = row[0], row[1] / row[0]
+
+    placeholders = ','.join('?' * len(query))
+    cursor.execute(f'''
+        SELECT g.gram, g.question_id, g.tf, d.length
+        FROM qa_ngrams g
+        JOIN qa_ngram_docs d ON d.question_id = g.question_id
+        WHERE g.gram IN ({placeholders})
+    ''', list(query))
+    by_gram: Dict[str, List[Tuple[int, int, int]]] = {}
+    for gram, question_id, tf, length in cursor.fetchall():
+        by_gram.setdefault(gram, []).append((question_id, tf, length))
+
+    def postings(gram: str):
+        rows = by_gram.get(gram, ())
+        return len(rows), rows
+
+    return _rank(query, n_docs, avg_length, postings, k, min_coverage)
+
+
+def _rank(query: Counter, n_docs: int, avg_length: float, postings, k: int,
+          min_coverage: float) -> List[Tuple[int, float]]:
+    """BM25 計分與涵蓋率過濾
+
+    Args:
+        query: 查詢的 gram → 次數
+        n_docs: 文件（問題）總數
+        avg_length: 平均文件長度
+        postings: gram → (df, [(問題 id, tf, 文件長度)]) 的函式
+        k: 最多返回的問題數
+        min_coverage: 最低涵蓋率（0-1）
+
+    Returns:
+        [(問題 id, BM25 分數)]，依分數遞減
+    """
+    scores: Dict[int, float] = {}
+    matched: Dict[int, float] = {}
+    total_idf = 0.0
+    k1, b, avg = BM25_K1, BM25_B, avg_length or 1.0
+    for gram, qtf in query.items():
+        df, docs = postings(gram)
+        idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+        total_idf += idf * qtf
+        for question_id, tf, length in docs:
+            norm = k1 * (1 - b + b * length / avg)
+            scores[question_id] = scores.get(question_id, 0.0) + qtf * idf * tf * (k1 + 1) / (tf + norm)
+            matched[question_id] = matched.get(question_id, 0.0) + idf * qtf
+
+    results = [
+        (question_id, score) for question_id, score in scores.items()
+        if total_idf and matched[question_id] / total_idf >= min_coverage
+    ]
+    results.sort(key=lambda item: (-item[1], item[0]))
+    return results[:k]
@@ -1,20 +1,97 @@
 """QA 問答服務模組 - 使用 SQLite 資料庫管理"""
 
+import heapq
 import logging
-from typing import Dict, List, Any, Optional, Tuple
-from .database import get_database
+import os
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterable, List, Any, Optional, Tuple
+from .database import Database, get_database
+from .qa_index import QAIndex, QACandidate
+from .answer_cache import AnswerCache
+from .text_normalize import normalize_text
+from .ngram_index import (NGRAM_CANDIDATES, NGRAM_MIN_COVERAGE, index_question_ngrams, search_ngrams,
+                          substring_subquery)
+from .vector_index import Embedder, VectorIndex, create_embedder
+from .hybrid_search import HybridResult, HybridRetriever
+from .bulk_import import ImportStats
+from .writer import WriteQueue
 import sqlite3
 
 # 設定日誌
 qa_logger = logging.getLogger("core.qa")
 
+# 找不到答案時的預設回應
+DEFAULT_ANSWER = "不好意思，我沒有理解您的問題。請問您想了解嘉義的哪方面資訊噢？"
+
+# 匹配階段的顯示名稱
+STAGE_LABELS = {
+    'exact': '精確匹配',
+    'partial': '部分匹配',
+    'fts': '全文檢索',
+    'ngram': 'n-gram 模糊匹配',
+    'semantic': '語意匹配',
+    'tag': '標籤匹配',
+}
+
+# FTS5 bm25() 欄位權重（問題、答案、標籤）
+FTS_WEIGHT_QUESTION = 5.0
+FTS_WEIGHT_ANSWER = 1.0
+FTS_WEIGHT_TAGS = 2.0
+# 全文檢索取回的候選數量與最低 trigram 涵蓋率
+FTS_CANDIDATES = 5
+FTS_MIN_COVERAGE = 0.5
+# 語意匹配取回的候選數量與最低餘弦相似度
+SEMANTIC_CANDIDATES = 5
+SEMANTIC_MIN_SCORE = 0.6
+
+
+def _strip_for_search(text: str) -> str:
+    """全文檢索用的正規化（FTS 索引的是原文，所以不做繁簡折疊）"""
+    return normalize_text(text, fold_variants=False)
+
+
+def _normalize_query(question: str) -> str:
+    """答案快取的鍵：與精確匹配相同的正規化文字"""
+    return normalize_text(question)
+
+
+def _trigrams(text: str) -> List[str]:
+    """將文字切成不重複的 trigram（保持出現順序）"""
+    return list(dict.fromkeys(text[i:i + 3] for i in range(len(text) - 2)))
+
 
 class QAService:
     """QA 服務類別，提供問答系統的 CRUD 操作"""
 
-    def __init__(self):
-        """初始化 QA 服務"""
-        self.db = get_database()
+    def __init__(self, use_index: bool = True, cache_size: int = 1024, cache_ttl: float = 300.0,
+                 embedder: Optional[Embedder] = None, quantize_vectors: bool = False,
+                 db: Optional[Database] = None):
+        """初始化 QA 服務
+
+        Args:
+            use_index: 是否以記憶體索引（QAIndex）回答 find_answer，
+                       關閉時每次查詢都直接存取資料庫
+            cache_size: 答案快取容量，0 表示停用快取
+            cache_ttl: 答案快取存活時間（秒）
+            embedder: 語意匹配使用的嵌入函式，None 表示不啟用語意匹配
+            quantize_vectors: 向量索引是否以 int8 量化保存
+            db: 資料庫實例，None 時使用共用的單例
+        """
+        self.db = db if db is not None else get_database()
+        self.index: Optional[QAIndex] = QAIndex(self.db) if use_index else None
+        self.vectors: Optional[VectorIndex] = None
+        if embedder is not None:
+            self.vectors = VectorIndex(self.db, embedder, quantize=quantize_vectors)
+        self._hybrid: Optional[HybridRetriever] = None
+        self.cache: Optional[AnswerCache] = None
+        if cache_size > 0:
+            self.cache = AnswerCache(max_size=cache_size, ttl=cache_ttl)
+            # 任何寫入都清除快取，避免編輯後仍回覆舊答案；
+            # 記憶體索引在背景重建，期間以舊快照算出的答案在新快照發布時再清除一次
+            self.db.add_change_listener(self.cache.clear)
+            if self.index is not None:
+                self.index.add_refresh_listener(self.cache.clear)
 
     def find_answer(self, question: str) -> str:
         """根據問題尋找最佳答案
@@ -25,70 +102,329 @@ class QAService:
         Returns:
             最相關的答案，如果找不到則返回預設回應
         """
+        question = ' '.join(question.split())
         qa_logger.info(f"查詢問題: {question}")
-        with self.db.get_connection() as conn:
-            cursor = conn.cursor()
+        if self.index is not None:
+            # 先確認其他行程是否有寫入，有的話會一併清除快取
+            self.index.refresh_if_changed()
+
+        cache_key = _normalize_query(question)
+        generation = None
+        if self.cache is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                qa_logger.info(f"命中答案快取: {cached[:50]}...")
+                return cached
+            generation = self.cache.generation
+
+        candidates = self._find_answers(question, 1)
+        if candidates:
+            best = candidates[0]
+            qa_logger.info(f"找到{STAGE_LABELS[best.stage]}答案 (分數: {best.score:.3f}): {best.answer[:50]}...")
+            answer = best.answer
+        else:
+            qa_logger.warning(f"找不到答案: {question}")
+            answer = DEFAULT_ANSWER
+        if self.cache is not None:
+            self.cache.put(cache_key, answer, generation)
+        return answer
 
-            # 1. 嘗試精確匹配
-            cursor.execute('''
-                SELECT a.content, qa.priority
+    def find_answers(self, question: str, k: int = 3) -> List[QACandidate]:
+        """根據問題返回排名前 k 的候選答案
+
+        精確、部分（或全文檢索）、n-gram、語意與標籤匹配在同一次記憶體掃描或同一個 SQL 查詢中計分，
+        排名依序比較匹配階段、階段內分數與優先級，第一名即為 find_answer 的答案。
+
+        Args:
+            question: 用戶的問題
+            k: 最多返回的候選數量
+
+        Returns:
+            候選答案列表（含匹配階段、分數、優先級與標籤），找不到則為空列表
+        """
+        question = ' '.join(question.split())
+        qa_logger.info(f"查詢候選答案 (k={k}): {question}")
+        if self.index is not None:
+            self.index.refresh_if_changed()
+        return self._find_answers(question, k)
+
+    def find_answers_batch(self, questions: List[str]) -> List[str]:
+        """批次查詢多個問題的最佳答案，結果與逐一呼叫 find_answer 相同
+
+        這是便利用的包裝（離線評估、快取預熱）：重複的問題只計算一次並共用答案快取，
+        語意匹配的查詢向量以一次矩陣乘法計算，資料庫路徑共用同一個連線；
+        其餘階段仍逐題計分，不重複的問題耗時與逐一呼叫相近。
+
+        Args:
+            questions: 問題列表
+
+        Returns:
+            與輸入順序對應的答案列表（找不到則為預設回應）
+        """
+        started = time.perf_counter()
+        cleaned = [' '.join(question.split()) for question in questions]
+        if self.index is not None:
+            self.index.refresh_if_changed()
+
+        # 有快取時 find_answer 以正規化文字為鍵，沒有快取時每個問題各自計算
+        keys = [_normalize_query(q) for q in cleaned] if self.cache is not None else cleaned
+        answers: Dict[str, str] = {}
+        pending: Dict[str, str] = {}
+        generation = None
+        if self.cache is not None:
+            generation = self.cache.generation
+        for key, question in zip(keys, cleaned):
+            if key in answers or key in pending:
+                continue
+            cached = self.cache.get(key) if self.cache is not None else None
+            if cached is not None:
+                answers[key] = cached
+            else:
+                pending[key] = question
+
+        pending_questions = list(pending.values())
+        semantic_hits: List[List[Tuple[int, float]]] = [[] for _ in pending_questions]
+        if self.vectors is not None and pending_questions:
+            self.vectors.refresh_if_changed()
+            rows = [i for i, question in enumerate(pending_questions) if question]
+            if rows:
+                queries = self.vectors.embedder.embed([pending_questions[i] for i in rows])
+                hits = self.vectors.search_vectors(queries, SEMANTIC_CANDIDATES, SEMANTIC_MIN_SCORE)
+                for i, row_hits in zip(rows, hits):
+                    semantic_hits[i] = row_hits
+
+        def resolve(search) -> None:
+            for (key, question), hits in zip(pending.items(), semantic_hits):
+                candidates = search(question, self._extract_keywords(question), hits)
+                answers[key] = candidates[0].answer if candidates else DEFAULT_ANSWER
+                if self.cache is not None:
+                    self.cache.put(key, answers[key], generation)
+
+        if self.index is not None:
+            resolve(lambda question, keywords, hits: self.index.search(question, keywords, 1, hits))
+        elif pending:
+            with self.db.read_connection() as conn:
+                cursor = conn.cursor()
+                resolve(lambda question, keywords, hits:
+                        self._find_answers_in_db(question, keywords, 1, hits, cursor))
+
+        qa_logger.info(
+            f"批次查詢 {len(questions)} 個問題 (不重複且未命中快取 {len(pending)} 個), "
+            f"耗時 {(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+        return [answers[key] for key in keys]
+
+    def hybrid_search(self, question: str, k: int = 5) -> List[HybridResult]:
+        """混合檢索：同義詞擴充後同時執行 BM25 全文檢索與向量檢索，以 RRF 合併排名
+
+        Args:
+            question: 用戶的問題
+            k: 最多返回的答案數量
+
+        Returns:
+            依 RRF 分數遞減的答案（含兩路檢索各自的名次）
+        """
+        question = ' '.join(question.split())
+        qa_logger.info(f"混合檢索 (k={k}): {question}")
+        if self._hybrid is None:
+            self._hybrid = HybridRetriever(
+                self.db, self.vectors,
+                fts_weights=(FTS_WEIGHT_QUESTION, FTS_WEIGHT_ANSWER, FTS_WEIGHT_TAGS),
+            )
+        return self._hybrid.search(question, k)
+
+    def _find_answers(self, question: str, k: int) -> List[QACandidate]:
+        keywords = self._extract_keywords(question)
+        semantic_hits: List[Tuple[int, float]] = []
+        if self.vectors is not None:
+            semantic_hits = self.vectors.search(question, SEMANTIC_CANDIDATES, SEMANTIC_MIN_SCORE)
+        if self.index is not None:
+            return self.index.search(question, keywords, k, semantic_hits)
+        return self._find_answers_in_db(question, keywords, k, semantic_hits)
+
+    def _find_answers_in_db(self, question: str, keywords: List[str], k: int,
+                            semantic_hits: List[Tuple[int, float]] = (),
+                            cursor: Optional[sqlite3.Cursor] = None) -> List[QACandidate]:
+        """以單一 SQL 查詢同時取回精確匹配、全文檢索、n-gram、語意與標籤匹配的候選
+
+        全文檢索以 trigram OR 查詢並依 bm25() 排名（問題欄位權重最高），
+        候選內容須涵蓋一定比例的查詢 trigram，避免只因零星字詞就命中。
+        少於三個字的問題無法組成 trigram（trigram 索引也不支援這麼短的 LIKE），
+        改由 qa_ngrams 的 bigram 倒排列表找出包含查詢的問題。n-gram 階段先從 qa_ngrams 算出 BM25 分數，
+        與向量索引的語意匹配結果一起以 VALUES 帶入同一個查詢取回答案。
+        傳入 cursor 時沿用該連線（批次查詢），否則自行開啟連線。
+        """
+        if cursor is None:
+            with self.db.read_connection() as conn:
+                return self._find_answers_in_db(question, keywords, k, semantic_hits, conn.cursor())
+
+        answer_tags = '''(
+            SELECT GROUP_CONCAT(t.name, ',')
+            FROM answer_tags at JOIN tags t ON t.id = at.tag_id
+            WHERE at.answer_id = a.id
+        )'''
+        parts = [f'''
+            SELECT 'exact', a.id, a.content, qa.priority, 1.0, q.content, NULL, {answer_tags}
+            FROM questions q
+            JOIN question_answers qa ON q.id = qa.question_id
+            JOIN answers a ON qa.answer_id = a.id
+            WHERE q.content_norm = ?
+        ''']
+        question_norm = normalize_text(question)
+        params: List[Any] = [question_norm]
+
+        text = _strip_for_search(question)
+        grams = _trigrams(text)
+        if grams:
+            parts.append(f'''
+                SELECT 'fts', a.id, a.content, qa.priority, -f.score, f.question,
+                       f.question || ' ' || f.answer || ' ' || f.tags, {answer_tags}
+                FROM (
+                    SELECT rowid, question, answer, tags,
+                           bm25(qa_fts, {FTS_WEIGHT_QUESTION}, {FTS_WEIGHT_ANSWER}, {FTS_WEIGHT_TAGS}) AS score
+                    FROM qa_fts
+                    WHERE qa_fts MATCH ?
+                    ORDER BY score
+                    LIMIT ?
+                ) f
+                JOIN question_answers qa ON qa.question_id = f.rowid
+                JOIN answers a ON a.id = qa.answer_id
+            ''')
+            params += [' OR '.join('"' + gram.replace('"', '""') + '"' for gram in grams),
+                       max(k, FTS_CANDIDATES)]
+        elif 0 < len(question_norm) < 3:
+            subquery, subquery_params = substring_subquery(question_norm)
+            parts.append(f'''
+                SELECT 'fts', a.id, a.content, qa.priority, 0.0, q.content, NULL, {answer_tags}
                 FROM questions q
                 JOIN question_answers qa ON q.id = qa.question_id
-                JOIN answers a ON qa.answer_id = a.id
-                WHERE LOWER(q.content) = LOWER(?)
-                ORDER BY qa.priority DESC
-                LIMIT 1
-            ''', (question,))
-            result = cursor.fetchone()
-            if result:
-                qa_logger.info(f"找到精確匹配答案: {result[0][:50]}...")
-                return result[0]
-
-            # 2. 嘗試部分匹配
-            cursor.execute('''
-                SELECT a.content, qa.priority,
-                       CASE
-                           WHEN LOWER(q.content) LIKE '%' || LOWER(?) || '%' THEN 2
-                           WHEN LOWER(?) LIKE '%' || LOWER(q.content) || '%' THEN 1
-                           ELSE 0
-                       END as match_score
-                FROM questions q
+                JOIN answers a ON a.id = qa.answer_id
+                WHERE q.id IN ({subquery})
+            ''')
+            params += subquery_params
+
+        if keywords:
+            placeholders = ','.join('?' * len(keywords))
+            parts.append(f'''
+                SELECT 'tag', a.id, a.content,
+                       (SELECT MAX(priority) FROM question_answers WHERE answer_id = a.id),
+                       COUNT(DISTINCT t.id), NULL, NULL, {answer_tags}
+                FROM tags t
+                JOIN answer_tags at ON t.id = at.tag_id
+                JOIN answers a ON at.answer_id = a.id
+                WHERE t.name_norm IN ({placeholders})
+                GROUP BY a.id, a.content
+            ''')
+            params += keywords
+
+        scored_hits = {
+            'ngram': search_ngrams(cursor, question_norm, NGRAM_CANDIDATES, NGRAM_MIN_COVERAGE),
+            'semantic': semantic_hits,
+        }
+        for stage, hits in scored_hits.items():
+            if not hits:
+                continue
+            parts.append(f'''
+                SELECT '{stage}', a.id, a.content, qa.priority, n.column2, q.content, NULL, {answer_tags}
+                FROM (VALUES {', '.join(['(?, ?)'] * len(hits))}) n
+                JOIN questions q ON q.id = n.column1
                 JOIN question_answers qa ON q.id = qa.question_id
-                JOIN answers a ON qa.answer_id = a.id
-                WHERE LOWER(q.content) LIKE '%' || LOWER(?) || '%'
-                   OR LOWER(?) LIKE '%' || LOWER(q.content) || '%'
-                ORDER BY match_score DESC, qa.priority DESC
-                LIMIT 1
-            ''', (question, question, question, question))
-            result = cursor.fetchone()
-            if result:
-                qa_logger.info(f"找到部分匹配答案 (匹配分數: {result[1]}): {result[0][:50]}...")
-                return result[0]
-
-            # 3. 嘗試標籤匹配
-            keywords = self._extract_keywords(question)
-            if keywords:
-                placeholders = ','.join('?' * len(keywords))
-                cursor.execute(f'''
-                    SELECT a.content, COUNT(DISTINCT t.id) as tag_count
-                    FROM tags t
-                    JOIN answer_tags at ON t.id = at.tag_id
-                    JOIN answers a ON at.answer_id = a.id
-                    WHERE LOWER(t.name) IN ({placeholders})
-                    GROUP BY a.id, a.content
-                    ORDER BY tag_count DESC
-                    LIMIT 1
-                ''', keywords)
-                result = cursor.fetchone()
-                if result:
-                    qa_logger.info(f"找到標籤匹配答案 (標籤數: {result[1]}): {result[0][:50]}...")
-                    return result[0]
+                JOIN answers a ON a.id = qa.answer_id
+            ''')
+            for question_id, score in hits:
+                params += [question_id, score]
+        cursor.execute(' UNION ALL '.join(parts), params)
+        rows = cursor.fetchall()
+
+        best: Dict[int, QACandidate] = {}
+        for stage, answer_id, answer, priority, score, matched, indexed, tags in rows:
+            if indexed is not None:
+                indexed = _strip_for_search(indexed)
+                coverage = sum(1 for gram in grams if gram in indexed) / len(grams)
+                if coverage < FTS_MIN_COVERAGE:
+                    continue
+            candidate = QACandidate(
+                answer=answer,
+                answer_id=answer_id,
+                stage=stage,
+                score=float(score),
+                priority=priority or 0,
+                tags=tags.split(',') if tags else [],
+                question=matched,
+            )
+            current = best.get(answer_id)
+            if current is None or candidate.sort_key() > current.sort_key():
+                best[answer_id] = candidate
+
+        return heapq.nlargest(k, best.values(), key=lambda c: (*c.sort_key(), -c.answer_id))
+
+    def _write_qa_pair(self, cursor: sqlite3.Cursor, question: str, answer: str,
+                       tags: Optional[List[str]], priority: int) -> bool:
+        """在目前交易中寫入一組問答對（不提交）
 
-            qa_logger.warning(f"找不到答案: {question}")
-            return "不好意思，我沒有理解您的問題。請問您想了解嘉義的哪方面資訊噢？"
+        Returns:
+            問題是否為新增（False 表示問題已存在，只更新關聯與標籤）
+        """
+        # 插入問題
+        question_norm = normalize_text(question)
+        cursor.execute('INSERT OR IGNORE INTO questions (content, content_norm) VALUES (?, ?)',
+                       (question, question_norm))
+        is_new_question = cursor.rowcount == 1
+        cursor.execute('SELECT id FROM questions WHERE content = ?', (question,))
+        question_id = cursor.fetchone()[0]
+        if is_new_question:
+            index_question_ngrams(cursor, question_id, question_norm)
+
+        # 插入答案
+        cursor.execute('INSERT OR IGNORE INTO answers (content) VALUES (?)', (answer,))
+        cursor.execute('SELECT id FROM answers WHERE content = ?', (answer,))
+        answer_id = cursor.fetchone()[0]
+
+        # 建立關聯
+        cursor.execute('''
+            INSERT OR REPLACE INTO question_answers (question_id, answer_id, priority)
+            VALUES (?, ?, ?)
+        ''', (question_id, answer_id, priority))
+
+        # 處理標籤
+        if tags:
+            for tag_name in tags:
+                cursor.execute('INSERT OR IGNORE INTO tags (name, name_norm) VALUES (?, ?)',
+                               (tag_name, normalize_text(tag_name)))
+                cursor.execute('SELECT id FROM tags WHERE name = ?', (tag_name,))
+                tag_id = cursor.fetchone()[0]
+
+                cursor.execute('INSERT OR IGNORE INTO question_tags (question_id, tag_id) VALUES (?, ?)',
+                             (question_id, tag_id))
+                cursor.execute('INSERT OR IGNORE INTO answer_tags (answer_id, tag_id) VALUES (?, ?)',
+                             (answer_id, tag_id))
+        return is_new_question
+
+    @property
+    def writer(self) -> WriteQueue:
+        """資料庫的寫入佇列（同一個 Database 的所有服務共用）"""
+        return self.db.write_queue
+
+    def submit_qa_pair(self, question: str, answer: str, tags: List[str] = None,
+                       priority: int = 50) -> Future:
+        """將新增問答對交給寫入佇列，不等待寫入完成
+
+        同一行程的寫入都由寫入佇列的單一執行緒執行並合併提交，不會互相爭奪寫入鎖。
+
+        Args:
+            question: 問題內容
+            answer: 答案內容
+            tags: 標籤列表
+            priority: 優先級（0-100）
+
+        Returns:
+            Future，提交後的結果為問題是否為新增；寫入失敗時帶有例外
+        """
+        qa_logger.info(f"排入新增問答對 - Q: {question[:30]}..., Tags: {tags}")
+        return self.writer.submit(lambda cursor: self._write_qa_pair(cursor, question, answer, tags, priority))
 
     def add_qa_pair(self, question: str, answer: str, tags: List[str] = None, priority: int = 50) -> bool:
-        """新增問答對
+        """新增問答對（經由寫入佇列，等待提交完成）
 
         Args:
             question: 問題內容
@@ -99,45 +435,93 @@ class QAService:
         Returns:
             是否新增成功
         """
-        qa_logger.info(f"新增問答對 - Q: {question[:30]}..., Tags: {tags}")
         try:
-            with self.db.get_connection() as conn:
-                cursor = conn.cursor()
-
-                # 插入問題
-                cursor.execute('INSERT OR IGNORE INTO questions (content) VALUES (?)', (question,))
-                cursor.execute('SELECT id FROM questions WHERE content = ?', (question,))
-                question_id = cursor.fetchone()[0]
-
-                # 插入答案
-                cursor.execute('INSERT OR IGNORE INTO answers (content) VALUES (?)', (answer,))
-                cursor.execute('SELECT id FROM answers WHERE content = ?', (answer,))
-                answer_id = cursor.fetchone()[0]
-
-                # 建立關聯
-                cursor.execute('''
-                    INSERT OR REPLACE INTO question_answers (question_id, answer_id, priority)
-                    VALUES (?, ?, ?)
-                ''', (question_id, answer_id, priority))
-
-                # 處理標籤
-                if tags:
-                    for tag_name in tags:
-                        cursor.execute('INSERT OR IGNORE INTO tags (name) VALUES (?)', (tag_name,))
-                        cursor.execute('SELECT id FROM tags WHERE name = ?', (tag_name,))
-                        tag_id = cursor.fetchone()[0]
-
-                        cursor.execute('INSERT OR IGNORE INTO question_tags (question_id, tag_id) VALUES (?, ?)',
-                                     (question_id, tag_id))
-                        cursor.execute('INSERT OR IGNORE INTO answer_tags (answer_id, tag_id) VALUES (?, ?)',
-                                     (answer_id, tag_id))
-
-                qa_logger.info(f"成功新增問答對: {question[:30]}...")
-                return True
+            self.submit_qa_pair(question, answer, tags, priority).result()
+            qa_logger.info(f"成功新增問答對: {question[:30]}...")
+            return True
         except Exception as e:
             qa_logger.error(f"新增問答對失敗: {e}")
             return False
 
+    def add_qa_pairs(self, pairs: Iterable[Dict[str, Any]], batch_size: int = 500,
+                     progress: Optional[Callable[[ImportStats], None]] = None) -> ImportStats:
+        """批次新增問答對
+
+        每批作為一筆操作交給寫入佇列，在寫入執行緒的交易中寫入並提交，交易時間短，
+        不會長時間佔住寫入鎖；每筆以 SAVEPOINT 包住，單筆失敗只回滾該筆並記錄錯誤，
+        不影響同批其他資料。資料在呼叫端的執行緒讀取，寫入執行緒只負責寫入。
+
+        Args:
+            pairs: 問答資料（可為產生器），每筆為含 question、answer，
+                   可選 tags 與 priority（預設 50）的字典
+            batch_size: 每個交易寫入的筆數
+            progress: 每批提交後呼叫的回呼，參數為目前的統計
+
+        Returns:
+            匯入統計（新增、更新、略過、失敗筆數與錯誤列表）
+        """
+        started = time.perf_counter()
+        stats = ImportStats()
+        iterator = iter(pairs)
+        exhausted = False
+        while not exhausted:
+            batch = 0
+            rows: List[Tuple[int, Dict[str, Any]]] = []  # (資料序號, 資料)
+            while batch < batch_size:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    exhausted = True
+                    break
+                batch += 1
+                stats.records += 1
+                question = item.get('question', '') if isinstance(item, dict) else ''
+                answer = item.get('answer', '') if isinstance(item, dict) else ''
+                if not question or not answer:
+                    stats.skipped += 1
+                    qa_logger.debug(f"跳過無效資料項: {item}")
+                    continue
+                rows.append((stats.records, item))
+
+            if rows:
+                results = self.writer.submit(lambda cursor, rows=rows: self._write_qa_batch(cursor, rows)).result()
+                for (record_no, _), result in zip(rows, results):
+                    if isinstance(result, Exception):
+                        stats.failed += 1
+                        stats.errors.append((record_no, str(result)))
+                    elif result:
+                        stats.inserted += 1
+                    else:
+                        stats.updated += 1
+            if progress is not None and batch:
+                progress(stats)
+
+        stats.seconds = time.perf_counter() - started
+        qa_logger.info(
+            f"批次新增問答對完成: 讀取 {stats.records} 筆, 新增 {stats.inserted}, 更新 {stats.updated}, "
+            f"略過 {stats.skipped}, 失敗 {stats.failed} ({stats.seconds:.2f} 秒)"
+        )
+        return stats
+
+    def _write_qa_batch(self, cursor: sqlite3.Cursor, rows: List[Tuple[int, Dict[str, Any]]]) -> List[Any]:
+        """在寫入執行緒上寫入一批問答對，每筆以 SAVEPOINT 包住
+
+        Returns:
+            與 rows 對齊的結果：問題是否為新增，或寫入失敗的例外
+        """
+        results: List[Any] = []
+        for record_no, item in rows:
+            cursor.execute('SAVEPOINT qa_pair')
+            try:
+                results.append(self._write_qa_pair(cursor, item['question'], item['answer'], item.get('tags'),
+                                                   item.get('priority', 50)))
+            except Exception as e:
+                cursor.execute('ROLLBACK TO qa_pair')
+                results.append(e)
+                qa_logger.warning(f"第 {record_no} 筆問答對寫入失敗: {e}")
+            cursor.execute('RELEASE qa_pair')
+        return results
+
     def get_questions_by_tag(self, tag_name: str) -> List[Dict[str, Any]]:
         """根據標籤獲取相關問題
 
@@ -148,15 +532,15 @@ class QAService:
             相關問題列表
         """
         qa_logger.debug(f"搜尋標籤: {tag_name}")
-        with self.db.get_connection() as conn:
+        with self.db.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT DISTINCT q.id, q.content
                 FROM questions q
                 JOIN question_tags qt ON q.id = qt.question_id
                 JOIN tags t ON qt.tag_id = t.id
-                WHERE LOWER(t.name) = LOWER(?)
-            ''', (tag_name,))
+                WHERE t.name_norm = ?
+            ''', (normalize_text(tag_name),))
 
             results = [{'id': row[0], 'content': row[1]} for row in cursor.fetchall()]
             qa_logger.info(f"找到 {len(results)} 個標籤 '{tag_name}' 相關問題")
@@ -168,16 +552,14 @@ class QAService:
         Returns:
             標籤列表，格式為 [(標籤名, 使用次數)]
         """
-        with self.db.get_connection() as conn:
+        with self.db.read_connection() as conn:
             cursor = conn.cursor()
+            # tag_stats 由觸發器隨關聯表異動維護，只需讀取每個標籤一列
             cursor.execute('''
-                SELECT t.name,
-                       COUNT(DISTINCT qt.question_id) + COUNT(DISTINCT at.answer_id) as usage_count
-                FROM tags t
-                LEFT JOIN question_tags qt ON t.id = qt.tag_id
-                LEFT JOIN answer_tags at ON t.id = at.tag_id
-                GROUP BY t.id, t.name
-                ORDER BY usage_count DESC
+                SELECT t.name, s.question_count + s.answer_count AS usage_count
+                FROM tag_stats s
+                JOIN tags t ON t.id = s.tag_id
+                ORDER BY usage_count DESC, t.id
             ''')
 
             return cursor.fetchall()
@@ -192,7 +574,7 @@ class QAService:
             相關問題列表
         """
         qa_logger.debug(f"搜尋關鍵字: {keyword}")
-        with self.db.get_connection() as conn:
+        with self.db.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT q.id, q.content, GROUP_CONCAT(t.name, ', ') as tags
@@ -217,28 +599,15 @@ class QAService:
     def _extract_keywords(self, text: str) -> List[str]:
         """從文字中提取關鍵字
 
+        使用與資料匯入自動標籤相同的關鍵字自動機（tag_keywords 表）。
+
         Args:
             text: 輸入文字
 
         Returns:
-            關鍵字列表
+            關鍵字列表（已正規化，可直接比對 tags.name_norm）
         """
-        keywords = []
-        keyword_map = {
-            '阿里山': ['阿里山', '森林鐵路', '小火車'],
-            '日出': ['日出', '日落'],
-            '美食': ['美食', '火雞肉飯', '砂鍋魚頭', '餐廳'],
-            '購票': ['票', '買票', '訂票', '購票'],
-            '交通': ['車站', '火車', '交通'],
-            '景點': ['景點', '觀光', '旅遊']
-        }
-
-        text_lower = text.lower()
-        for tag, words in keyword_map.items():
-            if any(word in text_lower for word in words):
-                keywords.append(tag.lower())
-
-        return keywords
+        return [normalize_text(tag) for tag in self.db.get_keyword_matcher().find_tags(text)]
 
 
 # 保持向後相容的函數介面
@@ -249,7 +618,8 @@ def get_qa_service() -> QAService:
     global _qa_service
     if _qa_service is None:
         qa_logger.info("建立 QA 服務單例實例")
-        _qa_service = QAService()
+        # QA_EMBEDDER：sentence-transformers 模型名稱或 "hashing"，未設定則不啟用語意匹配
+        _qa_service = QAService(embedder=create_embedder(os.getenv('QA_EMBEDDER')))
     return _qa_service
 
 
@@ -277,7 +647,7 @@ def get_all_questions(qa_file_path: str = None) -> List[str]:
         所有問題的列表
     """
     service = get_qa_service()
-    with service.db.get_connection() as conn:
+    with service.db.read_connection() as conn:
         cursor = conn.cursor()
         cursor.execute('SELECT content FROM questions ORDER BY created_at DESC')
         return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,380 @@
+"""QA 記憶體索引 - 將資料庫內容編譯成記憶體結構，供即時語音路徑快速查詢
+
+SQLite 仍是唯一的資料來源；QAIndex 在啟動時從資料表建立索引，
+資料庫異動後在背景執行緒整份重建、以單一參考替換，重建期間查詢繼續使用舊快照，
+查詢時完全不需存取資料庫。
+"""
+
+import heapq
+import logging
+import sqlite3
+import threading
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .database import Database
+from .ngram_index import NGRAM_CANDIDATES, NGRAM_MIN_COVERAGE, NgramIndex
+from .text_normalize import normalize_text
+
+# 設定日誌
+index_logger = logging.getLogger("core.qa_index")
+
+
+@dataclass(frozen=True)
+class _IndexSnapshot:
+    """某一時間點的索引內容（建立後不再修改）"""
+    answers: Tuple[str, ...]                    # 答案內容，以答案槽位存取
+    answer_ids: array                           # 答案槽位 → 答案 id
+    answer_priority: array                      # 答案槽位 → 關聯中的最高優先級
+    answer_tags: Tuple[Tuple[str, ...], ...]    # 答案槽位 → 標籤名稱
+    questions: Tuple[str, ...]                  # 正規化問題內容，以問題槽位存取
+    question_texts: Tuple[str, ...]             # 原始問題內容，以問題槽位存取
+    question_answers: Tuple[Tuple[Tuple[int, int], ...], ...]  # 問題槽位 → (優先級, 答案槽位)，優先級遞減
+    exact: Dict[str, Tuple[int, ...]]           # 正規化問題內容 → 問題槽位
+    question_lengths: Tuple[int, ...]           # 所有問題長度（去重、遞增）
+    grams: Dict[str, array]                     # trigram → 問題槽位（遞增）
+    chars: Dict[str, array]                     # 單字 → 問題槽位（遞增），供短查詢使用
+    tag_answers: Dict[str, array]               # 正規化標籤名稱 → 答案槽位
+    ngrams: NgramIndex                          # 字元 n-gram BM25 索引
+    question_slots: Dict[int, int]              # 問題 id → 問題槽位
+
+
+def _trigrams(text: str) -> List[str]:
+    """將文字切成不重複的 trigram"""
+    return list(dict.fromkeys(text[i:i + 3] for i in range(len(text) - 2)))
+
+
+def _intersect(postings: List[array]) -> List[int]:
+    """取多個遞增槽位陣列的交集，從最短的開始"""
+    postings = sorted(postings, key=len)
+    result = set(postings[0])
+    for posting in postings[1:]:
+        result.intersection_update(posting)
+        if not result:
+            break
+    return sorted(result)
+
+
+# 各匹配階段的排名（數字越大越優先），對應原本依序嘗試的順序
+STAGE_RANKS = {'exact': 5, 'partial': 4, 'fts': 4, 'ngram': 3, 'semantic': 2, 'tag': 1}
+
+
+@dataclass
+class QACandidate:
+    """find_answers 的候選答案"""
+    answer: str                     # 答案內容
+    answer_id: int                  # 答案 id
+    stage: str                      # 匹配階段：exact / partial / fts / ngram / semantic / tag
+    score: float                    # 階段內分數（越大越相關）
+    priority: int                   # 問答關聯的優先級
+    tags: List[str] = field(default_factory=list)  # 答案標籤
+    question: Optional[str] = None  # 命中的問題內容（標籤匹配時為 None）
+
+    def sort_key(self) -> Tuple[int, float, int]:
+        """排序鍵：先比階段，再比分數與優先級"""
+        return STAGE_RANKS[self.stage], self.score, self.priority
+
+
+class QAIndex:
+    """QA 記憶體索引，以單次記憶體掃描提供精確、部分、n-gram 與標籤匹配"""
+
+    def __init__(self, db: Database, check_interval: float = 1.0):
+        """初始化並建立索引
+
+        Args:
+            db: 資料庫實例
+            check_interval: 檢查其他連線是否修改資料庫的最短間隔（秒）
+        """
+        self.db = db
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_check = 0.0
+        # 背景重建進行中時清除，重建結束（含失敗）時設定
+        self._idle = threading.Event()
+        self._idle.set()
+        self._refresh_listeners: List[Callable[[], None]] = []
+        # 專用連線只用來讀取 PRAGMA data_version，偵測其他連線（含其他行程）的提交
+        self._watch_conn = sqlite3.connect(db.db_path, check_same_thread=False)
+        self._data_version: Optional[int] = None
+        self._mark_built()
+        self._snapshot = self._build()
+        db.add_change_listener(self._mark_dirty)
+
+    def _mark_dirty(self):
+        """資料庫異動通知，下次查詢時開始重建索引"""
+        self._dirty = True
+
+    def _read_data_version(self) -> int:
+        return self._watch_conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def add_refresh_listener(self, listener: Callable[[], None]):
+        """註冊新快照發布通知（背景重建完成、開始以新內容回答時呼叫）
+
+        重建期間的查詢仍以舊快照回答，依查詢結果建立的快取應在此時清除。
+
+        Args:
+            listener: 無參數的回呼函數
+        """
+        self._refresh_listeners.append(listener)
+
+    def refresh_if_changed(self):
+        """若資料庫已異動則在背景重建索引，不等待重建完成
+
+        同行程內的寫入透過 Database 的異動通知立即觸發；
+        其他行程的寫入則以 PRAGMA data_version 偵測，最多每 check_interval 秒檢查一次。
+        重建完成前查詢繼續使用舊快照。
+        """
+        now = time.monotonic()
+        if not self._dirty and now - self._last_check < self.check_interval:
+            return
+
+        with self._lock:
+            self._last_check = now
+            if not self._idle.is_set():
+                # 重建中：結束時若又有異動會再重建一次
+                return
+            if not self._dirty:
+                if self._read_data_version() == self._data_version:
+                    return
+                # 其他連線寫入：轉發給行程內的其他監聽者（例如答案快取）
+                index_logger.info("偵測到資料庫外部異動，重建 QA 記憶體索引")
+                self.db.notify_change()
+            self._idle.clear()
+        threading.Thread(target=self._rebuild_in_background, name='qa-index-rebuild', daemon=True).start()
+
+    def wait_until_fresh(self, timeout: Optional[float] = None) -> bool:
+        """開始需要的重建並等待完成，供寫入後需要立即查到新內容的呼叫端使用
+
+        Args:
+            timeout: 最長等待秒數，None 表示一直等待
+
+        Returns:
+            是否已沒有進行中的重建
+        """
+        self.refresh_if_changed()
+        return self._idle.wait(timeout)
+
+    def rebuild(self):
+        """強制重建索引並等待完成"""
+        self._dirty = True
+        self.wait_until_fresh()
+
+    def _rebuild_in_background(self):
+        """重建並發布快照，直到重建期間沒有新的異動"""
+        try:
+            while True:
+                self._mark_built()
+                snapshot = self._build()
+                # 一次指派發布新的快照，查詢中的執行緒繼續使用舊快照
+                self._snapshot = snapshot
+                for listener in list(self._refresh_listeners):
+                    try:
+                        listener()
+                    except Exception as e:
+                        index_logger.error(f"索引更新通知失敗: {e}")
+                with self._lock:
+                    if not self._dirty:
+                        self._idle.set()
+                        return
+        except Exception as e:
+            index_logger.error(f"重建 QA 記憶體索引失敗，繼續使用舊索引: {e}")
+            with self._lock:
+                # 下次檢查時重試
+                self._data_version = None
+                self._idle.set()
+
+    def _mark_built(self):
+        """記錄重建開始時的資料版本；讀取期間若有提交，下次檢查會再重建"""
+        with self._lock:
+            self._dirty = False
+            self._data_version = self._read_data_version()
+
+    def _build(self) -> _IndexSnapshot:
+        """從資料庫讀取資料並編譯成新的索引快照"""
+        started = time.perf_counter()
+        with self.db.read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT id, content FROM answers ORDER BY id')
+            answer_rows = cursor.fetchall()
+            cursor.execute('''
+                SELECT q.id, q.content, q.content_norm, qa.answer_id, qa.priority
+                FROM questions q
+                JOIN question_answers qa ON q.id = qa.question_id
+                ORDER BY q.id
+            ''')
+            link_rows = cursor.fetchall()
+            cursor.execute('''
+                SELECT at.answer_id, t.name, t.name_norm
+                FROM answer_tags at
+                JOIN tags t ON t.id = at.tag_id
+            ''')
+            tag_rows = cursor.fetchall()
+            ngrams = NgramIndex.load(cursor)
+
+        answer_slots = {row[0]: slot for slot, row in enumerate(answer_rows)}
+        answers = tuple(row[1] for row in answer_rows)
+        answer_priority = array('i', [0] * len(answers))
+
+        question_slots: Dict[int, int] = {}
+        question_texts: List[str] = []
+        questions: List[str] = []
+        question_answers: List[List[Tuple[int, int]]] = []
+        for question_id, content, content_norm, answer_id, priority in link_rows:
+            priority = priority or 0
+            answer_slot = answer_slots[answer_id]
+            answer_priority[answer_slot] = max(answer_priority[answer_slot], priority)
+            slot = question_slots.get(question_id)
+            if slot is None:
+                slot = question_slots[question_id] = len(question_texts)
+                question_texts.append(content)
+                questions.append(content_norm if content_norm is not None else normalize_text(content))
+                question_answers.append([])
+            question_answers[slot].append((priority, answer_slot))
+
+        exact: Dict[str, List[int]] = {}
+        grams: Dict[str, array] = {}
+        chars: Dict[str, array] = {}
+        for slot, text in enumerate(questions):
+            exact.setdefault(text, []).append(slot)
+            for gram in _trigrams(text):
+                grams.setdefault(gram, array('I')).append(slot)
+            for ch in set(text):
+                chars.setdefault(ch, array('I')).append(slot)
+
+        tag_answers: Dict[str, array] = {}
+        answer_tags: List[List[str]] = [[] for _ in answers]
+        for answer_id, name, name_norm in tag_rows:
+            answer_slot = answer_slots[answer_id]
+            tag_answers.setdefault(name_norm or normalize_text(name), array('I')).append(answer_slot)
+            answer_tags[answer_slot].append(name)
+
+        snapshot = _IndexSnapshot(
+            answers=answers,
+            answer_ids=array('q', (row[0] for row in answer_rows)),
+            answer_priority=answer_priority,
+            answer_tags=tuple(tuple(names) for names in answer_tags),
+            questions=tuple(questions),
+            question_texts=tuple(question_texts),
+            question_answers=tuple(
+                tuple(sorted(links, key=lambda link: (-link[0], link[1]))) for links in question_answers
+            ),
+            exact={text: tuple(slots) for text, slots in exact.items()},
+            question_lengths=tuple(sorted({len(text) for text in questions})),
+            grams=grams,
+            chars=chars,
+            tag_answers=tag_answers,
+            ngrams=ngrams,
+            question_slots=question_slots,
+        )
+        index_logger.info(
+            f"QA 記憶體索引建立完成: {len(questions)} 個問題, {len(answers)} 個答案, "
+            f"{len(tag_answers)} 個標籤 ({(time.perf_counter() - started) * 1000:.1f} ms)"
+        )
+        return snapshot
+
+    def search(self, question: str, keywords: List[str], k: int = 5,
+               semantic_hits: Sequence[Tuple[int, float]] = ()) -> List[QACandidate]:
+        """一次掃描同時計算精確、部分、n-gram 與標籤匹配，返回排名前 k 的答案
+
+        部分匹配分兩種：問題包含查詢（分數 2）與查詢包含問題（分數 1）。
+        前者以 trigram（短查詢用單字）倒排列表取交集後驗證；
+        後者以查詢的子字串直接查詢問題字典，兩者都不需掃描整個知識庫。
+        每個答案只保留最好的一個階段，排序與原本依序嘗試各階段的結果一致。
+
+        Args:
+            question: 用戶的問題
+            keywords: 由問題擷取出的標籤關鍵字（已正規化）
+            k: 最多返回的候選數量
+            semantic_hits: 向量索引找到的 [(問題 id, 相似度)]
+
+        Returns:
+            依排名遞減的候選答案
+        """
+        snapshot = self._snapshot
+        text = normalize_text(question)
+        # 答案槽位 → (階段, 分數, 優先級, 問題槽位)
+        best: Dict[int, Tuple[str, float, int, int]] = {}
+
+        def offer(question_slot: int, stage: str, score: float):
+            for priority, answer_slot in snapshot.question_answers[question_slot]:
+                current = best.get(answer_slot)
+                if current is None or (STAGE_RANKS[stage], score, priority) > \
+                        (STAGE_RANKS[current[0]], current[1], current[2]):
+                    best[answer_slot] = (stage, score, priority, question_slot)
+
+        if text:
+            # 精確匹配
+            for slot in snapshot.exact.get(text, ()):
+                offer(slot, 'exact', 1.0)
+
+            # 部分匹配：問題包含查詢
+            if len(text) >= 3:
+                postings = [snapshot.grams.get(gram) for gram in _trigrams(text)]
+            else:
+                postings = [snapshot.chars.get(ch) for ch in set(text)]
+            if all(postings):
+                for slot in _intersect(postings):
+                    if text in snapshot.questions[slot]:
+                        offer(slot, 'partial', 2.0)
+
+            # 部分匹配：查詢包含問題
+            for length in snapshot.question_lengths:
+                if length > len(text):
+                    break
+                for start in range(len(text) - length + 1):
+                    for slot in snapshot.exact.get(text[start:start + length], ()):
+                        offer(slot, 'partial', 1.0)
+
+            # n-gram 模糊匹配：用詞不同但字面相近的問題
+            for question_id, score in snapshot.ngrams.search(
+                    text, NGRAM_CANDIDATES, NGRAM_MIN_COVERAGE):
+                slot = snapshot.question_slots.get(question_id)
+                if slot is not None:
+                    offer(slot, 'ngram', score)
+
+        # 語意匹配：由向量索引預先算好
+        for question_id, score in semantic_hits:
+            slot = snapshot.question_slots.get(question_id)
+            if slot is not None:
+                offer(slot, 'semantic', score)
+
+        # 標籤匹配：命中標籤數越多越好。標籤階段排在所有其他階段之後，
+        # 已有 k 個候選時不可能進入前 k 名；否則以陣列運算只取需要的名額
+        tag_lists = [snapshot.tag_answers[keyword] for keyword in keywords if keyword in snapshot.tag_answers]
+        if tag_lists and len(best) < k:
+            slots, counts = np.unique(np.concatenate([np.frombuffer(posting, dtype=np.uint32)
+                                                      for posting in tag_lists]), return_counts=True)
+            if best:
+                fresh = ~np.isin(slots, np.fromiter(best, dtype=np.int64, count=len(best)))
+                slots, counts = slots[fresh], counts[fresh]
+            priorities = np.frombuffer(snapshot.answer_priority, dtype=np.int32)[slots]
+            for i in np.lexsort((slots, -priorities, -counts))[:k - len(best)]:
+                best[int(slots[i])] = ('tag', float(counts[i]), int(priorities[i]), -1)
+
+        top = heapq.nlargest(
+            k, best.items(),
+            key=lambda item: (STAGE_RANKS[item[1][0]], item[1][1], item[1][2], -item[0])
+        )
+        return [
+            QACandidate(
+                answer=snapshot.answers[answer_slot],
+                answer_id=snapshot.answer_ids[answer_slot],
+                stage=stage,
+                score=score,
+                priority=priority,
+                tags=list(snapshot.answer_tags[answer_slot]),
+                question=snapshot.question_texts[question_slot] if question_slot >= 0 else None,
+            )
+            for answer_slot, (stage, score, priority, question_slot) in top
+        ]
+
+    def close(self):
+        """停止接收異動通知，等待進行中的重建後關閉偵測用連線"""
+        self.db.remove_change_listener(self._mark_dirty)
+        self._idle.wait()
+        self._watch_conn.close()
@@ -0,0 +1,290 @@
+"""查詢記錄與稽核 - 記錄每個 SQL 語句的耗時並檢查查詢計畫
+
+啟用後（Database(slow_query_ms=...) 或環境變數 QA_SLOW_QUERY_MS），所有連線改用
+InstrumentedConnection：每個語句的執行與取回結果都會計時，超過門檻時連同參數寫入慢查詢日誌，
+並依 SQL 文字彙整成查詢登錄表。audit_queries 以登錄表中的語句與範例參數執行
+EXPLAIN QUERY PLAN，標出未使用索引的全表掃描。
+"""
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+# 設定日誌
+query_logger = logging.getLogger("core.query_log")
+
+# 啟用查詢記錄的環境變數（慢查詢門檻，毫秒）
+SLOW_QUERY_ENV = 'QA_SLOW_QUERY_MS'
+
+# 會產生查詢計畫的語句
+_PLANNABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+# 查詢計畫中不算全表掃描的 SCAN：虛擬表（FTS5 自行使用索引）與常數列。
+# SCAN ... USING INDEX 仍會讀取整個索引，視為全表掃描
+_NON_TABLE_SCAN = ('VIRTUAL TABLE', 'CONSTANT ROW')
+
+# 沒有括號內條件的 SEARCH ... USING [COVERING] INDEX：只利用索引排序（例如 MIN/MAX、ORDER BY），
+# 沒有縮小範圍，最壞情況仍會走完整個索引
+_UNCONSTRAINED_SEARCH = re.compile(r'^SEARCH \w+ USING (?:COVERING )?INDEX \w+$')
+
+# 設計上就要讀取整張表的資料表，稽核時不列為問題：
+# 標籤相關的表只有數十列，列出所有標籤與編譯關鍵字自動機本來就會讀取全部
+ALLOWED_FULL_SCANS = ('tags', 'tag_stats', 'tag_keywords')
+
+# FROM / JOIN 後的資料表與別名
+_TABLE_ALIAS = re.compile(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(?!ON\b|WHERE\b|JOIN\b|LEFT\b|GROUP\b|ORDER\b|LIMIT\b|USING\b)(\w+))?',
+                          re.IGNORECASE)
+
+# IN (?, ?, ...) 與 VALUES (?, ?), (?, ?) 的佔位符數量隨參數變化，彙整時視為同一個語句
+_PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))*')
+
+# 讓索引失效的常見寫法
+_SQL_HINTS = [
+    (re.compile(r"LIKE\s+'%'\s*\|\||LIKE\s+'%[^']*'", re.IGNORECASE), "前置萬用字元的 LIKE 無法使用索引"),
+    (re.compile(r"\b(LOWER|UPPER)\s*\(\s*\w+\.\w+", re.IGNORECASE), "對欄位套用 LOWER()/UPPER() 無法使用索引"),
+]
+
+
+def _normalize_sql(sql: str) -> str:
+    """將 SQL 的空白壓縮成單一空格"""
+    return ' '.join(sql.split())
+
+
+def _query_key(sql: str) -> str:
+    """登錄表的鍵：正規化空白並將佔位符列表縮成 (?...)"""
+    return _PLACEHOLDER_LIST.sub('(?...)', _normalize_sql(sql))
+
+
+@dataclass
+class QueryRecord:
+    """同一個 SQL 語句的累計統計"""
+    key: str                    # 登錄表的鍵（佔位符列表已縮寫）
+    sql: str = ''               # 最近一次執行的 SQL（與 params 對應）
+    params: Any = ()            # 最近一次執行的參數（稽核時作為範例）
+    count: int = 0              # 執行次數
+    total_ms: float = 0.0       # 累計耗時（含取回結果）
+    max_ms: float = 0.0         # 單次最長耗時
+    slow: int = 0               # 超過門檻的次數
+
+    @property
+    def avg_ms(self) -> float:
+        return self.total_ms / self.count if self.count else 0.0
+
+
+class QueryRecorder:
+    """查詢登錄表與慢查詢日誌（可跨執行緒共用）"""
+
+    def __init__(self, slow_query_ms: float = 100.0):
+        """
+        Args:
+            slow_query_ms: 慢查詢門檻（毫秒），單一語句累計耗時超過時寫入警告日誌
+        """
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self._records: Dict[str, QueryRecord] = {}
+
+    def start(self, sql: str, params: Any) -> QueryRecord:
+        """記錄一次語句執行，返回該語句的統計"""
+        key = _query_key(sql)
+        with self._lock:
+            record = self._records.get(key)
+            if record is None:
+                record = self._records[key] = QueryRecord(key=key)
+            record.sql = _normalize_sql(sql)
+            record.params = params
+            record.count += 1
+        return record
+
+    def add_time(self, record: QueryRecord, elapsed_ms: float, statement_ms: float, was_slow: bool) -> bool:
+        """累加耗時；statement_ms 為此次執行目前為止的耗時
+
+        Returns:
+            此次執行是否已超過門檻
+        """
+        is_slow = statement_ms >= self.slow_query_ms
+        with self._lock:
+            record.total_ms += elapsed_ms
+            record.max_ms = max(record.max_ms, statement_ms)
+            if is_slow and not was_slow:
+                record.slow += 1
+        if is_slow and not was_slow:
+            query_logger.warning(f"慢查詢 ({statement_ms:.1f} ms): {record.sql[:500]} | 參數: {record.params!r}")
+        return is_slow
+
+    def records(self) -> List[QueryRecord]:
+        """取得所有語句的統計（依累計耗時遞減）"""
+        with self._lock:
+            return sorted(self._records.values(), key=lambda r: -r.total_ms)
+
+    def reset(self):
+        """清除登錄表"""
+        with self._lock:
+            self._records.clear()
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """計時每個語句（執行與取回結果）的游標"""
+
+    recorder: Optional[QueryRecorder] = None
+
+    def _start(self, sql: str, params: Any):
+        self._record = self.recorder.start(sql, params)
+        self._statement_ms = 0.0
+        self._slow = False
+
+    def _timed(self, started: float):
+        if getattr(self, '_record', None) is None:
+            return
+        elapsed = (time.perf_counter() - started) * 1000
+        self._statement_ms += elapsed
+        self._slow = self.recorder.add_time(self._record, elapsed, self._statement_ms, self._slow)
+
+    def execute(self, sql, parameters=()):
+        self._start(sql, parameters)
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._timed(started)
+
+    def executemany(self, sql, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        self._start(sql, seq_of_parameters[0] if seq_of_parameters else ())
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._timed(started)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            self._timed(started)
+
+    def fetchmany(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().fetchmany(*args, **kwargs)
+        finally:
+            self._timed(started)
+
+    def fetchall(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            self._timed(started)
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            return super().__next__()
+        finally:
+            self._timed(started)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """所有語句都經由 InstrumentedCursor 執行的連線（以 sqlite3.connect(factory=...) 建立）"""
+
+    recorder: Optional[QueryRecorder] = None
+
+    def cursor(self, factory=InstrumentedCursor):
+        cursor = super().cursor(factory)
+        cursor.recorder = self.recorder
+        return cursor
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+@dataclass
+class QueryAudit:
+    """單一語句的查詢計畫稽核結果"""
+    record: QueryRecord
+    plan: List[str] = field(default_factory=list)        # EXPLAIN QUERY PLAN 的 detail（依層級縮排）
+    full_scans: List[str] = field(default_factory=list)  # 全表掃描（SCAN detail 與資料表名稱）
+    hints: List[str] = field(default_factory=list)       # SQL 寫法的提示
+    error: Optional[str] = None                          # 無法產生查詢計畫時的錯誤
+
+
+def find_full_scans(plan_rows: Sequence[Sequence[Any]], sql: str = '',
+                    allowed_tables: Sequence[str] = ALLOWED_FULL_SCANS) -> List[str]:
+    """從 EXPLAIN QUERY PLAN 的結果找出全表掃描
+
+    除了 SCAN，沒有條件的 SEARCH ... USING INDEX（只用索引排序）也算全表掃描；
+    子查詢（CO-ROUTINE / MATERIALIZE）的結果集掃描不算在內。
+
+    Args:
+        plan_rows: (id, parent, notused, detail) 列
+        sql: 原始 SQL，用於將別名對應回資料表名稱
+        allowed_tables: 允許全表掃描的資料表
+
+    Returns:
+        全表掃描的描述列表
+    """
+    aliases = {}
+    for table, alias in _TABLE_ALIAS.findall(sql):
+        aliases[(alias or table).lower()] = table.lower()
+    subqueries = set()
+    for row in plan_rows:
+        detail = row[3]
+        for prefix in ('CO-ROUTINE ', 'MATERIALIZE '):
+            if detail.startswith(prefix):
+                subqueries.add(detail[len(prefix):].split()[0])
+    scans = []
+    for row in plan_rows:
+        detail = row[3]
+        if not detail.startswith('SCAN ') and not _UNCONSTRAINED_SEARCH.match(detail):
+            continue
+        if any(marker in detail for marker in _NON_TABLE_SCAN):
+            continue
+        name = detail.split()[1]
+        if name in subqueries:
+            continue
+        table = aliases.get(name.lower(), name.lower())
+        if table in allowed_tables:
+            continue
+        scans.append(detail if table == name.lower() else f"{detail} ({table})")
+    return scans
+
+
+def audit_queries(conn: sqlite3.Connection, records: Sequence[QueryRecord],
+                  allowed_tables: Sequence[str] = ALLOWED_FULL_SCANS) -> List[QueryAudit]:
+    """對登錄的語句執行 EXPLAIN QUERY PLAN 並標出全表掃描
+
+    Args:
+        conn: 資料庫連線（EXPLAIN 不會真的執行語句）
+        records: 查詢登錄表中的語句
+        allowed_tables: 允許全表掃描的資料表
+
+    Returns:
+        可產生查詢計畫的語句稽核結果
+    """
+    audits = []
+    for record in records:
+        if not record.sql.upper().startswith(_PLANNABLE):
+            continue
+        audit = QueryAudit(record=record)
+        audit.hints = [hint for pattern, hint in _SQL_HINTS if pattern.search(record.sql)]
+        try:
+            rows = conn.execute(f'EXPLAIN QUERY PLAN {record.sql}', record.params).fetchall()
+        except sqlite3.Error as e:
+            audit.error = str(e)
+            audits.append(audit)
+            continue
+        depth = {0: -1}
+        for row in rows:
+            depth[row[0]] = depth.get(row[1], -1) + 1
+            audit.plan.append('  ' * depth[row[0]] + row[3])
+        audit.full_scans = find_full_scans(rows, record.sql, allowed_tables)
+        audits.append(audit)
+    return audits
@@ -0,0 +1,138 @@
+"""請求合併（single-flight）- 同時發生的相同上游呼叫只執行一次
+
+旅遊團抵達時，許多對話會在幾秒內查詢同一個城市的天氣或相同的網路搜尋。
+SingleFlight 以呼叫端提供的鍵（已正規化的參數）辨識相同的呼叫：
+1. 第一個呼叫者（leader）實際執行上游請求
+2. 執行期間抵達的相同呼叫等待同一個結果（或例外），不再另外發出請求
+3. 請求結束後鍵即移除，之後的呼叫重新執行（結果的保存交由快取負責）
+
+同步呼叫（多執行緒）以 do()，asyncio 呼叫以 do_async()；兩者各自合併，
+非同步的呼叫只與同一事件迴圈內的呼叫合併。
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+# 設定日誌
+singleflight_logger = logging.getLogger("core.singleflight")
+
+
+class SingleFlight:
+    """一組可合併的呼叫（通常每個上游函數一組）"""
+
+    def __init__(self, name: str):
+        """
+        Args:
+            name: 群組名稱（用於日誌與統計）
+        """
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self._tasks: Dict[Tuple[int, Hashable], asyncio.Task] = {}
+        self._stats = {'calls': 0, 'executions': 0, 'coalesced': 0, 'errors': 0}
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """執行 fn(*args, **kwargs)，相同 key 的呼叫正在執行時改為等待其結果
+
+        Args:
+            key: 辨識相同呼叫的鍵
+            fn: 上游呼叫
+
+        Returns:
+            fn 的返回值（合併的呼叫者取得同一個物件）；fn 拋出例外時所有呼叫者都收到該例外
+        """
+        with self._lock:
+            self._stats['calls'] += 1
+            future = self._calls.get(key)
+            if future is not None:
+                self._stats['coalesced'] += 1
+                leader = False
+            else:
+                future = self._calls[key] = Future()
+                self._stats['executions'] += 1
+                leader = True
+
+        if not leader:
+            singleflight_logger.debug(f"[{self.name}] 合併呼叫: {key!r}")
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            with self._lock:
+                self._stats['errors'] += 1
+                del self._calls[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._calls[key]
+        future.set_result(result)
+        return result
+
+    async def do_async(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """非同步版本：await fn(*args, **kwargs)，相同 key 的呼叫正在執行時改為等待其結果
+
+        上游請求在獨立的 task 中執行，個別呼叫者被取消不會中斷其他呼叫者共用的請求。
+
+        Args:
+            key: 辨識相同呼叫的鍵
+            fn: 返回 awaitable 的上游呼叫
+
+        Returns:
+            fn 的結果；fn 拋出例外時所有呼叫者都收到該例外
+        """
+        task_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            self._stats['calls'] += 1
+            task = self._tasks.get(task_key)
+            if task is not None:
+                self._stats['coalesced'] += 1
+                singleflight_logger.debug(f"[{self.name}] 合併呼叫: {key!r}")
+            else:
+                task = self._tasks[task_key] = asyncio.ensure_future(fn(*args, **kwargs))
+                task.add_done_callback(lambda t: self._finish_task(task_key, t))
+                self._stats['executions'] += 1
+        return await asyncio.shield(task)
+
+    def _finish_task(self, task_key: Tuple[int, Hashable], task: asyncio.Task):
+        with self._lock:
+            if self._tasks.get(task_key) is task:
+                del self._tasks[task_key]
+            if task.cancelled() or task.exception() is not None:
+                self._stats['errors'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """取得合併統計
+
+        Returns:
+            包含 calls（呼叫數）、executions（實際上游請求數）、coalesced（合併的呼叫數）、
+            errors、in_flight 與 coalesced_rate 的字典
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._calls) + len(self._tasks)
+        stats['coalesced_rate'] = stats['coalesced'] / stats['calls'] if stats['calls'] else 0.0
+        return stats
+
+
+_groups: Dict[str, SingleFlight] = {}
+_groups_lock = threading.Lock()
+
+
+def get_singleflight(name: str) -> SingleFlight:
+    """取得指定名稱的合併群組（同名共用同一個實例）"""
+    with _groups_lock:
+        group = _groups.get(name)
+        if group is None:
+            group = _groups[name] = SingleFlight(name)
+        return group
+
+
+def singleflight_stats() -> Dict[str, Dict[str, Any]]:
+    """取得所有合併群組的統計（群組名稱 → stats()）"""
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {group.name: group.stats() for group in groups}
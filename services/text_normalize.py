@@ -0,0 +1,71 @@
+"""文字正規化 - 產生查詢與比對用的正規化文字
+
+正規化步驟：
+1. NFKC：全形英數與標點轉半形
+2. casefold：不分大小寫
+3. 移除空白與標點符號
+4. 繁簡折疊：常用繁體字轉為簡體（只用於比對，不會改動原始內容）
+"""
+
+import unicodedata
+from typing import Dict
+
+# 常用繁體 → 簡體對照（每組兩個字：繁、簡），涵蓋旅遊問答常見用字
+_T2S_PAIRS = (
+    "這这 個个 們们 來来 時时 說说 會会 對对 過过 還还 後后 從从 麼么 嗎吗 問问 題题 請请 謝谢 "
+    "讓让 點点 見见 現现 開开 關关 門门 間间 東东 車车 鐵铁 買买 賣卖 訂订 購购 價价 錢钱 費费 "
+    "場场 廳厅 飯饭 雞鸡 魚鱼 頭头 鍋锅 麵面 館馆 內内 邊边 遠远 離离 線线 號号 樓楼 層层 區区 "
+    "縣县 鄉乡 鎮镇 義义 處处 應应 該该 幫帮 辦办 機机 飛飞 準准 備备 帶带 張张 長长 條条 樣样 "
+    "種种 類类 與与 為为 給给 於于 學学 習习 寫写 讀读 聽听 觀观 遊游 覽览 園园 濟济 經经 歷历 "
+    "曆历 氣气 溫温 陽阳 陰阴 雲云 風风 電电 話话 網网 絡络 資资 訊讯 報报 紙纸 書书 畫画 藝艺 "
+    "術术 導导 轉转 運运 達达 動动 發发 髮发 貨货 務务 員员 業业 專专 預预 約约 營营 鐘钟 錶表 "
+    "幾几 歲岁 節节 慶庆 紀纪 體体 驗验 環环 險险 醫医 藥药 療疗 護护 證证 簽签 換换 匯汇 銀银 "
+    "碼码 計计 輛辆 駛驶 駕驾 寶宝 貝贝 夠够 裡里 裏里 麗丽 傳传 統统 舊旧 廟庙 臺台 灣湾 隊队 "
+    "陣阵 廣广 獨独 別别 愛爱 歡欢 聞闻 樂乐 綠绿 紅红 黃黄 藍蓝 顏颜 燈灯 橋桥 島岛 嶼屿 灘滩 "
+    "濕湿 熱热 涼凉 凍冻 霧雾 飲饮 蝦虾 鴨鸭 豬猪 湯汤 麥麦 糧粮 醬酱 鹽盐 圖图 實实 際际 產产 "
+    "總总 單单 雙双 師师 聯联 繫系 係系 詢询 嘗尝 試试 認认 識识 記记 夢梦 貴贵 錯错 誤误 壞坏 "
+    "親亲 輕轻 鬆松 緊紧 難难 極极 緩缓 須须 寧宁 靜静 聲声 響响 劇剧 戲戏 視视 頻频 錄录 攝摄 "
+    "誰谁 幣币 萬万 億亿 兩两 數数 據据 較较 選选 擇择 決决 確确 將将 週周 進进 檢检 測测 設设 "
+    "無无 歐欧 亞亚 國国 語语 譯译 華华 漢汉 詞词 彙汇 標标 籤签 覆复 復复 複复 穀谷 鬥斗 範范 "
+    "隻只 衝冲 彎弯 擁拥 擠挤 筆笔 憶忆 燒烧 滷卤 魯鲁 蘭兰 蔥葱 薑姜 蘿萝 蔔卜 豐丰 糰团 團团 "
+    "圓圆 餅饼 餃饺 鮮鲜 魷鱿 鰻鳗 蠔蚝 鵝鹅 鴿鸽 烏乌 龍龙 鳳凤 龜龟 馬马 驢驴 騎骑 獅狮 貓猫 "
+    "鳥鸟 蟲虫 葉叶 樹树 楓枫 櫻樱 檜桧 閣阁 舉举 參参 議议 論论 壇坛 雜杂 誌志 兒儿 孫孙 媽妈 "
+    "爺爷 著着 爾尔 鄰邻 捨舍 趕赶 廁厕 淨净 遺遗 竊窃 衛卫 櫃柜 檯台 鬧闹 啟启 閉闭 終终 順顺 "
+    "頁页 庫库 訴诉 隨随 驛驿 裝装 齊齐 濱滨 頂顶 頓顿 領领 額额 飽饱 誕诞 諾诺 讚赞 贊赞 賽赛 跡迹 蹤踪 "
+    "輪轮 載载 閃闪 閒闲 闆板 陸陆 雖虽 顧顾 飾饰 驚惊 齒齿 薦荐"
+)
+
+_T2S: Dict[int, str] = {}
+for _pair in _T2S_PAIRS.split():
+    _T2S[ord(_pair[0])] = _pair[1]
+
+
+def fold_chinese_variants(text: str) -> str:
+    """將常用繁體字折疊為簡體，讓繁簡輸入可以互相比對
+
+    Args:
+        text: 輸入文字
+
+    Returns:
+        折疊後的文字
+    """
+    return text.translate(_T2S)
+
+
+def normalize_text(text: str, fold_variants: bool = True) -> str:
+    """產生比對用的正規化文字
+
+    Args:
+        text: 輸入文字
+        fold_variants: 是否進行繁簡折疊
+
+    Returns:
+        正規化後的文字（可能為空字串）
+    """
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKC', text).casefold()
+    text = ''.join(ch for ch in text if ch.isalnum())
+    if fold_variants:
+        text = fold_chinese_variants(text)
+    return text
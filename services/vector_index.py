@@ -0,0 +1,440 @@
+"""向量索引 - 在行程內以 NumPy 矩陣運算做語意檢索
+
+問題的嵌入向量存成 .npy 檔並以 memory-map 載入（可選 int8 量化以節省記憶體），
+每次同步都寫入一組新檔名的檔案，最後替換 manifest.json 發布整組檔案；
+查詢時以分塊矩陣乘法計算餘弦相似度並取前 k 名，不需外部向量資料庫。
+嵌入函式可替換：正式環境可用 sentence-transformers 模型，測試可用不需下載模型的 HashingEmbedder。
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .database import Database
+from .text_normalize import normalize_text
+
+# 設定日誌
+vector_logger = logging.getLogger("core.vector_index")
+
+# 預設的多語言句向量模型（與 examples/livekit_agent 的 Qdrant 範例相同）
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+# 每次計算相似度的矩陣列數，限制暫存記憶體
+SEARCH_BLOCK_ROWS = 65536
+# 索引目錄中指向目前檔案組的清單檔
+MANIFEST_FILE = 'manifest.json'
+# 未被清單引用的檔案超過此秒數才刪除（避免刪到其他行程正在寫入、尚未發布的檔案）
+ORPHAN_GRACE_SECONDS = 3600
+
+
+class Embedder:
+    """嵌入函式介面：將文字轉成 L2 正規化的 float32 向量"""
+
+    name: str = ""
+    dim: int = 0
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """計算嵌入向量
+
+        Args:
+            texts: 文字列表
+
+        Returns:
+            形狀為 (len(texts), dim) 的 float32 陣列，每列已 L2 正規化
+        """
+        raise NotImplementedError
+
+
+class HashingEmbedder(Embedder):
+    """以字元 n-gram 雜湊產生向量的確定性嵌入器（不需下載模型）"""
+
+    def __init__(self, dim: int = 256, ngram_sizes: Tuple[int, ...] = (1, 2, 3)):
+        """初始化嵌入器
+
+        Args:
+            dim: 向量維度
+            ngram_sizes: 使用的字元 n-gram 長度
+        """
+        self.dim = dim
+        self.ngram_sizes = ngram_sizes
+        self.name = f"hashing-{dim}-{''.join(map(str, ngram_sizes))}"
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            text = normalize_text(text)
+            for n in self.ngram_sizes:
+                for i in range(len(text) - n + 1):
+                    h = zlib.crc32(text[i:i + n].encode('utf-8'))
+                    # 低位決定維度，最高位決定正負號，降低碰撞造成的偏差
+                    vectors[row, h % self.dim] += -1.0 if h & 0x80000000 else 1.0
+        return _l2_normalize(vectors)
+
+
+class SentenceTransformerEmbedder(Embedder):
+    """使用 sentence-transformers 模型的嵌入器（第一次使用時才載入模型）"""
+
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL, batch_size: int = 64):
+        """初始化嵌入器
+
+        Args:
+            model_name: 模型名稱或本機路徑
+            batch_size: 編碼批次大小
+        """
+        self.name = model_name
+        self.batch_size = batch_size
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer
+
+                vector_logger.info(f"載入嵌入模型: {self.name}")
+                self._model = SentenceTransformer(self.name)
+            return self._model
+
+    @property
+    def dim(self) -> int:
+        return self._get_model().get_sentence_embedding_dimension()
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = self._get_model().encode(
+            list(texts), batch_size=self.batch_size,
+            convert_to_numpy=True, normalize_embeddings=True,
+        )
+        return np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1)
+
+
+def create_embedder(spec: Optional[str]) -> Optional[Embedder]:
+    """依設定字串建立嵌入器
+
+    Args:
+        spec: None 或空字串表示不啟用；"hashing" 使用 HashingEmbedder；
+              其他值視為 sentence-transformers 模型名稱
+
+    Returns:
+        嵌入器實例，或 None
+    """
+    if not spec:
+        return None
+    if spec == 'hashing':
+        return HashingEmbedder()
+    return SentenceTransformerEmbedder(spec)
+
+
+def _l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _text_key(text: str) -> int:
+    """問題內容的校驗碼，用來判斷既有向量是否可沿用"""
+    return zlib.crc32(text.encode('utf-8'))
+
+
+def _quantize(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """逐列對稱量化成 int8，返回 (int8 矩陣, 每列縮放係數)"""
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+@dataclass(frozen=True)
+class _VectorSnapshot:
+    """某一時間點的向量索引內容（建立後不再修改，以單一屬性指派發布）"""
+    ids: np.ndarray                 # 槽位 → 問題 id
+    keys: np.ndarray                # 槽位 → 問題內容的雜湊
+    matrix: Optional[np.ndarray]    # (問題數, dim) 的向量（memory-map）
+    scales: Optional[np.ndarray]    # int8 量化時每列的縮放倍數
+
+
+_EMPTY_SNAPSHOT = _VectorSnapshot(ids=np.zeros(0, dtype=np.int64), keys=np.zeros(0, dtype=np.int64),
+                                  matrix=None, scales=None)
+
+
+def _dequantize(snapshot: _VectorSnapshot, slot: int) -> np.ndarray:
+    row = np.asarray(snapshot.matrix[slot], dtype=np.float32)
+    return row * snapshot.scales[slot] if snapshot.scales is not None else row
+
+
+class VectorIndex:
+    """問題嵌入向量的矩陣索引，資料以 .npy 檔保存並以 memory-map 讀取"""
+
+    def __init__(self, db: Database, embedder: Embedder, path: Optional[str] = None,
+                 quantize: bool = False, batch_size: int = 256):
+        """初始化並同步索引
+
+        Args:
+            db: 資料庫實例
+            embedder: 嵌入函式
+            path: 索引目錄，預設為資料庫檔名加上 .vectors
+            quantize: 是否以 int8 量化保存向量（記憶體約為 float32 的四分之一）
+            batch_size: 計算嵌入時的批次大小
+        """
+        self.db = db
+        self.embedder = embedder
+        self.path = path or os.path.splitext(db.db_path)[0] + '.vectors'
+        self.quantize = quantize
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._dirty = True
+        self._snapshot = _EMPTY_SNAPSHOT
+        self._load()
+        self.refresh_if_changed()
+        db.add_change_listener(self._mark_dirty)
+
+    def _mark_dirty(self):
+        """資料庫異動通知，下次查詢前同步向量"""
+        self._dirty = True
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _meta(self) -> dict:
+        return {'embedder': self.embedder.name, 'dim': self.embedder.dim, 'quantize': self.quantize}
+
+    def _read_manifest(self) -> Optional[dict]:
+        """讀取 manifest.json，不存在或無法解析時返回 None"""
+        try:
+            with open(self._file(MANIFEST_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _load(self):
+        """載入 manifest.json 指向的索引檔；設定不同或檔案不一致時忽略（之後重新計算）"""
+        try:
+            for attempt in range(3):
+                manifest = self._read_manifest()
+                if manifest is None:
+                    return
+                if manifest.get('meta') != self._meta():
+                    vector_logger.info(f"向量索引設定已變更，將重新計算: {manifest.get('meta')} -> {self._meta()}")
+                    return
+                files = manifest['files']
+                try:
+                    snapshot = _VectorSnapshot(
+                        ids=np.load(self._file(files['ids'])),
+                        keys=np.load(self._file(files['keys'])),
+                        matrix=np.load(self._file(files['vectors']), mmap_mode='r'),
+                        scales=np.load(self._file(files['scales'])) if self.quantize else None,
+                    )
+                    break
+                except FileNotFoundError:
+                    # 其他行程剛發布新的一組檔案並刪除了舊檔，改讀新的清單
+                    if attempt == 2:
+                        raise
+            rows = len(snapshot.ids)
+            if (len(snapshot.keys) != rows or snapshot.matrix.ndim != 2
+                    or snapshot.matrix.shape != (rows, self.embedder.dim)
+                    or (snapshot.scales is not None and len(snapshot.scales) != rows)):
+                vector_logger.warning(
+                    f"向量索引檔案不一致，將重新計算: ids={rows}, keys={len(snapshot.keys)}, "
+                    f"vectors={snapshot.matrix.shape}"
+                )
+                return
+            self._snapshot = snapshot
+        except Exception as e:
+            vector_logger.warning(f"讀取向量索引失敗，將重新計算: {e}")
+            self._snapshot = _EMPTY_SNAPSHOT
+
+    def refresh_if_changed(self):
+        """將索引與 questions 表同步：只為新增或內容變更的問題計算嵌入"""
+        if not self._dirty:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            with self.db.read_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT id, content FROM questions ORDER BY id')
+                rows = cursor.fetchall()
+
+            ids = np.array([row[0] for row in rows], dtype=np.int64)
+            keys = np.array([_text_key(row[1]) for row in rows], dtype=np.int64)
+            snapshot = self._snapshot
+            if (snapshot.matrix is not None and np.array_equal(ids, snapshot.ids)
+                    and np.array_equal(keys, snapshot.keys)):
+                return
+            self._rebuild(rows, ids, keys)
+
+    def _rebuild(self, rows: List[Tuple[int, str]], ids: np.ndarray, keys: np.ndarray):
+        started = time.perf_counter()
+        dim = self.embedder.dim
+        vectors = np.zeros((len(rows), dim), dtype=np.float32)
+
+        # 沿用 id 與內容都沒變的既有向量
+        reuse = np.zeros(len(rows), dtype=bool)
+        old = self._snapshot
+        if old.matrix is not None and len(old.ids) and old.matrix.shape[1] == dim:
+            old_slots = {(int(i), int(k)): slot for slot, (i, k) in enumerate(zip(old.ids, old.keys))}
+            for slot, key in enumerate(zip(ids.tolist(), keys.tolist())):
+                old_slot = old_slots.get(key)
+                if old_slot is not None:
+                    vectors[slot] = _dequantize(old, old_slot)
+                    reuse[slot] = True
+
+        missing = np.flatnonzero(~reuse)
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            vectors[batch] = self.embedder.embed([rows[slot][1] for slot in batch])
+
+        os.makedirs(self.path, exist_ok=True)
+        if self.quantize:
+            matrix, scales = _quantize(vectors)
+        else:
+            matrix, scales = vectors, None
+        files = {}
+        try:
+            files['vectors'] = self._save('vectors', matrix)
+            files['ids'] = self._save('ids', ids)
+            files['keys'] = self._save('keys', keys)
+            if scales is not None:
+                files['scales'] = self._save('scales', scales)
+            # 發布前先開啟 memory-map，之後其他行程刪除這組檔案也不影響本行程
+            snapshot = _VectorSnapshot(ids=ids, keys=keys, scales=scales,
+                                       matrix=np.load(self._file(files['vectors']), mmap_mode='r'))
+            previous = self._read_manifest()
+            self._publish({'meta': self._meta(), 'rows': len(rows), 'files': files})
+        except BaseException:
+            self._remove_files(files.values(), keep=())
+            raise
+        if previous:
+            self._remove_files(previous.get('files', {}).values(), keep=files.values())
+        self._remove_orphans(keep=files.values())
+
+        # 一次指派發布新的快照，查詢中的執行緒繼續使用舊快照
+        self._snapshot = snapshot
+        vector_logger.info(
+            f"向量索引同步完成: {len(rows)} 個問題, 新計算 {len(missing)} 個 "
+            f"({(time.perf_counter() - started) * 1000:.1f} ms)"
+        )
+
+    def _save(self, name: str, array: np.ndarray) -> str:
+        """寫入一個不與其他行程衝突的新檔案
+
+        Returns:
+            索引目錄中的檔名（發布前不會被讀取）
+        """
+        fd, path = tempfile.mkstemp(prefix=name + '-', suffix='.npy', dir=self.path)
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, array)
+        return os.path.basename(path)
+
+    def _publish(self, manifest: dict):
+        """最後替換 manifest.json，讀取端只會看到完整的一組檔案"""
+        fd, tmp = tempfile.mkstemp(prefix='manifest-', suffix='.tmp', dir=self.path)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f)
+            os.replace(tmp, self._file(MANIFEST_FILE))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def _remove_orphans(self, keep):
+        """刪除未被清單引用且已久未修改的檔案（中斷的同步、舊版格式的檔案）"""
+        cutoff = time.time() - ORPHAN_GRACE_SECONDS
+        stale = []
+        for name in os.listdir(self.path):
+            if name == MANIFEST_FILE:
+                continue
+            try:
+                if os.path.getmtime(self._file(name)) < cutoff:
+                    stale.append(name)
+            except OSError:
+                pass
+        self._remove_files(stale, keep)
+
+    def _remove_files(self, names, keep):
+        """刪除上一組檔案（已開啟的 memory-map 在 POSIX 上不受影響）"""
+        keep = set(keep)
+        for name in names:
+            if name in keep:
+                continue
+            try:
+                os.remove(self._file(name))
+            except OSError:
+                pass
+
+    def search_vectors(self, queries: np.ndarray, k: int = 5,
+                       min_score: float = -1.0) -> List[List[Tuple[int, float]]]:
+        """以矩陣乘法批次計算多個查詢向量的前 k 名
+
+        Args:
+            queries: 形狀為 (查詢數, dim) 的 L2 正規化向量
+            k: 每個查詢最多返回的問題數
+            min_score: 最低餘弦相似度
+
+        Returns:
+            每個查詢一個 [(問題 id, 相似度)] 列表，依相似度遞減
+        """
+        snapshot = self._snapshot
+        matrix, scales, ids = snapshot.matrix, snapshot.scales, snapshot.ids
+        queries = np.asarray(queries, dtype=np.float32)
+        if matrix is None or not len(ids) or not len(queries):
+            return [[] for _ in range(len(queries))]
+
+        # 逐塊計算 (區塊列數, 查詢數) 的分數，並與目前的前 k 名合併
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_slots = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, len(ids), SEARCH_BLOCK_ROWS):
+            block = np.asarray(matrix[start:start + SEARCH_BLOCK_ROWS], dtype=np.float32)
+            scores = queries @ block.T
+            if scales is not None:
+                scores *= scales[start:start + len(block)]
+            scores = np.concatenate([best_scores, scores], axis=1)
+            slots = np.concatenate([best_slots, np.broadcast_to(
+                np.arange(start, start + len(block)), (len(queries), len(block)))], axis=1)
+            if scores.shape[1] > k:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, top, axis=1)
+                slots = np.take_along_axis(slots, top, axis=1)
+            best_scores, best_slots = scores, slots
+
+        results = []
+        order = np.argsort(-best_scores, axis=1, kind='stable')
+        for row in range(len(queries)):
+            hits = []
+            for col in order[row]:
+                score = float(best_scores[row, col])
+                if score < min_score:
+                    break
+                hits.append((int(ids[best_slots[row, col]]), score))
+            results.append(hits)
+        return results
+
+    def search(self, text: str, k: int = 5, min_score: float = -1.0) -> List[Tuple[int, float]]:
+        """搜尋語意最相近的問題
+
+        Args:
+            text: 查詢文字
+            k: 最多返回的問題數
+            min_score: 最低餘弦相似度
+
+        Returns:
+            [(問題 id, 相似度)]，依相似度遞減
+        """
+        if not text:
+            return []
+        self.refresh_if_changed()
+        return self.search_vectors(self.embedder.embed([text]), k, min_score)[0]
+
+    def __len__(self) -> int:
+        return len(self._snapshot.ids)
+
+    def close(self):
+        """停止接收異動通知"""
+        self.db.remove_change_listener(self._mark_dirty)
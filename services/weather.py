@@ -1,22 +1,215 @@
 
+import asyncio
 import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
 from urllib.parse import quote
 
-from utils.http_client import create_http_session
+from utils.http_client import get_http_client
+from utils.async_http_client import get_async_http_client
+
+from .singleflight import get_singleflight
+from .text_normalize import normalize_text
 
 
 # 設定日誌
 weather_logger = logging.getLogger("core.weather")
 
+# 天氣快取存活時間（秒）的環境變數，設為 0 停用快取
+WEATHER_CACHE_TTL_ENV = "WEATHER_CACHE_TTL"
+
+# HTTPS 超過此秒數沒有回應就同時送出 HTTP 備援請求（環境變數可覆寫，負值表示依序嘗試）
+DEFAULT_HEDGE_DELAY = 0.5
+WEATHER_HEDGE_DELAY_ENV = "WEATHER_HEDGE_DELAY"
+
+
+@dataclass
+class _WeatherEntry:
+    value: str          # wttr.in 的回應
+    fetched_at: float   # 取得時間（time.monotonic()）
+
+
+class WeatherCache:
+    """依正規化城市名稱保存天氣的快取（stale-while-revalidate）
+
+    - 存活時間 ttl 內直接返回
+    - 過期後 stale_ttl 內仍先返回舊值，同時在背景重新查詢（同一城市同時只有一個背景查詢）
+    - 更久以前的資料不直接使用，但 wttr.in 查詢失敗時，max_age 內的最後一筆成功結果會附上資料時間返回
+    """
+
+    def __init__(self, ttl: float = 600.0, stale_ttl: float = 1800.0,
+                 max_age: float = 21600.0, max_size: int = 256):
+        """初始化快取
+
+        Args:
+            ttl: 存活時間（秒），0 表示停用快取
+            stale_ttl: 過期後仍先返回舊值並在背景更新的時間（秒）
+            max_age: 查詢失敗時可作為備援的最長資料時間（秒）
+            max_size: 最多保存的城市數，超過時淘汰最久未使用的項目
+        """
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_age = max(max_age, ttl + stale_ttl)
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, _WeatherEntry]" = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "fallbacks": 0,
+                       "refreshes": 0, "refresh_failures": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def lookup(self, key: str) -> Tuple[Optional[str], bool]:
+        """查詢快取
+
+        Args:
+            key: 正規化的城市名稱
+
+        Returns:
+            (value, refresh)：value 為可直接返回的值（未命中時為 None）；
+            refresh 為 True 表示 value 已過期，呼叫端應在背景重新查詢並以 finish_refresh() 結束
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            age = now - entry.fetched_at if entry is not None else None
+            if age is None or age >= self.ttl + self.stale_ttl:
+                self._stats["misses"] += 1
+                return None, False
+            self._entries.move_to_end(key)
+            if age < self.ttl:
+                self._stats["hits"] += 1
+                return entry.value, False
+            self._stats["stale_hits"] += 1
+            if key in self._refreshing:
+                return entry.value, False
+            self._refreshing.add(key)
+            self._stats["refreshes"] += 1
+            return entry.value, True
+
+    def put(self, key: str, value: str):
+        """寫入一筆成功查詢的結果"""
+        with self._lock:
+            self._entries[key] = _WeatherEntry(value=value, fetched_at=time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def finish_refresh(self, key: str, value: Optional[str]):
+        """結束背景更新；value 為 None 表示查詢失敗，保留舊值"""
+        with self._lock:
+            self._refreshing.discard(key)
+            if value is None:
+                self._stats["refresh_failures"] += 1
+        if value is not None:
+            self.put(key, value)
+
+    def last_good(self, key: str) -> Optional[Tuple[str, float]]:
+        """取得查詢失敗時可用的最後一筆成功結果
+
+        Returns:
+            (value, age 秒數)；沒有或已超過 max_age 時返回 None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            age = time.monotonic() - entry.fetched_at
+            if age >= self.max_age:
+                return None
+            self._stats["fallbacks"] += 1
+            return entry.value, age
+
+    def clear(self):
+        """清空快取"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """取得快取統計
+
+        Returns:
+            包含 size、hits、stale_hits、misses、fallbacks、refreshes、refresh_failures 的字典
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        return stats
+
+
+_weather_cache: Optional[WeatherCache] = None
+
+
+def get_weather_cache() -> WeatherCache:
+    """取得天氣快取單例（存活時間可由環境變數 WEATHER_CACHE_TTL 設定）"""
+    global _weather_cache
+    if _weather_cache is None:
+        ttl = os.getenv(WEATHER_CACHE_TTL_ENV)
+        _weather_cache = WeatherCache(ttl=float(ttl)) if ttl else WeatherCache()
+    return _weather_cache
+
+
+
+def _weather_urls(city: str) -> list:
+    """wttr.in 的查詢網址：主要使用 HTTPS，HTTP 作為備援"""
+    city_quoted = quote(city, safe="")
+    return [
+        f"https://wttr.in/{city_quoted}?format=3",
+        f"http://wttr.in/{city_quoted}?format=3",  # 備援
+    ]
+
+
+def _unavailable_message(city: str) -> str:
+    """最終備援訊息"""
+    return f"目前無法取得 {city} 的天氣（連線不穩或服務繁忙）。請稍後再試。"
+
+
+def _resolve_hedge_delay(hedge_delay: Optional[float]) -> Optional[float]:
+    """決定備援請求的延遲：None 使用環境變數或預設值，負值表示停用（返回 None）"""
+    if hedge_delay is None:
+        env = os.getenv(WEATHER_HEDGE_DELAY_ENV)
+        hedge_delay = float(env) if env else DEFAULT_HEDGE_DELAY
+    return hedge_delay if hedge_delay >= 0 else None
+
+
+def _cache_key(city: str) -> str:
+    """快取鍵：正規化後的城市名稱（「嘉義」「嘉義 」「嘉义」共用同一筆）"""
+    return normalize_text(city) or city.strip()
+
+
+def _stale_message(value: str, age: float) -> str:
+    """查詢失敗時返回的舊資料，附上資料時間"""
+    minutes = max(1, int(age // 60))
+    return f"{value}（{minutes} 分鐘前的資料，目前無法取得最新天氣）"
 
 
-def fetch_weather(city: str, timeout: float = 5.0) -> str:
+def _fallback(city: str, key: str, cache: WeatherCache) -> str:
+    """查詢失敗：有最後一筆成功結果就附上資料時間返回，否則返回備援訊息"""
+    last_good = cache.last_good(key)
+    if last_good is None:
+        return _unavailable_message(city)
+    value, age = last_good
+    weather_logger.warning(f"Serving cached weather for {city} ({age:.0f}s old)")
+    return _stale_message(value, age)
+
+
+def fetch_weather(city: str, timeout: float = 5.0, hedge_delay: Optional[float] = None) -> str:
     """
-    取得指定城市的天氣資訊 (無狀態函數)
+    取得指定城市的天氣資訊
+
+    結果依城市快取；過期的結果先返回並在背景更新，查詢失敗時返回最後一筆成功結果與資料時間。
 
     Args:
         city: 城市名稱
         timeout: 請求超時時間（秒）
+        hedge_delay: HTTPS 超過此秒數沒有回應就同時送出 HTTP 請求，取先成功者；
+            None 使用 WEATHER_HEDGE_DELAY 或 DEFAULT_HEDGE_DELAY，負值表示依序嘗試
 
     Returns:
         天氣資訊字串或錯誤訊息
@@ -24,27 +217,263 @@ def fetch_weather(city: str, timeout: float = 5.0) -> str:
     if not city or not city.strip():
         return "請提供城市名稱。"
 
-    session = create_http_session()
-    city_quoted = quote(city, safe="")
+    hedge_delay = _resolve_hedge_delay(hedge_delay)
+    cache = get_weather_cache()
+    if not cache.enabled:
+        return _fetch_weather_live(city, timeout, hedge_delay) or _unavailable_message(city)
+
+    key = _cache_key(city)
+    value, refresh = cache.lookup(key)
+    if value is not None:
+        if refresh:
+            threading.Thread(target=_refresh_weather, args=(city, key, timeout, hedge_delay, cache),
+                             name="weather-refresh", daemon=True).start()
+        return value
+
+    value = _fetch_weather_live(city, timeout, hedge_delay)
+    if value is None:
+        return _fallback(city, key, cache)
+    cache.put(key, value)
+    return value
+
+
+def _refresh_weather(city: str, key: str, timeout: float, hedge_delay: Optional[float],
+                     cache: WeatherCache):
+    """背景執行緒：重新查詢過期的天氣"""
+    value = None
+    try:
+        value = _fetch_weather_live(city, timeout, hedge_delay)
+    finally:
+        cache.finish_refresh(key, value)
+
+
+def _fetch_weather_live(city: str, timeout: float, hedge_delay: Optional[float]) -> Optional[str]:
+    """向 wttr.in 查詢天氣；同一城市同時進行中的查詢合併為一次"""
+    return get_singleflight("weather").do(_cache_key(city), _request_weather, city, timeout, hedge_delay)
 
-    # 主要使用 HTTPS，HTTP 作為備援
-    urls = [
-        f"https://wttr.in/{city_quoted}?format=3",
-        f"http://wttr.in/{city_quoted}?format=3",  # 備援
-    ]
+
+def _request_weather(city: str, timeout: float, hedge_delay: Optional[float]) -> Optional[str]:
+    """向 wttr.in 查詢天氣，全部網址都失敗時返回 None"""
+    urls = _weather_urls(city)
+    if hedge_delay is not None:
+        return _request_weather_hedged(city, urls, timeout, hedge_delay)
 
     for url in urls:
+        weather_info = _try_weather_url(city, url, timeout)
+        if weather_info is not None:
+            return weather_info
+    return None
+
+
+def _try_weather_url(city: str, url: str, timeout: float, retry: bool = True) -> Optional[str]:
+    """以單一網址查詢天氣，失敗時返回 None
+
+    Args:
+        retry: 是否套用 HTTP 客戶端的重試（對沖請求時關閉）
+    """
+    try:
+        response = get_http_client().get(url, timeout=timeout, retry=retry)
+        if response.ok and response.text.strip():
+            weather_info = response.text.strip()
+            weather_logger.info(f"Weather for {city}: {weather_info}")
+            return weather_info
+        else:
+            weather_logger.warning(f"wttr.in bad response ({response.status_code}): {url}")
+    except Exception as e:
+        weather_logger.exception(f"Error retrieving weather for {city} via {url}: {e}")
+    return None
+
+
+def _request_weather_hedged(city: str, urls: List[str], timeout: float, hedge_delay: float) -> Optional[str]:
+    """對沖請求：先查詢主要網址，超過 hedge_delay 仍未成功就同時查詢備援網址，返回先成功的結果
+
+    兩個請求各自在短暫的 daemon 執行緒上執行，任一個成功就設定事件，呼叫端立即返回；
+    主要請求在對沖前就失敗時立刻改查備援網址。呼叫端最多等待 hedge_delay + timeout。
+    對沖時不使用 HTTP 客戶端的重試，落後的請求在自己的 timeout 內結束，
+    結果直接捨棄（requests 無法中斷進行中的請求）。
+    """
+    fallback_urls = urls[1:]
+    lock = threading.Lock()
+    # 以下狀態只在持有 lock 時讀寫
+    state = {"value": None, "running": 0, "hedged": False}
+    settled = threading.Event()  # 已有請求成功，或所有請求都已失敗
+
+    def start(attempt_urls: List[str], primary: bool):
+        state["running"] += 1
+        threading.Thread(target=attempt, args=(attempt_urls, primary), daemon=True,
+                         name=f"weather-{'primary' if primary else 'hedge'}").start()
+
+    def attempt(attempt_urls: List[str], primary: bool):
+        value = None
         try:
-            response = session.get(url, timeout=timeout)
-            if response.ok and response.text.strip():
-                weather_info = response.text.strip()
-                weather_logger.info(f"Weather for {city}: {weather_info}")
-                return weather_info
-            else:
-                weather_logger.warning(f"wttr.in bad response ({response.status_code}): {url}")
-        except Exception as e:
-            weather_logger.exception(f"Error retrieving weather for {city} via {url}: {e}")
-
-    # 最終備援訊息
-    return f"目前無法取得 {city} 的天氣（連線不穩或服務繁忙）。請稍後再試。"
+            for url in attempt_urls:
+                if settled.is_set():
+                    break
+                value = _try_weather_url(city, url, timeout, retry=False)
+                if value is not None:
+                    break
+        finally:
+            with lock:
+                state["running"] -= 1
+                if value is not None and state["value"] is None:
+                    state["value"] = value
+                if primary and value is None and fallback_urls and not state["hedged"]:
+                    # 主要請求在對沖前就失敗：立刻查詢備援網址
+                    state["hedged"] = True
+                    start(fallback_urls, primary=False)
+                elif state["value"] is not None or state["running"] == 0:
+                    settled.set()
+
+    def hedge():
+        with lock:
+            if state["hedged"] or settled.is_set():
+                return
+            state["hedged"] = True
+            weather_logger.debug(f"No response within {hedge_delay}s, hedging with {fallback_urls[0]}")
+            start(fallback_urls, primary=False)
+
+    with lock:
+        start(urls[:1], primary=True)
+    timer = None
+    if fallback_urls:
+        timer = threading.Timer(hedge_delay, hedge)
+        timer.daemon = True
+        timer.start()
+
+    if not settled.wait(hedge_delay + timeout):
+        weather_logger.warning(f"Weather for {city} timed out after {hedge_delay + timeout:.1f}s")
+    if timer is not None:
+        timer.cancel()
+    with lock:
+        return state["value"]
+
+
+# 背景更新的 task（保留參照，避免執行中被回收）
+_refresh_tasks = set()
+
+
+async def fetch_weather_async(city: str, timeout: float = 5.0, hedge_delay: Optional[float] = None) -> str:
+    """
+    取得指定城市的天氣資訊（非同步版本，等待期間不阻塞事件迴圈）
+
+    快取、備援順序與訊息與 fetch_weather 相同，背景更新以 asyncio task 執行。
+
+    Args:
+        city: 城市名稱
+        timeout: 請求超時時間（秒）
+        hedge_delay: HTTPS 超過此秒數沒有回應就同時送出 HTTP 請求，取先成功者；
+            None 使用 WEATHER_HEDGE_DELAY 或 DEFAULT_HEDGE_DELAY，負值表示依序嘗試
+
+    Returns:
+        天氣資訊字串或錯誤訊息
+    """
+    if not city or not city.strip():
+        return "請提供城市名稱。"
+
+    hedge_delay = _resolve_hedge_delay(hedge_delay)
+    cache = get_weather_cache()
+    if not cache.enabled:
+        return await _fetch_weather_live_async(city, timeout, hedge_delay) or _unavailable_message(city)
+
+    key = _cache_key(city)
+    value, refresh = cache.lookup(key)
+    if value is not None:
+        if refresh:
+            task = asyncio.create_task(_refresh_weather_async(city, key, timeout, hedge_delay, cache))
+            _refresh_tasks.add(task)
+            task.add_done_callback(_refresh_tasks.discard)
+        return value
+
+    value = await _fetch_weather_live_async(city, timeout, hedge_delay)
+    if value is None:
+        return _fallback(city, key, cache)
+    cache.put(key, value)
+    return value
+
+
+async def _refresh_weather_async(city: str, key: str, timeout: float, hedge_delay: Optional[float],
+                                 cache: WeatherCache):
+    """背景 task：重新查詢過期的天氣"""
+    value = None
+    try:
+        value = await _fetch_weather_live_async(city, timeout, hedge_delay)
+    finally:
+        cache.finish_refresh(key, value)
+
+
+async def _fetch_weather_live_async(city: str, timeout: float, hedge_delay: Optional[float]) -> Optional[str]:
+    """向 wttr.in 查詢天氣（非同步）；同一城市同時進行中的查詢合併為一次"""
+    return await get_singleflight("weather").do_async(_cache_key(city), _request_weather_async,
+                                                      city, timeout, hedge_delay)
+
+
+async def _request_weather_async(city: str, timeout: float, hedge_delay: Optional[float]) -> Optional[str]:
+    """向 wttr.in 查詢天氣（非同步），全部網址都失敗時返回 None"""
+    urls = _weather_urls(city)
+    if hedge_delay is not None:
+        return await _request_weather_hedged_async(city, urls, timeout, hedge_delay)
+
+    for url in urls:
+        weather_info = await _try_weather_url_async(city, url, timeout)
+        if weather_info is not None:
+            return weather_info
+    return None
+
+
+async def _try_weather_url_async(city: str, url: str, timeout: float, retry: bool = True) -> Optional[str]:
+    """以單一網址查詢天氣（非同步），失敗時返回 None
+
+    Args:
+        retry: 是否套用 HTTP 客戶端的重試（對沖請求時關閉）
+    """
+    try:
+        response = await get_async_http_client().get(url, timeout=timeout, retry=retry)
+        if response.ok and response.text.strip():
+            weather_info = response.text.strip()
+            weather_logger.info(f"Weather for {city}: {weather_info}")
+            return weather_info
+        else:
+            weather_logger.warning(f"wttr.in bad response ({response.status}): {url}")
+    except Exception as e:
+        weather_logger.exception(f"Error retrieving weather for {city} via {url}: {e}")
+    return None
+
+
+async def _request_weather_hedged_async(city: str, urls: List[str], timeout: float,
+                                        hedge_delay: float) -> Optional[str]:
+    """對沖請求（非同步）：先送出第一個網址，超過 hedge_delay 沒有回應（或已失敗）就再送出下一個，取先成功者
+
+    不使用重試，最多等待 hedge_delay + timeout 秒，結束時取消尚未完成的請求。
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + hedge_delay + timeout
+    pending = {asyncio.ensure_future(_try_weather_url_async(city, urls[0], timeout, retry=False))}
+    next_index = 1
+    hedge_at = loop.time() + hedge_delay
+    try:
+        while pending:
+            now = loop.time()
+            if now >= deadline:
+                weather_logger.warning(f"Weather for {city} timed out after {hedge_delay + timeout:.1f}s")
+                return None
+            wait_timeout = deadline - now
+            if next_index < len(urls):
+                wait_timeout = min(wait_timeout, max(0.0, hedge_at - now))
+            done, pending = await asyncio.wait(pending, timeout=wait_timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                weather_info = task.result()
+                if weather_info is not None:
+                    return weather_info
+            if next_index < len(urls) and (done or loop.time() >= hedge_at):
+                if not done:
+                    weather_logger.debug(f"No response within {hedge_delay}s, hedging with {urls[next_index]}")
+                pending.add(asyncio.ensure_future(_try_weather_url_async(city, urls[next_index], timeout,
+                                                                         retry=False)))
+                next_index += 1
+                hedge_at = loop.time() + hedge_delay
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+
 
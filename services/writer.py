@@ -0,0 +1,206 @@
+"""單一寫入執行緒 - 以佇列序列化寫入並合併提交
+
+SQLite 同一時間只允許一個寫入者。多個執行緒各自開交易寫入時會互相等待寫入鎖，
+逾時就出現 database is locked。寫入佇列讓同一行程的所有寫入都由一條專用執行緒執行：
+1. 呼叫端提交「在游標上執行的函數」，立即取得 Future
+2. 寫入執行緒一次取出佇列中已累積的多筆，在同一個交易中執行後只提交一次（group commit）
+3. 每筆以 SAVEPOINT 包住，單筆失敗只回滾該筆，例外由對應的 Future 傳回
+4. 讀取端使用各自的連線，WAL 模式下不需等待寫入交易
+5. 自行管理連線與交易的大型寫入（大量匯入）以 run_exclusive() 排入，
+   在先前的寫入提交後單獨執行，期間其他寫入留在佇列中等待，不會因寫入鎖逾時而失敗
+
+每個 Database 只有一個寫入佇列（Database.write_queue），Database.close() 時等待佇列寫完。
+"""
+
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .database import Database
+
+# 設定日誌
+writer_logger = logging.getLogger("core.writer")
+
+# 在游標上執行的寫入操作，返回值會成為 Future 的結果
+Mutation = Callable[[sqlite3.Cursor], Any]
+
+# 通知寫入執行緒結束的哨兵值
+_STOP = object()
+
+
+class _Exclusive:
+    """以 run_exclusive() 排入、在交易之外單獨執行的操作"""
+
+    def __init__(self, fn: Callable[[], Any]):
+        self.fn = fn
+
+
+class WriteQueue:
+    """由單一背景執行緒執行的寫入佇列"""
+
+    def __init__(self, db: Database, max_batch: int = 256):
+        """初始化寫入佇列（背景執行緒在第一次提交時啟動）
+
+        一般請使用 Database.write_queue，同一個資料庫只應有一個寫入佇列。
+
+        Args:
+            db: 資料庫實例
+            max_batch: 單一交易最多合併的寫入數
+        """
+        self.db = db
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats = {'submitted': 0, 'committed': 0, 'failed': 0, 'groups': 0, 'max_group': 0,
+                       'exclusive': 0}
+
+    def submit(self, mutation: Mutation) -> Future:
+        """提交寫入操作
+
+        Args:
+            mutation: 接收游標的函數，在寫入執行緒的交易中執行（不可自行提交）
+
+        Returns:
+            交易提交後完成的 Future；操作失敗或提交失敗時帶有例外
+        """
+        return self._enqueue(mutation)
+
+    def run_exclusive(self, fn: Callable[[], Any]) -> Future:
+        """排入自行開啟連線與交易的寫入（例如大量匯入）
+
+        fn 在寫入執行緒上執行：佇列中排在它之前的寫入先提交，執行期間不處理其他寫入。
+        fn 不可再等待同一個佇列的 Future（會互相等待）。
+
+        Args:
+            fn: 無參數的函數
+
+        Returns:
+            fn 執行完成後帶有其返回值（或例外）的 Future
+        """
+        return self._enqueue(_Exclusive(fn))
+
+    def _enqueue(self, item: Any) -> Future:
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("寫入佇列已關閉")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="qa-writer", daemon=True)
+                self._thread.start()
+            self._stats['submitted'] += 1
+            self._queue.put((item, future))
+        return future
+
+    def _run(self):
+        """寫入執行緒：取出佇列中所有已累積的操作，合併為一個交易"""
+        stopping = False
+        while not stopping:
+            batch: List[Tuple[Mutation, Future]] = []
+            exclusive = None
+            item = self._queue.get()
+            while True:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item[0], _Exclusive):
+                    exclusive = item
+                else:
+                    batch.append(item)
+                if stopping or exclusive is not None or len(batch) >= self.max_batch:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._commit_group(batch)
+            if exclusive is not None:
+                self._run_exclusive(*exclusive)
+
+    def _run_exclusive(self, exclusive: _Exclusive, future: Future):
+        """單獨執行 run_exclusive() 排入的操作"""
+        if not future.set_running_or_notify_cancel():
+            return
+        with self._lock:
+            self._stats['exclusive'] += 1
+        try:
+            future.set_result(exclusive.fn())
+        except BaseException as e:
+            writer_logger.error(f"獨佔寫入失敗: {e}")
+            future.set_exception(e)
+
+    def _commit_group(self, batch: List[Tuple[Mutation, Future]]):
+        """在單一交易中執行一組寫入，提交後才設定 Future 的結果"""
+        started = time.perf_counter()
+        results: List[Tuple[Future, bool, Any]] = []
+        try:
+            with self.db.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('BEGIN IMMEDIATE')
+                for mutation, future in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    cursor.execute('SAVEPOINT queued_write')
+                    try:
+                        results.append((future, True, mutation(cursor)))
+                    except Exception as e:
+                        cursor.execute('ROLLBACK TO queued_write')
+                        results.append((future, False, e))
+                        writer_logger.warning(f"寫入操作失敗，已回滾該筆: {e}")
+                    cursor.execute('RELEASE queued_write')
+        except Exception as e:
+            # 交易本身失敗（例如提交時磁碟錯誤）：整組都沒有寫入
+            writer_logger.error(f"寫入交易失敗（{len(batch)} 筆）: {e}")
+            with self._lock:
+                self._stats['failed'] += len(batch)
+            for _, future in batch:
+                if future.running() or (not future.done() and future.set_running_or_notify_cancel()):
+                    future.set_exception(e)
+            return
+
+        succeeded = sum(1 for _, ok, _ in results if ok)
+        with self._lock:
+            self._stats['committed'] += succeeded
+            self._stats['failed'] += len(results) - succeeded
+            self._stats['groups'] += 1
+            self._stats['max_group'] = max(self._stats['max_group'], len(batch))
+        writer_logger.debug(f"合併提交 {len(batch)} 筆寫入 ({(time.perf_counter() - started) * 1000:.1f} ms)")
+        if succeeded:
+            self.db.notify_change()
+        for future, ok, value in results:
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def stats(self) -> Dict[str, Any]:
+        """取得寫入統計
+
+        Returns:
+            包含 submitted、committed、failed、groups（交易數）、max_group、exclusive、pending 的字典
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats['pending'] = self._queue.qsize()
+        return stats
+
+    def close(self, timeout: Optional[float] = None):
+        """停止接受新的寫入，等待佇列中的寫入完成後結束執行緒
+
+        Args:
+            timeout: 最多等待的秒數，None 表示一直等待
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+        writer_logger.info("寫入佇列已關閉")
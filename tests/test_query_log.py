@@ -0,0 +1,57 @@
+"""query_log.find_full_scans 的測試"""
+
+from services.query_log import find_full_scans
+
+# 建立 idx_qa_answer 之前，find_answers 標籤階段的實際查詢計畫（節錄）
+TAG_STAGE_SQL = '''
+    SELECT 'tag', a.id, a.content,
+           (SELECT MAX(priority) FROM question_answers WHERE answer_id = a.id),
+           COUNT(DISTINCT t.id), NULL, NULL, (
+        SELECT GROUP_CONCAT(t.name, ',')
+        FROM answer_tags at JOIN tags t ON t.id = at.tag_id
+        WHERE at.answer_id = a.id
+    )
+    FROM tags t
+    JOIN answer_tags at ON t.id = at.tag_id
+    JOIN answers a ON at.answer_id = a.id
+    WHERE t.name_norm IN (?)
+    GROUP BY a.id, a.content
+'''
+TAG_STAGE_PLAN = [
+    (160, 151, 0, 'SEARCH t USING COVERING INDEX idx_tags_name_norm (name_norm=?)'),
+    (166, 151, 0, 'SEARCH at USING INDEX idx_answer_tags_tag (tag_id=?)'),
+    (171, 151, 0, 'SEARCH a USING INTEGER PRIMARY KEY (rowid=?)'),
+    (174, 151, 0, 'USE TEMP B-TREE FOR GROUP BY'),
+    (213, 151, 0, 'CORRELATED SCALAR SUBQUERY 6'),
+    (219, 213, 0, 'SEARCH question_answers USING INDEX idx_qa_priority'),
+    (238, 151, 0, 'CORRELATED SCALAR SUBQUERY 7'),
+    (244, 238, 0, 'SEARCH at USING COVERING INDEX sqlite_autoindex_answer_tags_1 (answer_id=?)'),
+    (249, 238, 0, 'SEARCH t USING INTEGER PRIMARY KEY (rowid=?)'),
+    (265, 151, 0, 'USE TEMP B-TREE FOR count(DISTINCT)'),
+]
+
+
+def test_unconstrained_index_search_is_full_scan():
+    """只用索引排序、沒有條件的 SEARCH 會走完整個索引，應列為全表掃描"""
+    assert find_full_scans(TAG_STAGE_PLAN, TAG_STAGE_SQL) == [
+        'SEARCH question_answers USING INDEX idx_qa_priority',
+    ]
+
+
+def test_constrained_search_is_not_full_scan():
+    plan = [
+        (219, 213, 0, 'SEARCH question_answers USING COVERING INDEX idx_qa_answer (answer_id=?)'),
+        (20, 2, 0, 'SEARCH a USING INTEGER PRIMARY KEY (rowid=?)'),
+    ]
+    assert find_full_scans(plan, TAG_STAGE_SQL) == []
+
+
+def test_scan_resolves_alias_and_skips_allowed_tables():
+    sql = 'SELECT * FROM questions q JOIN question_answers qa ON q.id = qa.question_id JOIN tags t'
+    plan = [
+        (2, 0, 0, 'SCAN qa'),
+        (3, 0, 0, 'SCAN t'),
+        (4, 0, 0, 'SCAN qa_fts VIRTUAL TABLE INDEX 0:M3'),
+        (5, 0, 0, 'SCAN 2 CONSTANT ROWS'),
+    ]
+    assert find_full_scans(plan, sql) == ['SCAN qa (question_answers)']
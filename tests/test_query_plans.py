@@ -0,0 +1,57 @@
+"""資料庫查詢路徑的查詢計畫測試：以 EXPLAIN QUERY PLAN 確認熱門查詢使用索引"""
+
+import os
+
+import pytest
+
+from services.database import Database
+from services.qa import QAService
+from services.query_log import audit_queries
+from services.text_normalize import normalize_text
+
+QA_JSON = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'docs', 'qa.json')
+
+
+@pytest.fixture
+def db(tmp_path):
+    """以 docs/qa.json 建立、啟用查詢記錄的資料庫"""
+    db = Database(str(tmp_path / 'qa.db'), slow_query_ms=60_000)
+    db.migrate_from_json(QA_JSON)
+    db.query_recorder.reset()
+    yield db
+    db.close()
+
+
+def _audit(db: Database, marker: str):
+    """找出 SQL 含 marker 的已記錄語句並稽核其查詢計畫"""
+    with db.read_connection() as conn:
+        audits = [audit for audit in audit_queries(conn, db.query_recorder.records())
+                  if marker in audit.record.sql]
+    assert audits, f"沒有記錄到含 {marker!r} 的查詢"
+    return audits
+
+
+def test_tag_stage_priority_uses_answer_index(db):
+    """標籤階段取答案最高優先級的子查詢以 idx_qa_answer 定位，不走 idx_qa_priority 掃描關聯表"""
+    service = QAService(use_index=False, cache_size=0, db=db)
+    assert service._extract_keywords('阿里山'), "範例問題需要擷取出標籤關鍵字"
+    service.find_answers('阿里山')
+
+    for audit in _audit(db, "SELECT 'tag'"):
+        assert any('USING COVERING INDEX idx_qa_answer (answer_id=?)' in line for line in audit.plan), audit.plan
+        assert not any('idx_qa_priority' in line for line in audit.plan), audit.plan
+
+
+@pytest.mark.parametrize('question', ['山', '嘉義'])
+def test_short_query_uses_ngram_postings(db, question):
+    """少於三個字的查詢由 qa_ngrams 找出包含查詢的問題，不掃描問題表"""
+    service = QAService(use_index=False, cache_size=0, db=db)
+    found = {c.question for c in service._find_answers_in_db(question, [], 50)}
+    with db.read_connection() as conn:
+        expected = {row[0] for row in conn.execute(
+            "SELECT content FROM questions WHERE content_norm LIKE '%' || ? || '%'", (normalize_text(question),))}
+    assert expected and found == expected
+
+    for audit in _audit(db, 'FROM qa_ngrams WHERE'):
+        if "SELECT 'fts'" in audit.record.sql:
+            assert audit.full_scans == [], audit.plan
@@ -8,10 +8,10 @@ from livekit.agents import function_tool, RunContext
 
 # 引入服務模組
 from services import (
-    fetch_weather,
-    search_web_ddg
+    fetch_weather_async,
+    search_web_ddg_async
 )
-from services.qa import find_answer, get_qa_service
+from services.qa import find_answer, get_qa_service, STAGE_LABELS
 
 # 獲取日誌器（不重新配置 basicConfig，避免重複輸出）
 tools_logger = logging.getLogger("core.tools")
@@ -26,8 +26,8 @@ async def get_weather(
     """
     Get the current weather for a given city.
     """
-    # 直接調用核心服務模組的無狀態函數
-    return fetch_weather(city, timeout=2.0)
+    # 非同步版本：等待 wttr.in 時不阻塞事件迴圈（語音處理）
+    return await fetch_weather_async(city, timeout=2.0)
 
 @function_tool()
 async def search_web(
@@ -37,8 +37,8 @@ async def search_web(
     """
     Search the web using DuckDuckGo.
     """
-    # 直接調用核心服務模組的無狀態函數
-    return search_web_ddg(query, max_results=5)
+    # 非同步版本：等待 DuckDuckGo 時不阻塞事件迴圈（語音處理）
+    return await search_web_ddg_async(query, max_results=5)
 
 # === 嘉義旅遊 QA 工具 (新系統) ===
 
@@ -53,6 +53,48 @@ async def qa_find_answer(
     """
     return find_answer(question)
 
+@function_tool()
+async def qa_find_candidates(
+    context: RunContext,  # type: ignore
+    question: str,
+    k: int = 3
+) -> str:
+    """
+    智慧問答系統 - 一次返回多個候選答案及其匹配方式、分數與標籤
+    適合問題含糊、需要在幾個相近答案之間挑選時使用
+    """
+    service = get_qa_service()
+    candidates = service.find_answers(question, k=k)
+    if not candidates:
+        return f"沒有找到與 '{question}' 相關的答案"
+
+    result = f"'{question}' 的候選答案：\n"
+    for rank, c in enumerate(candidates, 1):
+        tags = ', '.join(c.tags) if c.tags else '無標籤'
+        result += f"{rank}. [{STAGE_LABELS[c.stage]}, 分數 {c.score:.2f}, 優先級 {c.priority}, 標籤: {tags}] {c.answer}\n"
+    return result
+
+@function_tool()
+async def qa_hybrid_search(
+    context: RunContext,  # type: ignore
+    question: str,
+    k: int = 3
+) -> str:
+    """
+    智慧問答系統 - 混合檢索（BM25 全文檢索 + 向量語意檢索，含同義詞擴充）
+    適合口語、英文或別名說法的問題，例如 "Alishan train"、"文化夜市"
+    """
+    service = get_qa_service()
+    results = service.hybrid_search(question, k=k)
+    if not results:
+        return f"沒有找到與 '{question}' 相關的答案"
+
+    result = f"'{question}' 的混合檢索結果：\n"
+    for rank, r in enumerate(results, 1):
+        tags = ', '.join(r.tags) if r.tags else '無標籤'
+        result += f"{rank}. [RRF {r.score:.4f}, 標籤: {tags}] {r.answer}\n"
+    return result
+
 @function_tool()
 async def qa_search_by_tag(
     context: RunContext,  # type: ignore
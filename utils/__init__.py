@@ -2,8 +2,10 @@
 Utils 模組 - 提供通用工具函數
 """
 
-from .http_client import create_http_session
+from .http_client import create_http_session, get_http_client, close_http_client
 
 __all__ = [
     'create_http_session',
+    'get_http_client',
+    'close_http_client',
 ]
\ No newline at end of file
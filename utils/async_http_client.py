@@ -0,0 +1,185 @@
+"""
+非同步 HTTP 客戶端工具模組
+提供以 aiohttp 實作、保持連線並帶有重試機制的 HTTP 客戶端，
+讓 LiveKit 工具等 asyncio 程式碼等待外部服務時不會阻塞事件迴圈
+"""
+
+import asyncio
+import json
+import logging
+import weakref
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from .http_client import DEFAULT_HEADERS, DEFAULT_HOST_LIMITS, DEFAULT_POOL_MAXSIZE
+
+
+# 設定日誌
+async_http_logger = logging.getLogger("core.async_http_client")
+
+# 與同步客戶端相同的重試策略：最多重試 3 次，0.5, 1.0, 2.0 秒遞增
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.5
+RETRY_STATUS = (502, 503, 504)
+
+# 連線總數上限與閒置連線保留時間（秒）
+DEFAULT_CONNECTION_LIMIT = 100
+DEFAULT_KEEPALIVE_TIMEOUT = 30.0
+
+
+@dataclass
+class AsyncResponse:
+    """已讀取完內容的回應"""
+    status: int
+    text: str
+    url: str
+
+    @property
+    def ok(self) -> bool:
+        return self.status < 400
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+
+class AsyncHttpClient:
+    """綁定單一事件迴圈的非同步 HTTP 客戶端
+
+    同一事件迴圈內的所有請求共用 aiohttp 的連線池；個別主機另以 semaphore 限制同時請求數。
+    """
+
+    def __init__(self, limit: int = DEFAULT_CONNECTION_LIMIT,
+                 limit_per_host: int = DEFAULT_POOL_MAXSIZE,
+                 host_limits: Optional[Dict[str, int]] = None,
+                 headers: Optional[Dict[str, str]] = None,
+                 keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT):
+        """
+        初始化客戶端（aiohttp session 在第一次請求時於目前的事件迴圈建立）
+
+        Args:
+            limit: 連線總數上限
+            limit_per_host: 每台主機的連線數上限
+            host_limits: 主機名稱 → 同時請求數上限，預設為 DEFAULT_HOST_LIMITS
+            headers: 預設請求標頭
+            keepalive_timeout: 閒置連線保留時間（秒）
+        """
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.headers = dict(DEFAULT_HEADERS if headers is None else headers)
+        self.keepalive_timeout = keepalive_timeout
+        self._host_semaphores = {
+            host: asyncio.Semaphore(n)
+            for host, n in (DEFAULT_HOST_LIMITS if host_limits is None else host_limits).items()
+        }
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._stats = {"requests": 0, "connections": 0, "reused": 0, "retries": 0}
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            trace = aiohttp.TraceConfig()
+            trace.on_connection_create_end.append(self._on_connection_create)
+            trace.on_connection_reuseconn.append(self._on_connection_reuse)
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host,
+                                             keepalive_timeout=self.keepalive_timeout, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector, headers=self.headers,
+                                                  trace_configs=[trace])
+        return self._session
+
+    async def _on_connection_create(self, session, context, params):
+        self._stats["connections"] += 1
+
+    async def _on_connection_reuse(self, session, context, params):
+        self._stats["reused"] += 1
+
+    async def get(self, url: str, params: Optional[Mapping[str, str]] = None,
+                  timeout: float = 5.0, retry: bool = True) -> AsyncResponse:
+        """
+        發送 GET 請求並讀取回應內容
+
+        連線錯誤、逾時與 502/503/504 會以遞增的等待時間重試（與同步客戶端相同）。
+
+        Args:
+            url: 請求網址
+            params: 查詢參數
+            timeout: 每次嘗試的逾時時間（秒）
+            retry: 是否重試；呼叫端自行處理備援（例如對沖請求）時設為 False
+
+        Returns:
+            AsyncResponse；重試後仍為 502/503/504 時返回最後一次的回應
+
+        Raises:
+            aiohttp.ClientError / asyncio.TimeoutError: 重試後仍無法連線或逾時
+        """
+        session = self._get_session()
+        semaphore = self._host_semaphores.get(urlsplit(url).hostname or "")
+        client_timeout = aiohttp.ClientTimeout(total=timeout)
+        retries = RETRY_TOTAL if retry else 0
+        for attempt in range(retries + 1):
+            if attempt:
+                self._stats["retries"] += 1
+                await asyncio.sleep(RETRY_BACKOFF * (2 ** (attempt - 1)))
+            try:
+                self._stats["requests"] += 1
+                if semaphore is not None:
+                    async with semaphore:
+                        response = await self._fetch(session, url, params, client_timeout)
+                else:
+                    response = await self._fetch(session, url, params, client_timeout)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt == retries:
+                    raise
+                async_http_logger.debug(f"請求失敗，準備重試 ({attempt + 1}/{RETRY_TOTAL}): {url}: {e!r}")
+                continue
+            if response.status in RETRY_STATUS and attempt < retries:
+                async_http_logger.debug(f"伺服器忙碌 ({response.status})，準備重試: {url}")
+                continue
+            return response
+
+    @staticmethod
+    async def _fetch(session: aiohttp.ClientSession, url: str, params, timeout) -> AsyncResponse:
+        async with session.get(url, params=params, timeout=timeout) as response:
+            text = await response.text()
+            return AsyncResponse(status=response.status, text=text, url=str(response.url))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        取得連線重複使用統計
+
+        Returns:
+            包含 requests（請求數，含重試）、connections（新建連線數）、reused、retries 與 reuse_rate 的字典
+        """
+        stats = dict(self._stats)
+        opened = stats["connections"] + stats["reused"]
+        stats["reuse_rate"] = stats["reused"] / opened if opened else 0.0
+        return stats
+
+    async def close(self):
+        """關閉 aiohttp session 與連線池"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+# 每個事件迴圈一個客戶端（aiohttp session 不可跨事件迴圈使用）
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncHttpClient]" = weakref.WeakKeyDictionary()
+
+
+def get_async_http_client() -> AsyncHttpClient:
+    """取得目前事件迴圈共用的非同步 HTTP 客戶端（需在事件迴圈內呼叫）"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        async_http_logger.info("建立共用非同步 HTTP 客戶端")
+        client = _async_clients[loop] = AsyncHttpClient()
+    return client
+
+
+async def close_async_http_client():
+    """關閉目前事件迴圈的非同步 HTTP 客戶端（例如在 LiveKit job 結束時呼叫）"""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+        async_http_logger.info("非同步 HTTP 客戶端已關閉")
@@ -1,31 +1,210 @@
 """
 HTTP 客戶端工具模組
-提供帶有重試機制的 HTTP Session 建立
+提供帶有重試機制的 HTTP Session 建立，以及行程內共用、保持連線的 HTTP 客戶端
 """
 
+import atexit
+import logging
+import threading
+from typing import Any, Dict, Optional
+
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
 
-def create_http_session() -> requests.Session:
-    """
-    建立帶有重試機制的 HTTP Session
+# 設定日誌
+http_logger = logging.getLogger("core.http_client")
 
-    Returns:
-        設定好的 requests.Session 物件
-    """
-    retry = Retry(
+# 預設連線池大小：保留連線的主機數、每台主機保留的連線數
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+
+# 個別主機的連線上限（同時連線數達上限時等待，而不是再開新連線）
+DEFAULT_HOST_LIMITS = {
+    "wttr.in": 4,
+    "api.duckduckgo.com": 4,
+}
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Friday-MCP/1.0 (+https://example.local)"
+}
+
+
+def _create_retry() -> Retry:
+    """建立重試策略"""
+    return Retry(
         total=3,                # 最多重試 3 次
         backoff_factor=0.5,     # 0.5, 1.0, 2.0 秒遞增
         status_forcelist=[502, 503, 504],
         allowed_methods=["GET"],
         raise_on_status=False,
     )
+
+
+def create_http_session(pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+                        pool_maxsize: int = DEFAULT_POOL_MAXSIZE) -> requests.Session:
+    """
+    建立帶有重試機制的 HTTP Session
+
+    Args:
+        pool_connections: 保留連線池的主機數
+        pool_maxsize: 每台主機保留的連線數
+
+    Returns:
+        設定好的 requests.Session 物件
+    """
+    retry = _create_retry()
     session = requests.Session()
-    session.headers.update({
-        "User-Agent": "Friday-MCP/1.0 (+https://example.local)"
-    })
-    session.mount("https://", HTTPAdapter(max_retries=retry))
-    session.mount("http://", HTTPAdapter(max_retries=retry))
-    return session
\ No newline at end of file
+    session.headers.update(DEFAULT_HEADERS)
+    session.mount("https://", HTTPAdapter(max_retries=retry, pool_connections=pool_connections,
+                                          pool_maxsize=pool_maxsize))
+    session.mount("http://", HTTPAdapter(max_retries=retry, pool_connections=pool_connections,
+                                         pool_maxsize=pool_maxsize))
+    return session
+
+
+class HttpClient:
+    """行程內共用的 HTTP 客戶端
+
+    所有執行緒共用同一組 HTTPAdapter（底層的 urllib3 連線池可跨執行緒使用），
+    因此對同一主機的請求會重複使用已建立的 TCP / TLS 連線；
+    requests.Session 本身的狀態（cookie 等）則每個執行緒各自一份，避免互相干擾。
+    不重試的請求（get(..., retry=False)）使用另一組不重試的 adapter，但共用同一個連線池。
+    """
+
+    def __init__(self, pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+                 host_limits: Optional[Dict[str, int]] = None,
+                 headers: Optional[Dict[str, str]] = None):
+        """
+        初始化 HTTP 客戶端
+
+        Args:
+            pool_connections: 保留連線池的主機數
+            pool_maxsize: 每台主機保留的連線數
+            host_limits: 主機名稱 → 同時連線數上限，預設為 DEFAULT_HOST_LIMITS
+            headers: 預設請求標頭
+        """
+        self.headers = dict(DEFAULT_HEADERS if headers is None else headers)
+        self.host_limits = dict(DEFAULT_HOST_LIMITS if host_limits is None else host_limits)
+        # 掛載前綴 → adapter；requests 以最長前綴選擇 adapter
+        self._adapters: Dict[str, HTTPAdapter] = {}
+        for scheme in ("https://", "http://"):
+            self._adapters[scheme] = HTTPAdapter(max_retries=_create_retry(), pool_connections=pool_connections,
+                                                 pool_maxsize=pool_maxsize)
+            for host, limit in self.host_limits.items():
+                self._adapters[f"{scheme}{host}/"] = HTTPAdapter(
+                    max_retries=_create_retry(), pool_connections=1, pool_maxsize=limit, pool_block=True,
+                )
+        # 不重試的 adapter 與上面的 adapter 共用 urllib3 連線池，主機連線上限仍一併計算
+        self._no_retry_adapters: Dict[str, HTTPAdapter] = {}
+        for prefix, adapter in self._adapters.items():
+            no_retry = HTTPAdapter(max_retries=0)
+            no_retry.poolmanager = adapter.poolmanager
+            self._no_retry_adapters[prefix] = no_retry
+        self._local = threading.local()
+        self._sessions_lock = threading.Lock()
+        self._sessions = []
+        self._closed = False
+
+    @property
+    def session(self) -> requests.Session:
+        """目前執行緒的 Session（共用連線池）"""
+        return self._session("session", self._adapters)
+
+    def _session(self, name: str, adapters: Dict[str, HTTPAdapter]) -> requests.Session:
+        session = getattr(self._local, name, None)
+        if session is None:
+            if self._closed:
+                raise RuntimeError("HTTP 客戶端已關閉")
+            session = requests.Session()
+            session.headers.update(self.headers)
+            for prefix, adapter in adapters.items():
+                session.mount(prefix, adapter)
+            setattr(self._local, name, session)
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
+
+    def get(self, url: str, retry: bool = True, **kwargs) -> requests.Response:
+        """發送 GET 請求（其餘參數同 requests.Session.get）
+
+        Args:
+            url: 請求網址
+            retry: 是否套用重試策略；呼叫端自行處理備援（例如對沖請求）時設為 False，
+                   失敗後立即返回，不佔用連線與執行緒等待重試
+        """
+        if retry:
+            return self.session.get(url, **kwargs)
+        return self._session("no_retry_session", self._no_retry_adapters).get(url, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        取得連線重複使用統計
+
+        Returns:
+            包含 requests（請求數）、connections（新建連線數）、reuse_rate 與各主機明細的字典
+        """
+        hosts: Dict[str, Dict[str, Any]] = {}
+        for adapter in self._adapters.values():
+            for key in adapter.poolmanager.pools.keys():
+                pool = adapter.poolmanager.pools.get(key)
+                if pool is None:
+                    continue
+                name = f"{pool.scheme}://{pool.host}"
+                entry = hosts.setdefault(name, {"requests": 0, "connections": 0})
+                entry["requests"] += pool.num_requests
+                entry["connections"] += pool.num_connections
+        for entry in hosts.values():
+            entry["reuse_rate"] = 1 - entry["connections"] / entry["requests"] if entry["requests"] else 0.0
+        requests_total = sum(entry["requests"] for entry in hosts.values())
+        connections_total = sum(entry["connections"] for entry in hosts.values())
+        return {
+            "requests": requests_total,
+            "connections": connections_total,
+            "reuse_rate": 1 - connections_total / requests_total if requests_total else 0.0,
+            "hosts": hosts,
+        }
+
+    def close(self):
+        """關閉所有 Session 與連線池"""
+        with self._sessions_lock:
+            if self._closed:
+                return
+            self._closed = True
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
+        for adapter in self._adapters.values():
+            adapter.close()
+        http_logger.info("HTTP 客戶端已關閉")
+
+
+_http_client: Optional[HttpClient] = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """取得共用的 HTTP 客戶端（單例，第一次使用時建立）"""
+    global _http_client
+    client = _http_client
+    if client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                http_logger.info("建立共用 HTTP 客戶端")
+                _http_client = HttpClient()
+            client = _http_client
+    return client
+
+
+def close_http_client():
+    """關閉共用的 HTTP 客戶端（行程結束時自動呼叫；之後再使用會重新建立）"""
+    global _http_client
+    with _http_client_lock:
+        client, _http_client = _http_client, None
+    if client is not None:
+        client.close()
+
+
+atexit.register(close_http_client)